@@ -0,0 +1,47 @@
+"""Add expense daily rollups feature table
+
+Revision ID: 4b7e2c9d1a63
+Revises: de5fcdf04c7f
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2c9d1a63'
+down_revision = 'de5fcdf04c7f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create expense_daily_rollups table
+    op.create_table('expense_daily_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('expense_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'date', 'category_id', name='uq_expense_daily_rollups_user_date_category')
+    )
+    op.create_index(op.f('ix_expense_daily_rollups_id'), 'expense_daily_rollups', ['id'], unique=False)
+    
+    # Backfill from existing expenses
+    op.execute("""
+        INSERT INTO expense_daily_rollups (user_id, date, category_id, amount, expense_count)
+        SELECT user_id, date, category_id, SUM(amount), COUNT(*)
+        FROM expenses
+        GROUP BY user_id, date, category_id
+    """)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_expense_daily_rollups_id'), table_name='expense_daily_rollups')
+    op.drop_table('expense_daily_rollups')
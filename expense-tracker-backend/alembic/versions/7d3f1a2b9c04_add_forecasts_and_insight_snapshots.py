@@ -0,0 +1,57 @@
+"""Add precomputed forecasts and insight snapshots
+
+Revision ID: 7d3f1a2b9c04
+Revises: 4b7e2c9d1a63
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f1a2b9c04'
+down_revision = '4b7e2c9d1a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create forecasts table
+    op.create_table('forecasts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('engine', sa.String(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('p10', sa.Float(), nullable=False),
+        sa.Column('p50', sa.Float(), nullable=False),
+        sa.Column('p90', sa.Float(), nullable=False),
+        sa.Column('model_version', sa.Integer(), nullable=True),
+        sa.Column('data_watermark', sa.String(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'engine', 'month', name='uq_forecasts_user_engine_month')
+    )
+    op.create_index(op.f('ix_forecasts_id'), 'forecasts', ['id'], unique=False)
+    
+    # Create insight_snapshots table
+    op.create_table('insight_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('insights', sa.Text(), nullable=False),
+        sa.Column('data_watermark', sa.String(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_insight_snapshots_id'), 'insight_snapshots', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_insight_snapshots_id'), table_name='insight_snapshots')
+    op.drop_table('insight_snapshots')
+    op.drop_index(op.f('ix_forecasts_id'), table_name='forecasts')
+    op.drop_table('forecasts')
@@ -0,0 +1,38 @@
+"""Add daily portfolio snapshots
+
+Revision ID: a4c7e1d9b352
+Revises: f2b6d8e4a917
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e1d9b352'
+down_revision = 'f2b6d8e4a917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create portfolio_snapshots table
+    op.create_table('portfolio_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('invested', sa.Float(), nullable=False),
+        sa.Column('current_value', sa.Float(), nullable=False),
+        sa.Column('cumulative_spend', sa.Float(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'date', name='uq_portfolio_snapshots_user_date')
+    )
+    op.create_index(op.f('ix_portfolio_snapshots_id'), 'portfolio_snapshots', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_portfolio_snapshots_id'), table_name='portfolio_snapshots')
+    op.drop_table('portfolio_snapshots')
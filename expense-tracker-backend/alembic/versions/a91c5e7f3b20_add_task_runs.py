@@ -0,0 +1,40 @@
+"""Add task runs for the periodic scheduler
+
+Revision ID: a91c5e7f3b20
+Revises: 7d3f1a2b9c04
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91c5e7f3b20'
+down_revision = '7d3f1a2b9c04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create task_runs table
+    op.create_table('task_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_name', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('worker', sa.String(), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('duration_ms', sa.Float(), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_task_runs_id'), 'task_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_task_runs_task_name'), 'task_runs', ['task_name'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_task_runs_task_name'), table_name='task_runs')
+    op.drop_index(op.f('ix_task_runs_id'), table_name='task_runs')
+    op.drop_table('task_runs')
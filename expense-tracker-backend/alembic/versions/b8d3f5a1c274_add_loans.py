@@ -0,0 +1,70 @@
+"""Add loans and prepayments, and link EMI expenses to them
+
+Revision ID: b8d3f5a1c274
+Revises: a4c7e1d9b352
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d3f5a1c274'
+down_revision = 'a4c7e1d9b352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create loans table
+    op.create_table('loans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('lender', sa.String(), nullable=True),
+        sa.Column('principal', sa.Float(), nullable=False),
+        sa.Column('interest_rate', sa.Float(), nullable=False),
+        sa.Column('tenure_months', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('prepayment_strategy', sa.String(), nullable=False),
+        sa.Column('track_expenses', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_loans_id'), 'loans', ['id'], unique=False)
+    op.create_index('ix_loans_user_id', 'loans', ['user_id'], unique=False)
+
+    # Create loan_prepayments table
+    op.create_table('loan_prepayments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('loan_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['loan_id'], ['loans.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_loan_prepayments_id'), 'loan_prepayments', ['id'], unique=False)
+    op.create_index(op.f('ix_loan_prepayments_loan_id'), 'loan_prepayments', ['loan_id'], unique=False)
+
+    # Link EMI expenses to their loan installment
+    op.add_column('expenses', sa.Column('loan_id', sa.Integer(), nullable=True))
+    op.add_column('expenses', sa.Column('loan_installment', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_expenses_loan_id', 'expenses', 'loans', ['loan_id'], ['id'])
+    op.create_unique_constraint('uq_expenses_loan_installment', 'expenses', ['loan_id', 'loan_installment'])
+
+
+def downgrade():
+    op.drop_constraint('uq_expenses_loan_installment', 'expenses', type_='unique')
+    op.drop_constraint('fk_expenses_loan_id', 'expenses', type_='foreignkey')
+    op.drop_column('expenses', 'loan_installment')
+    op.drop_column('expenses', 'loan_id')
+    op.drop_index(op.f('ix_loan_prepayments_loan_id'), table_name='loan_prepayments')
+    op.drop_index(op.f('ix_loan_prepayments_id'), table_name='loan_prepayments')
+    op.drop_table('loan_prepayments')
+    op.drop_index('ix_loans_user_id', table_name='loans')
+    op.drop_index(op.f('ix_loans_id'), table_name='loans')
+    op.drop_table('loans')
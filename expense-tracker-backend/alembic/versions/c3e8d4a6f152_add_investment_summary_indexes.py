@@ -0,0 +1,26 @@
+"""Add indexes for the investment summary
+
+Revision ID: c3e8d4a6f152
+Revises: a91c5e7f3b20
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8d4a6f152'
+down_revision = 'a91c5e7f3b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_investments_user_date', 'investments', ['user_id', 'date'], unique=False)
+    op.create_index('ix_investments_user_status_maturity', 'investments', ['user_id', 'status', 'maturity_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_investments_user_status_maturity', table_name='investments')
+    op.drop_index('ix_investments_user_date', table_name='investments')
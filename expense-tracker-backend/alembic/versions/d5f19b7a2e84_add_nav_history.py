@@ -0,0 +1,42 @@
+"""Add NAV history and scheme codes on investments
+
+Revision ID: d5f19b7a2e84
+Revises: c3e8d4a6f152
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f19b7a2e84'
+down_revision = 'c3e8d4a6f152'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create nav_history table
+    op.create_table('nav_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scheme_code', sa.String(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('nav', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scheme_code', 'date', name='uq_nav_history_scheme_date')
+    )
+    op.create_index(op.f('ix_nav_history_id'), 'nav_history', ['id'], unique=False)
+
+    op.add_column('investments', sa.Column('scheme_code', sa.String(), nullable=True))
+    op.add_column('investments', sa.Column('nav_date', sa.Date(), nullable=True))
+    op.create_index('ix_investments_scheme_code', 'investments', ['scheme_code'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_investments_scheme_code', table_name='investments')
+    op.drop_column('investments', 'nav_date')
+    op.drop_column('investments', 'scheme_code')
+    op.drop_index(op.f('ix_nav_history_id'), table_name='nav_history')
+    op.drop_table('nav_history')
@@ -0,0 +1,45 @@
+"""Add the maturity calendar
+
+Revision ID: e7a2c4f81d36
+Revises: d5f19b7a2e84
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c4f81d36'
+down_revision = 'd5f19b7a2e84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create maturity_calendar table
+    op.create_table('maturity_calendar',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('investment_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('investment_type', sa.String(), nullable=False),
+        sa.Column('maturity_date', sa.Date(), nullable=False),
+        sa.Column('principal', sa.Float(), nullable=False),
+        sa.Column('interest_rate', sa.Float(), nullable=True),
+        sa.Column('projected_payout', sa.Float(), nullable=False),
+        sa.Column('payout_basis', sa.String(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['investment_id'], ['investments.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('investment_id')
+    )
+    op.create_index(op.f('ix_maturity_calendar_id'), 'maturity_calendar', ['id'], unique=False)
+    op.create_index('ix_maturity_calendar_user_date', 'maturity_calendar', ['user_id', 'maturity_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_maturity_calendar_user_date', table_name='maturity_calendar')
+    op.drop_index(op.f('ix_maturity_calendar_id'), table_name='maturity_calendar')
+    op.drop_table('maturity_calendar')
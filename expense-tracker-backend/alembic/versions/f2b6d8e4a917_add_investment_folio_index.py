@@ -0,0 +1,24 @@
+"""Add an index for de-duplicating investment imports
+
+Revision ID: f2b6d8e4a917
+Revises: e7a2c4f81d36
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d8e4a917'
+down_revision = 'e7a2c4f81d36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_investments_user_folio_date', 'investments', ['user_id', 'folio_number', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_investments_user_folio_date', table_name='investments')
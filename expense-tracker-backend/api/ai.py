@@ -1,4 +1,5 @@
 
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional, Tuple
@@ -7,54 +8,76 @@ import data_sources.models as models
 import schema.schemas as schemas
 from data_sources.database import get_db
 from auth import get_current_active_user
-from logic.ai_logic import forecaster
+from logic.forecast_engines import DEFAULT_ENGINE, check_engine
+from logic.model_registry import current_model_info
+from logic.training import train_user_model
+from logic import inference
+from data_sources.ai_data import get_monthly_category_totals, get_daily_category_totals, get_data_watermark
+from logic.forecast_common import MAX_HISTORY_DAYS
+from logic import hyperparameter_search
+from logic.forecast_precompute import stored_forecast, stored_insights
+from logic import admission
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/ai", tags=["AI Forecasting"])
 
-@router.post("/train", response_model=dict)
+def admitted(cost: float = 1.0):
+    """Dependency holding an admission slot for the user while the request runs
+    
+    Rejections carry a Retry-After header: 429 when the user's token bucket
+    is empty, 503 when the queue is full or the wait timed out.
+    """
+    async def dependency(current_user: models.User = Depends(get_current_active_user)):
+        if not admission.ADMISSION_ENABLED:
+            yield
+            return
+        try:
+            await admission.controller.acquire(current_user.id, cost)
+        except admission.AdmissionRejected as e:
+            detail = ("Too many AI requests. Please slow down." if e.status_code == 429
+                      else "AI service is busy. Please retry shortly.")
+            raise HTTPException(status_code=e.status_code, detail=detail,
+                                headers={"Retry-After": str(e.retry_after)})
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            admission.controller.release(time.monotonic() - started)
+    return dependency
+
+def _check_engine(engine: str):
+    """Reject unknown engine names with a 400"""
+    try:
+        check_engine(engine)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/train", response_model=dict, dependencies=[Depends(admitted(5))])
 def train_ai_model(
+    engine: str = DEFAULT_ENGINE,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Train the AI forecasting model on user's historical data"""
+    _check_engine(engine)
     try:
-        # Get user's expenses
-        expenses = db.query(models.Expense).filter(
-            models.Expense.user_id == current_user.id
-        ).all()
+        result = train_user_model(db, current_user.id, engine)
         
-        if not expenses:
+        if result.get('no_data'):
             raise HTTPException(
                 status_code=404, 
-                detail="No expenses found. Please add some expenses first."
+                detail=result['message']
             )
         
-        # Convert to dict format for AI module
-        expenses_data = []
-        for expense in expenses:
-            expense_dict = {
-                'id': expense.id,
-                'description': expense.description,
-                'amount': expense.amount,
-                'date': expense.date,
-                'category_name': expense.category.name if expense.category else 'Other',
-                'user_id': expense.user_id
-            }
-            expenses_data.append(expense_dict)
-        
-        # Train the model
-        result = forecaster.train_model(expenses_data)
-        
         if result['success']:
-            # Save the trained model
-            model_path = f"models/user_{current_user.id}_forecast_model.pkl"
-            forecaster.save_model(model_path)
+            version = result['version']
             
             return {
                 "message": "AI model trained successfully!",
+                "engine": engine,
                 "training_metrics": result['metrics'],
-                "model_saved": True
+                "model_saved": version is not None,
+                "model_version": version
             }
         else:
             raise HTTPException(
@@ -68,36 +91,84 @@ def train_ai_model(
             detail=f"Training failed: {str(e)}"
         )
 
-@router.get("/forecast", response_model=dict)
+@router.post("/tune", response_model=dict, dependencies=[Depends(admitted(5))])
+def tune_ai_model(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Start a background hyperparameter search for the forest model"""
+    if not hyperparameter_search.HPSEARCH_ENABLED:
+        raise HTTPException(
+            status_code=403,
+            detail="Hyperparameter search is disabled. Set AI_HPSEARCH_ENABLED=true to enable it."
+        )
+    
+    since = (datetime.now() - timedelta(days=MAX_HISTORY_DAYS)).date()
+    daily_totals = get_daily_category_totals(db, current_user.id, since=since)
+    if not daily_totals:
+        raise HTTPException(
+            status_code=404,
+            detail="No expenses found. Please add some expenses first."
+        )
+    
+    watermark = get_data_watermark(db, current_user.id)
+    scheduled = hyperparameter_search.schedule_search(current_user.id, daily_totals, watermark)
+    return {
+        "message": "Hyperparameter search started" if scheduled else "A search is already running",
+        "scheduled": scheduled,
+        "data_watermark": watermark
+    }
+
+@router.get("/tune", response_model=dict)
+def get_tuning_status(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Get the state of the hyperparameter search and the promoted configuration"""
+    watermark = get_data_watermark(db, current_user.id)
+    return {
+        "user_id": current_user.id,
+        **hyperparameter_search.search_status(current_user.id, watermark)
+    }
+
+@router.get("/forecast", response_model=dict, dependencies=[Depends(admitted(1))])
 def get_expense_forecast(
     months_ahead: int = 3,
+    engine: str = DEFAULT_ENGINE,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get AI-powered expense forecast for upcoming months"""
+    _check_engine(engine)
+    months_ahead = min(months_ahead, 12)  # Max 12 months ahead
     try:
-        # Check if model is trained
-        if not forecaster.is_trained:
-            # Try to load existing model
-            model_path = f"models/user_{current_user.id}_forecast_model.pkl"
-            if not forecaster.load_model(model_path):
-                raise HTTPException(
-                    status_code=400,
-                    detail="AI model not trained. Please train the model first using /ai/train endpoint."
-                )
-        
-        # Get predictions
-        result = forecaster.predict_monthly_expenses(
-            user_id=current_user.id,
-            db=db,
-            months_ahead=min(months_ahead, 12)  # Max 12 months ahead
-        )
+        # Serve the precomputed forecast while it matches the user's data and model
+        watermark = get_data_watermark(db, current_user.id)
+        result = stored_forecast(db, current_user.id, engine, months_ahead, watermark)
+        source = "precomputed"
+        if result is None:
+            # Get predictions from the user's current model, in process or from the sidecar
+            result = inference.predict_monthly_expenses(
+                user_id=current_user.id,
+                engine=engine,
+                db=db,
+                months_ahead=months_ahead
+            )
+            source = "on_demand"
+        if result is None:
+            raise HTTPException(
+                status_code=400,
+                detail="AI model not trained. Please train the model first using /ai/train endpoint."
+            )
         
         if result['success']:
             return {
                 "message": result['message'],
                 "predictions": result['predictions'],
-                "forecast_date": datetime.now().isoformat(),
+                "engine": engine,
+                "source": source,
+                "forecast_ms": result.get('forecast_ms'),
+                "forecast_date": (result.get('computed_at') or datetime.now()).isoformat(),
                 "user_id": current_user.id
             }
         else:
@@ -106,29 +177,79 @@ def get_expense_forecast(
                 detail=result['message']
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Forecast failed: {str(e)}"
         )
 
-@router.get("/insights", response_model=dict)
+@router.get("/forecast/categories", response_model=dict, dependencies=[Depends(admitted(2))])
+def get_category_forecast(
+    months_ahead: int = 3,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Get a per-category expense forecast for upcoming months"""
+    try:
+        monthly_totals = get_monthly_category_totals(db, current_user.id)
+        if not monthly_totals:
+            raise HTTPException(
+                status_code=404,
+                detail="No expenses found. Please add some expenses first."
+            )
+        
+        # Imported here so that workers which never serve this endpoint skip scikit-learn
+        from logic.category_forecaster import CategoryForecaster
+
+        # One fit and one predict cover every category
+        category_forecaster = CategoryForecaster()
+        training = category_forecaster.train_model(monthly_totals)
+        if not training['success']:
+            raise HTTPException(status_code=400, detail=training['message'])
+        
+        predictions = category_forecaster.forecast_months(min(months_ahead, 12))
+        return {
+            "message": f"Generated {len(predictions)} month predictions",
+            "predictions": predictions,
+            "categories": category_forecaster.categories,
+            "training_metrics": training['metrics'],
+            "forecast_date": datetime.now().isoformat(),
+            "user_id": current_user.id
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Category forecast failed: {str(e)}"
+        )
+
+@router.get("/insights", response_model=dict, dependencies=[Depends(admitted(1))])
 def get_spending_insights(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get AI-generated spending insights and recommendations"""
     try:
-        result = forecaster.get_spending_insights(
-            user_id=current_user.id,
-            db=db
-        )
+        watermark = get_data_watermark(db, current_user.id)
+        result = stored_insights(db, current_user.id, watermark)
+        source = "precomputed"
+        if result is None:
+            result = inference.get_spending_insights(
+                user_id=current_user.id,
+                db=db
+            )
+            source = "on_demand"
         
         if result['success']:
             return {
                 "message": result['message'],
                 "insights": result['insights'],
-                "generated_date": datetime.now().isoformat(),
+                "source": source,
+                "generated_date": (result.get('computed_at') or datetime.now()).isoformat(),
                 "user_id": current_user.id
             }
         else:
@@ -145,18 +266,24 @@ def get_spending_insights(
 
 @router.get("/status", response_model=dict)
 def get_ai_status(
+    engine: str = DEFAULT_ENGINE,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get AI model status and training information"""
+    _check_engine(engine)
     try:
-        model_path = f"models/user_{current_user.id}_forecast_model.pkl"
+        model_status = inference.get_model_status(current_user.id, engine)
+        model_info = current_model_info(current_user.id, engine)
         
         return {
             "user_id": current_user.id,
-            "model_trained": forecaster.is_trained,
-            "model_saved": forecaster.load_model(model_path) if not forecaster.is_trained else True,
-            "feature_columns": forecaster.feature_columns if forecaster.is_trained else [],
-            "last_training": "Unknown"  # Could be enhanced to track training dates
+            "engine": engine,
+            "model_trained": model_status is not None,
+            "model_saved": model_status is not None,
+            "model_version": model_info['version'] if model_info else None,
+            "feature_columns": model_status['feature_columns'] if model_status else [],
+            "training_config": model_status['training_config'] if model_status else None,
+            "last_training": model_info['saved_at'] if model_info else "Unknown"
         }
         
     except Exception as e:
@@ -168,3 +295,8 @@ def get_ai_status(
             "last_training": "Unknown",
             "error": str(e)
         }
+
+@router.get("/admission", response_model=dict)
+def get_admission_metrics(current_user: models.User = Depends(get_current_active_user)):
+    """Admission control metrics: queue depth, wait times and rejections"""
+    return admission.controller.metrics()
@@ -6,6 +6,8 @@ from datetime import datetime
 from sqlalchemy import func
 
 from data_sources.database import get_db
+from data_sources.feature_store import add_expense_to_rollups, remove_expense_from_rollups
+from data_sources.snapshot_store import delete_user_snapshots
 import data_sources.models as models
 import schema.schemas as schemas
 from auth import get_current_active_user
@@ -49,6 +51,8 @@ def create_expense(
         user_id=current_user.id
     )
     db.add(db_expense)
+    add_expense_to_rollups(db, db_expense)
+    delete_user_snapshots(db, current_user.id, db_expense.date)
     db.commit()
     db.refresh(db_expense)
     
@@ -166,8 +170,14 @@ def update_expense(
         # Remove category_name from update data since we're using category_id
         update_data.pop('category_name', None)
     
+    # Move the expense between feature rollups along with the update
+    remove_expense_from_rollups(db, db_expense)
+    old_date = db_expense.date
     for field, value in update_data.items():
         setattr(db_expense, field, value)
+    add_expense_to_rollups(db, db_expense)
+    # Net worth snapshots from the earlier of the two dates carry the old cumulative spend
+    delete_user_snapshots(db, current_user.id, min(old_date, db_expense.date))
     
     db.commit()
     db.refresh(db_expense)
@@ -203,6 +213,8 @@ def delete_expense(
     ).first()
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
+    remove_expense_from_rollups(db, db_expense)
+    delete_user_snapshots(db, current_user.id, db_expense.date)
     db.delete(db_expense)
     db.commit()
     return {"message": "Expense deleted successfully"}
@@ -1,109 +1,151 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, timedelta
+from typing import List, Optional
+from datetime import date, datetime, timedelta
 
 from data_sources.database import get_db
 import data_sources.models as models
 import schema.schemas as schemas
 from auth import get_current_active_user
+from data_sources.investment_data import (
+    get_investment_totals_by_type, get_recent_investments, get_investment_members_by_type, get_valuation_inputs
+)
+from data_sources.maturity_store import get_maturities, replace_investment_maturity
+from data_sources.snapshot_store import delete_user_snapshots
+from logic.portfolio_valuation import portfolio_performance
+from logic.sip_projection import get_projection
+from logic.maturity_calendar import upcoming_maturities, refresh_investment_maturity
+from logic.investment_import import import_investments
+from logic.interest_accrual import get_accruals, summarize_accruals
 
 router = APIRouter(prefix="/investments", tags=["investments"])
 
 @router.get("/summary", response_model=schemas.InvestmentSummary)
 def get_investments_summary(
+    include_members: bool = False,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Get investment summary for the current user"""
-    investments = db.query(models.Investment).filter(
-        models.Investment.user_id == current_user.id
-    ).all()
-
-    if not investments:
-        return schemas.InvestmentSummary(
-            total_investments=0,
-            total_amount=0.0,
-            total_sip_amount=0.0,
-            active_investments=0,
-            paused_investments=0,
-            completed_investments=0,
-            investments_by_type={},
-            recent_investments=[],
-            upcoming_maturities=[]
-        )
-
-    # Calculate totals
-    total_amount = sum(inv.amount for inv in investments)
-    total_sip_amount = sum(inv.sip_amount or 0 for inv in investments if inv.is_sip)
+    """Get investment summary for the current user
     
-    # Count by status
-    active_investments = len([inv for inv in investments if inv.status == "Active"])
-    paused_investments = len([inv for inv in investments if inv.status == "Paused"])
-    completed_investments = len([inv for inv in investments if inv.status in ["Completed", "Sold", "Matured"]])
-    
-    # Group by type
-    investments_by_type = {}
-    for inv in investments:
-        inv_type = inv.investment_type
-        if inv_type not in investments_by_type:
-            investments_by_type[inv_type] = {
-                "count": 0,
-                "total_amount": 0.0,
-                "investments": []
-            }
-        investments_by_type[inv_type]["count"] += 1
-        investments_by_type[inv_type]["total_amount"] += inv.amount
-        investments_by_type[inv_type]["investments"].append({
-            "id": inv.id,
-            "name": inv.name,
-            "amount": inv.amount,
-            "date": inv.date,
-            "status": inv.status
-        })
-
-    # Recent investments (last 5)
-    recent_investments = sorted(investments, key=lambda x: x.date, reverse=True)[:5]
-    recent_investments_data = [
-        {
-            "id": inv.id,
-            "name": inv.name,
-            "amount": inv.amount,
-            "date": inv.date,
-            "type": inv.investment_type,
-            "status": inv.status
-        }
-        for inv in recent_investments
-    ]
-
-    # Upcoming maturities (next 30 days)
-    today = datetime.now().date()
-    upcoming_maturities = [
-        {
-            "id": inv.id,
-            "name": inv.name,
-            "amount": inv.amount,
-            "maturity_date": inv.maturity_date,
-            "days_remaining": (inv.maturity_date - today).days
+    Totals come from one grouped query, recent investments from an indexed
+    query and maturities from the next INVESTMENT_MATURITY_SUMMARY_DAYS (90)
+    days of the maturity calendar. `interest_accrual` totals today's accrued
+    and maturity values of interest-bearing investments. Set
+    `include_members` to list each type's investments.
+    """
+    totals = get_investment_totals_by_type(db, current_user.id)
+
+    investments_by_type = {
+        row['investment_type']: {
+            "count": row['count'],
+            "total_amount": row['total_amount']
         }
-        for inv in investments
-        if inv.maturity_date and inv.maturity_date >= today and inv.status == "Active"
-    ]
-    upcoming_maturities.sort(key=lambda x: x["maturity_date"])
+        for row in totals
+    }
+    if include_members:
+        for inv_type, members in get_investment_members_by_type(db, current_user.id).items():
+            investments_by_type[inv_type]["investments"] = members
 
     return schemas.InvestmentSummary(
-        total_investments=len(investments),
-        total_amount=total_amount,
-        total_sip_amount=total_sip_amount,
-        active_investments=active_investments,
-        paused_investments=paused_investments,
-        completed_investments=completed_investments,
+        total_investments=sum(row['count'] for row in totals),
+        total_amount=sum(row['total_amount'] for row in totals),
+        total_sip_amount=sum(row['sip_amount'] for row in totals),
+        active_investments=sum(row['active'] for row in totals),
+        paused_investments=sum(row['paused'] for row in totals),
+        completed_investments=sum(row['completed'] for row in totals),
         investments_by_type=investments_by_type,
-        recent_investments=recent_investments_data,
-        upcoming_maturities=upcoming_maturities
+        recent_investments=get_recent_investments(db, current_user.id) if totals else [],
+        upcoming_maturities=upcoming_maturities(db, current_user.id, datetime.now().date()) if totals else [],
+        interest_accrual=summarize_accruals(get_accruals(db, current_user.id)) if totals else None
     )
 
+@router.get("/performance", response_model=schemas.InvestmentPerformance)
+def get_investments_performance(
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Current value, absolute return, CAGR and XIRR of each investment and the portfolio
+
+    Holdings with units and NAV are valued at market, interest-bearing ones
+    by compounding their rate, and the rest at the amount invested. CAGR and
+    XIRR are annual fractions (0.12 is 12%). With `as_of`, investments held on
+    that date are valued at the NAV history's latest NAV on or before it.
+    """
+    return portfolio_performance(get_valuation_inputs(db, current_user.id, as_of), as_of)
+
+@router.get("/projection", response_model=schemas.InvestmentProjection)
+def get_investments_projection(
+    months: int = 12,
+    annual_return: Optional[float] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Future SIP contributions and projected corpus by month and investment type
+
+    Holdings grow at their own interest rate, or at `annual_return` (a
+    fraction, 0.1 is 10%) when they have none. Results are cached until an
+    investment is added, edited or removed.
+    """
+    if annual_return is not None and not -1 < annual_return <= 1:
+        raise HTTPException(status_code=400, detail="annual_return must be a fraction between -1 and 1")
+    months = max(1, min(months, 600))  # Max 50 years ahead
+    return get_projection(db, current_user.id, months, annual_return)
+
+@router.get("/maturities", response_model=schemas.MaturityCalendar)
+def get_investments_maturities(
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Open investments maturing between `from` and `to`, with projected payouts
+
+    Defaults to the year starting today. Served from the maturity calendar,
+    which is kept current on investment writes and by the scheduler.
+    """
+    start = start or datetime.now().date()
+    end = end or start + timedelta(days=365)
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    maturities = get_maturities(db, current_user.id, start, end)
+    return schemas.MaturityCalendar(
+        start=start,
+        end=end,
+        maturities=maturities,
+        total_principal=sum(row['principal'] for row in maturities),
+        total_payout=sum(row['projected_payout'] for row in maturities)
+    )
+
+@router.post("/import", response_model=schemas.InvestmentImportResult)
+def import_investment_statement(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format"),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Import investments from a broker CSV or a consolidated account statement (CAS) text export
+
+    The file is parsed as it streams in; `format` is detected from its first
+    lines when omitted. Rows matching an existing or earlier row on
+    (folio_number, date, amount) are reported as duplicates, and the rest
+    are written in batches in a single transaction. `dry_run` reports
+    without saving.
+    """
+    if file_format is not None and file_format not in ("csv", "cas"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'cas'")
+
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    result = import_investments(db, current_user.id, lines, file_format=file_format, dry_run=dry_run)
+    if not result['success']:
+        raise HTTPException(status_code=400, detail=result['message'])
+    return result
+
 @router.post("/", response_model=schemas.Investment)
 def create_investment(
     investment: schemas.InvestmentCreate,
@@ -129,9 +171,13 @@ def create_investment(
         is_sip=investment.is_sip,
         sip_amount=investment.sip_amount,
         sip_frequency=investment.sip_frequency,
+        scheme_code=investment.scheme_code,
         user_id=current_user.id
     )
     db.add(db_investment)
+    db.flush()
+    refresh_investment_maturity(db, db_investment.id)
+    delete_user_snapshots(db, current_user.id, db_investment.date)
     db.commit()
     db.refresh(db_investment)
     return db_investment
@@ -155,14 +201,21 @@ def read_investment(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Get a specific investment by ID"""
+    """Get a specific investment by ID
+
+    Interest-bearing investments without a market price carry their
+    accrued interest and maturity value as of today in `accrual`.
+    """
     investment = db.query(models.Investment).filter(
         models.Investment.id == investment_id,
         models.Investment.user_id == current_user.id
     ).first()
     if investment is None:
         raise HTTPException(status_code=404, detail="Investment not found")
-    return investment
+    response = schemas.Investment.model_validate(investment)
+    accruals = get_accruals(db, current_user.id, investment.id)
+    response.accrual = schemas.InterestAccrual(**accruals[0]) if accruals else None
+    return response
 
 @router.put("/{investment_id}", response_model=schemas.Investment)
 def update_investment(
@@ -180,8 +233,13 @@ def update_investment(
         raise HTTPException(status_code=404, detail="Investment not found")
 
     update_data = investment.dict(exclude_unset=True)
+    old_date = db_investment.date
     for field, value in update_data.items():
         setattr(db_investment, field, value)
+    db.flush()
+    refresh_investment_maturity(db, db_investment.id)
+    # Net worth snapshots from the earlier of the two start dates valued the old holding
+    delete_user_snapshots(db, current_user.id, min(old_date, db_investment.date))
 
     db.commit()
     db.refresh(db_investment)
@@ -201,6 +259,8 @@ def delete_investment(
     if db_investment is None:
         raise HTTPException(status_code=404, detail="Investment not found")
 
+    replace_investment_maturity(db, db_investment.id, None)
+    delete_user_snapshots(db, current_user.id, db_investment.date)
     db.delete(db_investment)
     db.commit()
     return {"message": "Investment deleted successfully"}
@@ -0,0 +1,211 @@
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from datetime import date, datetime
+
+from data_sources.database import get_db
+import data_sources.models as models
+import schema.schemas as schemas
+from auth import get_current_active_user
+from data_sources.loan_data import get_loan_inputs, get_prepayments, get_linked_installments, unlink_loan_expenses
+from logic.loans import (
+    PREPAYMENT_STRATEGIES, loan_schedules, loan_balances, simulate_prepayments, sync_emi_expenses
+)
+
+router = APIRouter(prefix="/loans", tags=["loans"])
+
+# Longest tenure accepted, in months
+MAX_TENURE_MONTHS = 600
+
+def _validate_loan(loan: Dict):
+    if loan['principal'] <= 0:
+        raise HTTPException(status_code=400, detail="principal must be positive")
+    if not 0 <= loan['interest_rate'] < 100:
+        raise HTTPException(status_code=400, detail="interest_rate must be a yearly percentage from 0 to 100")
+    if not 1 <= loan['tenure_months'] <= MAX_TENURE_MONTHS:
+        raise HTTPException(status_code=400, detail=f"tenure_months must be from 1 to {MAX_TENURE_MONTHS}")
+    if loan['prepayment_strategy'] not in PREPAYMENT_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"prepayment_strategy must be one of {', '.join(PREPAYMENT_STRATEGIES)}")
+
+def _get_loan(db: Session, loan_id: int, user_id: int) -> models.Loan:
+    loan = db.query(models.Loan).filter(models.Loan.id == loan_id, models.Loan.user_id == user_id).first()
+    if loan is None:
+        raise HTTPException(status_code=404, detail="Loan not found")
+    return loan
+
+def _with_balances(db: Session, loans: List[models.Loan], as_of: date) -> List[schemas.Loan]:
+    """Loan responses carrying their balance as of `as_of`, computed for all loans at once"""
+    ids = [loan.id for loan in loans]
+    balances = loan_balances(get_loan_inputs(db, loan_ids=ids), get_prepayments(db, ids), as_of)
+    responses = []
+    for loan in loans:
+        response = schemas.Loan.model_validate(loan)
+        response.balance = balances.get(loan.id)
+        responses.append(response)
+    return responses
+
+@router.post("/", response_model=schemas.Loan)
+def create_loan(
+    loan: schemas.LoanCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Create a loan; with track_expenses, EMIs already due are recorded as Housing expenses"""
+    _validate_loan(loan.dict())
+    db_loan = models.Loan(**loan.dict(), user_id=current_user.id)
+    db.add(db_loan)
+    db.flush()
+    sync_emi_expenses(db, datetime.now().date(), loan_ids=[db_loan.id])
+    db.commit()
+    db.refresh(db_loan)
+    return _with_balances(db, [db_loan], datetime.now().date())[0]
+
+@router.get("/", response_model=List[schemas.Loan])
+def read_loans(
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Every loan of the current user with its outstanding balance as of `as_of` (today)"""
+    loans = db.query(models.Loan).filter(models.Loan.user_id == current_user.id).order_by(models.Loan.id).all()
+    return _with_balances(db, loans, as_of or datetime.now().date())
+
+@router.get("/{loan_id}", response_model=schemas.Loan)
+def read_loan(
+    loan_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Get a specific loan with its balance as of today"""
+    return _with_balances(db, [_get_loan(db, loan_id, current_user.id)], datetime.now().date())[0]
+
+@router.put("/{loan_id}", response_model=schemas.Loan)
+def update_loan(
+    loan_id: int,
+    loan: schemas.LoanUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Update a loan; EMIs already recorded as expenses keep their amounts"""
+    db_loan = _get_loan(db, loan_id, current_user.id)
+    for field, value in loan.dict(exclude_unset=True).items():
+        setattr(db_loan, field, value)
+    _validate_loan({field: getattr(db_loan, field) for field in schemas.LoanBase.model_fields})
+    db.flush()
+    sync_emi_expenses(db, datetime.now().date(), loan_ids=[db_loan.id])
+    db.commit()
+    db.refresh(db_loan)
+    return _with_balances(db, [db_loan], datetime.now().date())[0]
+
+@router.delete("/{loan_id}")
+def delete_loan(
+    loan_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Delete a loan and its prepayments; its EMI expenses stay as plain expenses"""
+    db_loan = _get_loan(db, loan_id, current_user.id)
+    unlink_loan_expenses(db, db_loan.id)
+    db.delete(db_loan)
+    db.commit()
+    return {"message": "Loan deleted successfully"}
+
+@router.get("/{loan_id}/schedule", response_model=schemas.LoanSchedule)
+def get_loan_schedule(
+    loan_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Every installment until repayment, with recorded prepayments applied
+
+    Installments recorded as expenses carry the expense's id.
+    """
+    _get_loan(db, loan_id, current_user.id)
+    schedule = loan_schedules(get_loan_inputs(db, loan_ids=[loan_id]), get_prepayments(db, [loan_id]))[loan_id]
+    linked = get_linked_installments(db, [loan_id])
+    for row in schedule['rows']:
+        row['expense_id'] = linked.get((loan_id, row['installment']))
+    return schemas.LoanSchedule(loan_id=loan_id, **schedule)
+
+@router.get("/{loan_id}/balance", response_model=schemas.LoanBalance)
+def get_loan_balance(
+    loan_id: int,
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Repaid and outstanding amounts after the installments due by `as_of` (today)"""
+    _get_loan(db, loan_id, current_user.id)
+    as_of = as_of or datetime.now().date()
+    return loan_balances(get_loan_inputs(db, loan_ids=[loan_id]), get_prepayments(db, [loan_id]), as_of)[loan_id]
+
+@router.post("/{loan_id}/simulate", response_model=schemas.PrepaymentSimulation)
+def simulate_loan_prepayments(
+    loan_id: int,
+    simulation: schemas.PrepaymentSimulationRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Compare the loan as recorded with the same loan plus hypothetical prepayments; nothing is saved"""
+    _get_loan(db, loan_id, current_user.id)
+    if simulation.strategy is not None and simulation.strategy not in PREPAYMENT_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"strategy must be one of {', '.join(PREPAYMENT_STRATEGIES)}")
+    if any(prepayment.amount <= 0 for prepayment in simulation.prepayments):
+        raise HTTPException(status_code=400, detail="Prepayment amounts must be positive")
+
+    loan = get_loan_inputs(db, loan_ids=[loan_id])[0]
+    extra = [{'loan_id': loan_id, 'date': p.date, 'amount': p.amount} for p in simulation.prepayments]
+    return simulate_prepayments(loan, get_prepayments(db, [loan_id]), extra, simulation.strategy)
+
+@router.post("/{loan_id}/prepayments", response_model=schemas.LoanPrepayment)
+def create_loan_prepayment(
+    loan_id: int,
+    prepayment: schemas.LoanPrepaymentCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Record a prepayment; later installments follow the loan's prepayment strategy"""
+    db_loan = _get_loan(db, loan_id, current_user.id)
+    if prepayment.amount <= 0:
+        raise HTTPException(status_code=400, detail="Prepayment amount must be positive")
+    db_prepayment = models.LoanPrepayment(loan_id=db_loan.id, date=prepayment.date, amount=prepayment.amount)
+    db.add(db_prepayment)
+    db.flush()
+    sync_emi_expenses(db, datetime.now().date(), loan_ids=[db_loan.id])
+    db.commit()
+    db.refresh(db_prepayment)
+    return db_prepayment
+
+@router.delete("/{loan_id}/prepayments/{prepayment_id}")
+def delete_loan_prepayment(
+    loan_id: int,
+    prepayment_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Delete a recorded prepayment"""
+    _get_loan(db, loan_id, current_user.id)
+    deleted = db.query(models.LoanPrepayment).filter(
+        models.LoanPrepayment.id == prepayment_id,
+        models.LoanPrepayment.loan_id == loan_id
+    ).delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Prepayment not found")
+    db.commit()
+    return {"message": "Prepayment deleted successfully"}
+
+@router.post("/{loan_id}/sync-expenses", response_model=schemas.EmiExpenseSync)
+def sync_loan_expenses(
+    loan_id: int,
+    through: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Record EMIs due by `through` (today) as Housing expenses, linking matching ones already entered"""
+    db_loan = _get_loan(db, loan_id, current_user.id)
+    if not db_loan.track_expenses:
+        raise HTTPException(status_code=400, detail="Expense tracking is off for this loan")
+    result = sync_emi_expenses(db, through or datetime.now().date(), loan_ids=[loan_id])
+    db.commit()
+    return result
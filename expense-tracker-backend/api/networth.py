@@ -0,0 +1,33 @@
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime, timedelta
+
+from data_sources.database import get_db
+import data_sources.models as models
+import schema.schemas as schemas
+from auth import get_current_active_user
+from logic.networth import TIMELINE_DEFAULT_DAYS, get_timeline
+
+router = APIRouter(prefix="/networth", tags=["networth"])
+
+@router.get("/timeline", response_model=schemas.NetworthTimeline)
+def get_networth_timeline(
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Daily invested amount, portfolio value and cumulative spend between `from` and `to`
+
+    Defaults to the year ending today. Served from the daily portfolio
+    snapshots, so the cost grows with the days asked for, not with the
+    number of investments or expenses.
+    """
+    end = end or datetime.now().date()
+    start = start or end - timedelta(days=TIMELINE_DEFAULT_DAYS)
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    return schemas.NetworthTimeline(start=start, end=end, points=get_timeline(db, current_user.id, start, end))
@@ -1,6 +1,6 @@
 
 from sqlalchemy.orm import Session
-from data_sources.models import Expense, Category
+from data_sources.models import Expense, Category, ExpenseDailyRollup
 from typing import List, Dict
 
 def get_expenses_for_forecasting(db: Session, user_id: int) -> List[Dict]:
@@ -20,20 +20,9 @@ def get_expenses_for_forecasting(db: Session, user_id: int) -> List[Dict]:
     return expenses_data
 
 def get_recent_expenses_for_insights(db: Session, user_id: int, days: int = 90) -> List[Dict]:
-    """Retrieve user's recent expenses for AI insights"""
+    """Retrieve user's recent per-day, per-category totals for AI insights"""
     from datetime import datetime, timedelta
-    recent_expenses = db.query(Expense).filter(
-        Expense.user_id == user_id,
-        Expense.date >= datetime.now() - timedelta(days=days)
-    ).all()
-    expenses_data = []
-    for exp in recent_expenses:
-        expenses_data.append({
-            'amount': exp.amount,
-            'category_name': exp.category.name if exp.category else 'Other',
-            'date': exp.date
-        })
-    return expenses_data
+    return get_daily_category_totals(db, user_id, since=(datetime.now() - timedelta(days=days)).date())
 
 def get_similar_months_expenses(db: Session, user_id: int, month: int, year: int) -> List[Dict]:
     """Retrieve historical data for similar months for forecasting"""
@@ -51,3 +40,92 @@ def get_similar_months_expenses(db: Session, user_id: int, month: int, year: int
             'category_name': exp.category.name if exp.category else 'Other'
         })
     return expenses_data
+
+def get_monthly_category_totals(db: Session, user_id: int) -> List[Dict]:
+    """Retrieve per-month, per-category expense totals from the daily rollups"""
+    from datetime import datetime
+    from sqlalchemy import func, extract
+    year = extract('year', ExpenseDailyRollup.date)
+    month = extract('month', ExpenseDailyRollup.date)
+    rows = db.query(
+        year.label('year'),
+        month.label('month'),
+        Category.name.label('category_name'),
+        func.sum(ExpenseDailyRollup.amount).label('amount')
+    ).join(Category, ExpenseDailyRollup.category_id == Category.id).filter(
+        ExpenseDailyRollup.user_id == user_id
+    ).group_by(year, month, Category.name).all()
+    # Each total is dated at the start of its month
+    return [{
+        'date': datetime(int(row.year), int(row.month), 1),
+        'amount': float(row.amount),
+        'category_name': row.category_name
+    } for row in rows]
+
+def get_daily_category_totals(db: Session, user_id: int, since=None) -> List[Dict]:
+    """Retrieve per-day, per-category expense totals and counts from the daily rollups"""
+    query = db.query(
+        ExpenseDailyRollup.date,
+        Category.name.label('category_name'),
+        ExpenseDailyRollup.amount,
+        ExpenseDailyRollup.expense_count
+    ).join(Category, ExpenseDailyRollup.category_id == Category.id).filter(
+        ExpenseDailyRollup.user_id == user_id
+    )
+    if since is not None:
+        query = query.filter(ExpenseDailyRollup.date >= since)
+    rows = query.order_by(ExpenseDailyRollup.date).all()
+    return [{
+        'date': row.date,
+        'category_name': row.category_name,
+        'amount': float(row.amount),
+        'count': int(row.expense_count)
+    } for row in rows]
+
+def _format_watermark(count, max_id, last_created, last_updated) -> str:
+    return f"{count}:{max_id or 0}:{last_created or ''}:{last_updated or ''}"
+
+def get_data_watermark(db: Session, user_id: int) -> str:
+    """Fingerprint of a user's expenses that changes whenever one is added, edited or removed"""
+    from sqlalchemy import func
+    return _format_watermark(*db.query(
+        func.count(Expense.id),
+        func.max(Expense.id),
+        func.max(Expense.created_at),
+        func.max(Expense.updated_at)
+    ).filter(Expense.user_id == user_id).one())
+
+def get_data_watermarks(db: Session, user_ids: List[int]) -> Dict[int, str]:
+    """`get_data_watermark` for several users in one grouped query"""
+    from sqlalchemy import func
+    rows = db.query(
+        Expense.user_id,
+        func.count(Expense.id),
+        func.max(Expense.id),
+        func.max(Expense.created_at),
+        func.max(Expense.updated_at)
+    ).filter(Expense.user_id.in_(user_ids)).group_by(Expense.user_id).all()
+    watermarks = {user_id: _format_watermark(0, None, None, None) for user_id in user_ids}
+    for user_id, *values in rows:
+        watermarks[user_id] = _format_watermark(*values)
+    return watermarks
+
+def get_active_user_ids(db: Session, days: int) -> List[int]:
+    """Active users with at least one expense dated in the last `days` days"""
+    from datetime import datetime, timedelta
+    from data_sources.models import User
+    since = (datetime.now() - timedelta(days=days)).date()
+    rows = db.query(ExpenseDailyRollup.user_id).join(User, ExpenseDailyRollup.user_id == User.id).filter(
+        User.is_active == "active",
+        ExpenseDailyRollup.date >= since
+    ).distinct().order_by(ExpenseDailyRollup.user_id).all()
+    return [row.user_id for row in rows]
+
+def get_recently_active_user_ids(db: Session, limit: int) -> List[int]:
+    """Users whose expenses changed most recently, most recent first"""
+    from sqlalchemy import func
+    last_change = func.max(ExpenseDailyRollup.updated_at)
+    rows = db.query(ExpenseDailyRollup.user_id).group_by(ExpenseDailyRollup.user_id).order_by(
+        last_change.desc()
+    ).limit(limit).all()
+    return [row.user_id for row in rows]
@@ -0,0 +1,103 @@
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List
+from sqlalchemy.dialects import postgresql, sqlite
+from data_sources.models import Expense, ExpenseDailyRollup
+
+_UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def apply_expense_delta(db: Session, user_id: int, day, category_id: int, amount: float, count: int):
+    """Add an amount and expense count to one (user, day, category) rollup row
+
+    Runs inside the caller's transaction, so the rollup commits together with
+    the expense write that caused it. Rows whose count drops to zero are removed.
+    """
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(ExpenseDailyRollup).values(
+            user_id=user_id, date=day, category_id=category_id,
+            amount=amount, expense_count=count
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date', 'category_id'],
+            set_={
+                'amount': ExpenseDailyRollup.amount + stmt.excluded.amount,
+                'expense_count': ExpenseDailyRollup.expense_count + stmt.excluded.expense_count,
+                'updated_at': func.now()
+            }
+        ))
+    else:
+        rollup = db.query(ExpenseDailyRollup).filter(
+            ExpenseDailyRollup.user_id == user_id,
+            ExpenseDailyRollup.date == day,
+            ExpenseDailyRollup.category_id == category_id
+        ).with_for_update().first()
+        if rollup is None:
+            db.add(ExpenseDailyRollup(user_id=user_id, date=day, category_id=category_id,
+                                      amount=amount, expense_count=count))
+        else:
+            rollup.amount += amount
+            rollup.expense_count += count
+        db.flush()
+
+    if count < 0:
+        db.query(ExpenseDailyRollup).filter(
+            ExpenseDailyRollup.user_id == user_id,
+            ExpenseDailyRollup.date == day,
+            ExpenseDailyRollup.category_id == category_id,
+            ExpenseDailyRollup.expense_count <= 0
+        ).delete(synchronize_session=False)
+
+def add_expense_to_rollups(db: Session, expense: Expense):
+    """Count a new or updated expense in its day's rollup"""
+    apply_expense_delta(db, expense.user_id, expense.date, expense.category_id, expense.amount, 1)
+
+def remove_expense_from_rollups(db: Session, expense: Expense):
+    """Take an expense's current values out of its day's rollup"""
+    apply_expense_delta(db, expense.user_id, expense.date, expense.category_id, -expense.amount, -1)
+
+def rebuild_user_rollups(db: Session, user_id: int) -> int:
+    """Recompute every rollup row of a user from the expenses table"""
+    db.query(ExpenseDailyRollup).filter(
+        ExpenseDailyRollup.user_id == user_id
+    ).delete(synchronize_session=False)
+    rows = db.query(
+        Expense.date,
+        Expense.category_id,
+        func.sum(Expense.amount),
+        func.count(Expense.id)
+    ).filter(Expense.user_id == user_id).group_by(Expense.date, Expense.category_id).all()
+    db.add_all([
+        ExpenseDailyRollup(user_id=user_id, date=day, category_id=category_id,
+                           amount=float(amount), expense_count=int(count))
+        for day, category_id, amount, count in rows
+    ])
+    db.commit()
+    return len(rows)
+
+def find_rollup_drift(db: Session, tolerance: float = 0.01) -> List[int]:
+    """Users whose rollup rows no longer match their expenses
+
+    Compares per-user totals of both tables in two grouped queries; a user
+    is reported when counts differ or amounts differ by more than `tolerance`.
+    """
+    expected = {
+        user_id: (float(amount or 0), int(count))
+        for user_id, amount, count in db.query(
+            Expense.user_id, func.sum(Expense.amount), func.count(Expense.id)
+        ).group_by(Expense.user_id).all()
+    }
+    actual = {
+        user_id: (float(amount or 0), int(count or 0))
+        for user_id, amount, count in db.query(
+            ExpenseDailyRollup.user_id, func.sum(ExpenseDailyRollup.amount), func.sum(ExpenseDailyRollup.expense_count)
+        ).group_by(ExpenseDailyRollup.user_id).all()
+    }
+    drifted = []
+    for user_id in sorted(set(expected) | set(actual)):
+        expected_amount, expected_count = expected.get(user_id, (0.0, 0))
+        actual_amount, actual_count = actual.get(user_id, (0.0, 0))
+        if expected_count != actual_count or abs(expected_amount - actual_amount) > tolerance:
+            drifted.append(user_id)
+    return drifted
@@ -0,0 +1,73 @@
+
+import json
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+from data_sources.models import Forecast, InsightSnapshot
+from typing import List, Dict, Optional
+
+def get_stored_forecasts(db: Session, user_id: int, engine: str, from_month: date) -> List[Dict]:
+    """Stored forecast rows for an engine from `from_month` on, oldest month first"""
+    rows = db.query(Forecast).filter(
+        Forecast.user_id == user_id,
+        Forecast.engine == engine,
+        Forecast.month >= from_month
+    ).order_by(Forecast.month).all()
+    return [{
+        'month': row.month,
+        'amount': row.amount,
+        'p10': row.p10,
+        'p50': row.p50,
+        'p90': row.p90,
+        'model_version': row.model_version,
+        'data_watermark': row.data_watermark,
+        'computed_at': row.computed_at
+    } for row in rows]
+
+def replace_forecasts(db: Session, user_id: int, engine: str, predictions: List[Dict],
+                      model_version: Optional[int], watermark: str):
+    """Swap a user's stored forecasts for an engine within the caller's transaction"""
+    db.query(Forecast).filter(Forecast.user_id == user_id, Forecast.engine == engine).delete(
+        synchronize_session=False
+    )
+    db.add_all([Forecast(
+        user_id=user_id,
+        engine=engine,
+        month=date(prediction['year'], prediction['month'], 1),
+        amount=prediction['predicted_amount'],
+        p10=prediction['p10'],
+        p50=prediction['p50'],
+        p90=prediction['p90'],
+        model_version=model_version,
+        data_watermark=watermark
+    ) for prediction in predictions])
+
+def get_stored_insights(db: Session, user_id: int) -> Optional[Dict]:
+    """A user's stored insights with the watermark and time they were computed from"""
+    row = db.query(InsightSnapshot).filter(InsightSnapshot.user_id == user_id).first()
+    if row is None:
+        return None
+    return {
+        'insights': json.loads(row.insights),
+        'data_watermark': row.data_watermark,
+        'computed_at': row.computed_at
+    }
+
+def save_insights(db: Session, user_id: int, insights: List[Dict], watermark: str):
+    """Store a user's insights within the caller's transaction
+
+    `computed_at` is set from the application clock, which is what
+    freshness checks compare it against.
+    """
+    row = db.query(InsightSnapshot).filter(InsightSnapshot.user_id == user_id).first()
+    if row is None:
+        row = InsightSnapshot(user_id=user_id)
+        db.add(row)
+    row.insights = json.dumps(insights)
+    row.data_watermark = watermark
+    row.computed_at = datetime.now()
+
+def delete_past_forecasts(db: Session, before_month: date) -> int:
+    """Remove stored forecasts for months before `before_month`"""
+    deleted = db.query(Forecast).filter(Forecast.month < before_month).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,143 @@
+
+from datetime import date
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from data_sources.models import Investment, NavHistory
+from data_sources.nav_data import latest_nav_date
+from typing import List, Dict, Optional
+
+COMPLETED_STATUSES = ("Completed", "Sold", "Matured")
+
+def get_investment_totals_by_type(db: Session, user_id: int) -> List[Dict]:
+    """Per-type counts and sums of a user's investments from one grouped query
+
+    Status counts and the SIP total are aggregate FILTER clauses, so the
+    table is read once.
+    """
+    rows = db.query(
+        Investment.investment_type,
+        func.count(Investment.id),
+        func.sum(Investment.amount),
+        func.sum(Investment.sip_amount).filter(Investment.is_sip.is_(True)),
+        func.count(Investment.id).filter(Investment.status == "Active"),
+        func.count(Investment.id).filter(Investment.status == "Paused"),
+        func.count(Investment.id).filter(Investment.status.in_(COMPLETED_STATUSES))
+    ).filter(Investment.user_id == user_id).group_by(Investment.investment_type).all()
+    return [{
+        'investment_type': investment_type,
+        'count': count,
+        'total_amount': float(total or 0),
+        'sip_amount': float(sip or 0),
+        'active': active,
+        'paused': paused,
+        'completed': completed
+    } for investment_type, count, total, sip, active, paused, completed in rows]
+
+def get_recent_investments(db: Session, user_id: int, limit: int = 5) -> List[Dict]:
+    """A user's latest investments by date"""
+    rows = db.query(
+        Investment.id, Investment.name, Investment.amount, Investment.date,
+        Investment.investment_type, Investment.status
+    ).filter(Investment.user_id == user_id).order_by(
+        Investment.date.desc(), Investment.id.desc()
+    ).limit(limit).all()
+    return [{
+        'id': row.id,
+        'name': row.name,
+        'amount': row.amount,
+        'date': row.date,
+        'type': row.investment_type,
+        'status': row.status
+    } for row in rows]
+
+def get_investment_members_by_type(db: Session, user_id: int) -> Dict[str, List[Dict]]:
+    """A user's investments grouped under their type"""
+    rows = db.query(
+        Investment.id, Investment.name, Investment.amount, Investment.date,
+        Investment.status, Investment.investment_type
+    ).filter(Investment.user_id == user_id).order_by(Investment.id).all()
+    members: Dict[str, List[Dict]] = {}
+    for row in rows:
+        members.setdefault(row.investment_type, []).append({
+            'id': row.id,
+            'name': row.name,
+            'amount': row.amount,
+            'date': row.date,
+            'status': row.status
+        })
+    return members
+
+def get_valuation_inputs(db: Session, user_id: int, as_of: Optional[date] = None) -> List[Dict]:
+    """The columns portfolio valuation needs for each of a user's investments
+
+    With `as_of`, only investments started by then are returned, and those
+    with a scheme code carry the NAV history's latest NAV on or before it.
+    """
+    nav = Investment.nav if as_of is None else func.coalesce(NavHistory.nav, Investment.nav)
+
+    query = db.query(
+        Investment.id, Investment.name, Investment.investment_type, Investment.status, Investment.amount,
+        Investment.date, Investment.units, nav.label('nav'), Investment.interest_rate, Investment.frequency,
+        Investment.maturity_date, Investment.is_sip, Investment.sip_amount, Investment.sip_frequency,
+        Investment.scheme_code
+    ).filter(Investment.user_id == user_id)
+    if as_of is not None:
+        query = query.outerjoin(NavHistory, and_(
+            NavHistory.scheme_code == Investment.scheme_code,
+            NavHistory.date == latest_nav_date(as_of)
+        )).filter(Investment.date <= as_of)
+    rows = query.order_by(Investment.id).all()
+    return [row._asdict() for row in rows]
+
+def get_accrual_inputs(db: Session, user_id: int, investment_id: Optional[int] = None) -> List[Dict]:
+    """The columns interest accrual needs for a user's interest-bearing investments without a market price
+
+    A Core select, as this runs on every summary read over possibly
+    thousands of deposits.
+    """
+    query = select(
+        Investment.id, Investment.investment_type, Investment.amount, Investment.date,
+        Investment.interest_rate, Investment.frequency, Investment.maturity_date
+    ).where(
+        Investment.user_id == user_id,
+        Investment.interest_rate.isnot(None),
+        or_(Investment.units.is_(None), Investment.nav.is_(None))
+    )
+    if investment_id is not None:
+        query = query.where(Investment.id == investment_id)
+    result = db.execute(query.order_by(Investment.id))
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+def get_existing_investment_keys(db: Session, user_id: int, rows: List[Dict]) -> List[tuple]:
+    """(folio_number, name, date, amount) of a user's investments that could duplicate `rows`
+
+    One query over the batch's date range and folios (or names, for rows
+    without a folio), served by the (user_id, folio_number, date) index.
+    """
+    if not rows:
+        return []
+    folios = {row['folio_number'] for row in rows if row['folio_number']}
+    names = {row['name'] for row in rows if not row['folio_number']}
+    matches = []
+    if folios:
+        matches.append(Investment.folio_number.in_(folios))
+    if names:
+        matches.append(and_(Investment.folio_number.is_(None), Investment.name.in_(names)))
+    return db.query(
+        Investment.folio_number, Investment.name, Investment.date, Investment.amount
+    ).filter(
+        Investment.user_id == user_id,
+        Investment.date >= min(row['date'] for row in rows),
+        Investment.date <= max(row['date'] for row in rows),
+        or_(*matches)
+    ).all()
+
+def mark_matured_investments(db: Session, today: date) -> int:
+    """Set Active investments whose maturity date has passed to Matured, within the caller's transaction"""
+    updated = db.query(Investment).filter(
+        Investment.status == "Active",
+        Investment.maturity_date.isnot(None),
+        Investment.maturity_date <= today
+    ).update({Investment.status: "Matured"}, synchronize_session=False)
+    return updated
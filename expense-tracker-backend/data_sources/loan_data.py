@@ -0,0 +1,71 @@
+
+from datetime import date
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from data_sources.models import Category, Expense, Loan, LoanPrepayment
+from typing import List, Dict, Optional, Tuple
+
+def get_loan_inputs(db: Session, user_id: Optional[int] = None, loan_ids: Optional[List[int]] = None,
+                    tracked_only: bool = False) -> List[Dict]:
+    """The columns amortization needs for each matching loan"""
+    query = db.query(
+        Loan.id, Loan.user_id, Loan.name, Loan.principal, Loan.interest_rate, Loan.tenure_months,
+        Loan.start_date, Loan.prepayment_strategy, Loan.track_expenses
+    )
+    if user_id is not None:
+        query = query.filter(Loan.user_id == user_id)
+    if loan_ids is not None:
+        query = query.filter(Loan.id.in_(loan_ids))
+    if tracked_only:
+        query = query.filter(Loan.track_expenses.is_(True))
+    return [row._asdict() for row in query.order_by(Loan.id).all()]
+
+def get_prepayments(db: Session, loan_ids: List[int]) -> List[Dict]:
+    """Recorded prepayments of the given loans, oldest first"""
+    if not loan_ids:
+        return []
+    rows = db.query(LoanPrepayment.loan_id, LoanPrepayment.date, LoanPrepayment.amount).filter(
+        LoanPrepayment.loan_id.in_(loan_ids)
+    ).order_by(LoanPrepayment.date, LoanPrepayment.id).all()
+    return [row._asdict() for row in rows]
+
+def get_linked_installments(db: Session, loan_ids: List[int]) -> Dict[Tuple[int, int], int]:
+    """(loan_id, installment) -> id of the expense recording that EMI"""
+    if not loan_ids:
+        return {}
+    rows = db.query(Expense.loan_id, Expense.loan_installment, Expense.id).filter(
+        Expense.loan_id.in_(loan_ids)
+    ).all()
+    return {(loan_id, installment): expense_id for loan_id, installment, expense_id in rows}
+
+def get_category_by_name(db: Session, user_id: int, name: str) -> Optional[Category]:
+    """A user's category with this name, ignoring case"""
+    return db.query(Category).filter(
+        Category.user_id == user_id,
+        func.lower(Category.name) == name.lower()
+    ).order_by(Category.id).first()
+
+def get_unlinked_expenses(db: Session, user_id: int, category_id: int, start: date, end: date) -> List[Tuple]:
+    """(id, date, amount) of a category's expenses in a date range that no loan claims yet"""
+    return db.query(Expense.id, Expense.date, Expense.amount).filter(
+        Expense.user_id == user_id,
+        Expense.category_id == category_id,
+        Expense.loan_id.is_(None),
+        Expense.date >= start,
+        Expense.date <= end
+    ).order_by(Expense.date, Expense.id).all()
+
+def link_expenses(db: Session, links: List[Dict]):
+    """Set loan_id and loan_installment on existing expenses within the caller's transaction"""
+    for link in links:
+        db.query(Expense).filter(Expense.id == link['id']).update({
+            Expense.loan_id: link['loan_id'],
+            Expense.loan_installment: link['loan_installment']
+        }, synchronize_session=False)
+
+def unlink_loan_expenses(db: Session, loan_id: int):
+    """Detach a loan's EMI expenses, keeping them as plain expenses, within the caller's transaction"""
+    db.query(Expense).filter(Expense.loan_id == loan_id).update({
+        Expense.loan_id: None,
+        Expense.loan_installment: None
+    }, synchronize_session=False)
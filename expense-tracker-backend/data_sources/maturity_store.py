@@ -0,0 +1,64 @@
+
+from datetime import date
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from data_sources.models import Investment, MaturityCalendar
+from data_sources.investment_data import COMPLETED_STATUSES
+from typing import List, Dict, Optional
+
+def get_maturity_inputs(db: Session, user_id: Optional[int] = None,
+                        investment_id: Optional[int] = None) -> List[Dict]:
+    """Open investments with a maturity date and the columns their payouts need"""
+    query = db.query(
+        Investment.id, Investment.user_id, Investment.name, Investment.investment_type, Investment.amount,
+        Investment.date, Investment.units, Investment.nav, Investment.interest_rate, Investment.frequency,
+        Investment.maturity_date, Investment.is_sip, Investment.sip_amount, Investment.sip_frequency
+    ).filter(
+        Investment.maturity_date.isnot(None),
+        or_(Investment.status.is_(None), Investment.status.notin_(COMPLETED_STATUSES))
+    )
+    if user_id is not None:
+        query = query.filter(Investment.user_id == user_id)
+    if investment_id is not None:
+        query = query.filter(Investment.id == investment_id)
+    return [row._asdict() for row in query.all()]
+
+def replace_maturities(db: Session, rows: List[Dict], user_id: Optional[int] = None):
+    """Swap the calendar rows of one user, or of everyone, within the caller's transaction"""
+    query = db.query(MaturityCalendar)
+    if user_id is not None:
+        query = query.filter(MaturityCalendar.user_id == user_id)
+    query.delete(synchronize_session=False)
+    db.bulk_insert_mappings(MaturityCalendar, rows)
+
+def replace_investment_maturity(db: Session, investment_id: int, row: Optional[Dict]):
+    """Swap one investment's calendar row, or remove it, within the caller's transaction"""
+    db.query(MaturityCalendar).filter(MaturityCalendar.investment_id == investment_id).delete(
+        synchronize_session=False
+    )
+    if row is not None:
+        db.add(MaturityCalendar(**row))
+
+def get_maturities(db: Session, user_id: int, start: date, end: date,
+                   status: Optional[str] = None) -> List[Dict]:
+    """A user's calendar rows maturing between two dates, soonest first, optionally only investments in `status`"""
+    query = db.query(MaturityCalendar).filter(
+        MaturityCalendar.user_id == user_id,
+        MaturityCalendar.maturity_date >= start,
+        MaturityCalendar.maturity_date <= end
+    )
+    if status is not None:
+        query = query.join(Investment, Investment.id == MaturityCalendar.investment_id).filter(
+            Investment.status == status
+        )
+    rows = query.order_by(MaturityCalendar.maturity_date, MaturityCalendar.investment_id).all()
+    return [{
+        'investment_id': row.investment_id,
+        'name': row.name,
+        'investment_type': row.investment_type,
+        'maturity_date': row.maturity_date,
+        'principal': row.principal,
+        'interest_rate': row.interest_rate,
+        'projected_payout': row.projected_payout,
+        'payout_basis': row.payout_basis
+    } for row in rows]
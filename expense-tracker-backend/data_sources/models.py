@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Date, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Date, Text, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -40,6 +40,10 @@ class Category(Base):
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # An EMI is linked to at most one expense
+        UniqueConstraint("loan_id", "loan_installment", name="uq_expenses_loan_installment"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     description = Column(String, nullable=False, index=True)
@@ -48,6 +52,8 @@ class Expense(Base):
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     notes = Column(String, nullable=True)
+    loan_id = Column(Integer, ForeignKey("loans.id"), nullable=True)  # Set on EMI payments
+    loan_installment = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -57,6 +63,15 @@ class Expense(Base):
 
 class Investment(Base):
     __tablename__ = "investments"
+    __table_args__ = (
+        # Recent investments in the summary, and a user's maturing investments
+        Index("ix_investments_user_date", "user_id", "date"),
+        Index("ix_investments_user_status_maturity", "user_id", "status", "maturity_date"),
+        # Set-based revaluation from nav_history
+        Index("ix_investments_scheme_code", "scheme_code"),
+        # Duplicate checks when importing statements
+        Index("ix_investments_user_folio_date", "user_id", "folio_number", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -70,6 +85,8 @@ class Investment(Base):
     folio_number = Column(String, nullable=True)
     units = Column(Float, nullable=True)  # For mutual funds, stocks
     nav = Column(Float, nullable=True)  # Net Asset Value
+    scheme_code = Column(String, nullable=True)  # AMFI scheme code, for NAVs from nav_history
+    nav_date = Column(Date, nullable=True)  # Date of `nav` when it came from nav_history
     maturity_date = Column(Date, nullable=True)
     interest_rate = Column(Float, nullable=True)
     frequency = Column(String, nullable=True)  # Monthly, Quarterly, etc.
@@ -83,3 +100,137 @@ class Investment(Base):
 
     # Relationships
     user = relationship("User", back_populates="investments")
+
+class ExpenseDailyRollup(Base):
+    __tablename__ = "expense_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", "category_id", name="uq_expense_daily_rollups_user_date_category"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    amount = Column(Float, nullable=False, default=0.0)
+    expense_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Forecast(Base):
+    __tablename__ = "forecasts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "engine", "month", name="uq_forecasts_user_engine_month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    engine = Column(String, nullable=False)
+    month = Column(Date, nullable=False)  # First day of the forecast month
+    amount = Column(Float, nullable=False)
+    p10 = Column(Float, nullable=False)
+    p50 = Column(Float, nullable=False)
+    p90 = Column(Float, nullable=False)
+    model_version = Column(Integer, nullable=True)
+    data_watermark = Column(String, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class InsightSnapshot(Base):
+    __tablename__ = "insight_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
+    insights = Column(Text, nullable=False)  # JSON list of insights
+    data_watermark = Column(String, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class TaskRun(Base):
+    __tablename__ = "task_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_name = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False)  # running, success, failed, abandoned
+    worker = Column(String, nullable=False)  # host:pid that ran the task
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    details = Column(Text, nullable=True)  # JSON summary returned by the task
+    error = Column(Text, nullable=True)
+
+class NavHistory(Base):
+    __tablename__ = "nav_history"
+    __table_args__ = (
+        # One NAV per scheme and day; also the range-scan index for as-of lookups
+        UniqueConstraint("scheme_code", "date", name="uq_nav_history_scheme_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scheme_code = Column(String, nullable=False)  # AMFI scheme code
+    date = Column(Date, nullable=False)
+    nav = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class MaturityCalendar(Base):
+    __tablename__ = "maturity_calendar"
+    __table_args__ = (
+        # Date-range reads per user
+        Index("ix_maturity_calendar_user_date", "user_id", "maturity_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    investment_id = Column(Integer, ForeignKey("investments.id"), nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)
+    investment_type = Column(String, nullable=False)
+    maturity_date = Column(Date, nullable=False)
+    principal = Column(Float, nullable=False)
+    interest_rate = Column(Float, nullable=True)
+    projected_payout = Column(Float, nullable=False)
+    payout_basis = Column(String, nullable=False)  # interest, market_value, principal
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PortfolioSnapshot(Base):
+    __tablename__ = "portfolio_snapshots"
+    __table_args__ = (
+        # One row per user and day; also the range-scan index for timelines
+        UniqueConstraint("user_id", "date", name="uq_portfolio_snapshots_user_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    invested = Column(Float, nullable=False)
+    current_value = Column(Float, nullable=False)
+    cumulative_spend = Column(Float, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Loan(Base):
+    __tablename__ = "loans"
+    __table_args__ = (
+        Index("ix_loans_user_id", "user_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)
+    lender = Column(String, nullable=True)
+    principal = Column(Float, nullable=False)
+    interest_rate = Column(Float, nullable=False)  # Annual, percent
+    tenure_months = Column(Integer, nullable=False)
+    start_date = Column(Date, nullable=False)  # Disbursement; EMIs fall due monthly from a month later
+    prepayment_strategy = Column(String, nullable=False, default="reduce_tenure")  # reduce_tenure, reduce_emi
+    track_expenses = Column(Boolean, nullable=False, default=True)  # Record EMIs as Housing expenses
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    prepayments = relationship("LoanPrepayment", back_populates="loan", cascade="all, delete-orphan",
+                               order_by="LoanPrepayment.date")
+
+class LoanPrepayment(Base):
+    __tablename__ = "loan_prepayments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    loan_id = Column(Integer, ForeignKey("loans.id"), nullable=False, index=True)
+    date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    loan = relationship("Loan", back_populates="prepayments")
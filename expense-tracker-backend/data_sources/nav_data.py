@@ -0,0 +1,119 @@
+
+import io
+import csv
+from datetime import date, timedelta
+from sqlalchemy import and_, func, or_, select, text, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.dialects import postgresql, sqlite
+from data_sources.models import Investment, NavHistory
+from typing import List, Optional, Tuple
+
+_UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def _copy_nav_rows(db: Session, rows: List[Tuple[str, date, float]]):
+    """COPY rows into a session-local staging table, then upsert them in one statement"""
+    db.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS nav_staging "
+        "(scheme_code text, date date, nav double precision) ON COMMIT DROP"
+    ))
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert("COPY nav_staging (scheme_code, date, nav) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+    db.execute(text(
+        "INSERT INTO nav_history (scheme_code, date, nav) "
+        "SELECT scheme_code, date, nav FROM nav_staging "
+        "ON CONFLICT (scheme_code, date) DO UPDATE SET nav = EXCLUDED.nav, updated_at = now() "
+        "WHERE nav_history.nav IS DISTINCT FROM EXCLUDED.nav"
+    ))
+    db.execute(text("TRUNCATE nav_staging"))
+
+def load_nav_rows(db: Session, rows: List[Tuple[str, date, float]]):
+    """Insert or update (scheme_code, date, nav) rows in the caller's transaction
+
+    Postgres loads through COPY and a staging table; SQLite upserts with
+    executemany. Rows must be unique on (scheme_code, date).
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _copy_nav_rows(db, rows)
+        return
+
+    insert = _UPSERT_DIALECTS.get(dialect)
+    if insert is not None:
+        # A Core insert skips the ORM's per-row bookkeeping, about a third of the load time
+        stmt = insert(NavHistory.__table__)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['scheme_code', 'date'],
+            set_={'nav': stmt.excluded.nav, 'updated_at': func.now()}
+        ), [{'scheme_code': code, 'date': day, 'nav': nav} for code, day, nav in rows])
+    else:
+        for code, day, nav in rows:
+            existing = db.query(NavHistory).filter(
+                NavHistory.scheme_code == code, NavHistory.date == day
+            ).first()
+            if existing is None:
+                db.add(NavHistory(scheme_code=code, date=day, nav=nav))
+            else:
+                existing.nav = nav
+        db.flush()
+
+def latest_nav_date(as_of: date):
+    """Date of the latest NAV on or before `as_of` for the enclosing query's investment"""
+    prices = aliased(NavHistory)
+    return select(func.max(prices.date)).where(
+        prices.scheme_code == Investment.scheme_code,
+        prices.date <= as_of
+    ).scalar_subquery()
+
+def get_nav_series(db: Session, user_id: int, start: date, end: date) -> List[Tuple[str, date, float]]:
+    """(scheme_code, date, nav) from `start` to `end` of every scheme a user holds
+
+    Each scheme's latest NAV before `start` is included too, found with one
+    index probe per holding, so the series can be carried forward from the
+    first day. Rows are in no particular order.
+    """
+    held = select(Investment.scheme_code).where(
+        Investment.user_id == user_id, Investment.scheme_code.isnot(None)
+    ).distinct()
+    in_range = select(NavHistory.scheme_code, NavHistory.date, NavHistory.nav).where(
+        NavHistory.scheme_code.in_(held),
+        NavHistory.date >= start,
+        NavHistory.date <= end
+    )
+    prior = select(NavHistory.scheme_code, NavHistory.date, NavHistory.nav).join(Investment, and_(
+        NavHistory.scheme_code == Investment.scheme_code,
+        NavHistory.date == latest_nav_date(start - timedelta(days=1))
+    )).where(Investment.user_id == user_id).distinct()
+    return db.execute(in_range.union(prior)).all()
+
+def revalue_investments(db: Session, as_of: date, user_id: Optional[int] = None) -> int:
+    """Set every scheme-coded investment's NAV to the latest one on or before `as_of`
+
+    One UPDATE with correlated subqueries, each an index probe on
+    (scheme_code, date). Only investments whose NAV or NAV date changes are
+    written, so unchanged portfolios keep their version.
+    """
+    prices = aliased(NavHistory)
+    latest_date = latest_nav_date(as_of)
+    latest_nav = select(prices.nav).where(
+        prices.scheme_code == Investment.scheme_code,
+        prices.date <= as_of
+    ).order_by(prices.date.desc()).limit(1).scalar_subquery()
+
+    stmt = update(Investment).where(
+        Investment.scheme_code.isnot(None),
+        latest_date.isnot(None),
+        or_(Investment.nav_date.is_distinct_from(latest_date), Investment.nav.is_distinct_from(latest_nav))
+    ).values(nav=latest_nav, nav_date=latest_date)
+    if user_id is not None:
+        stmt = stmt.where(Investment.user_id == user_id)
+    updated = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    return updated
@@ -0,0 +1,135 @@
+
+from datetime import date
+from sqlalchemy import func, insert, union_all, select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from data_sources.models import ExpenseDailyRollup, Investment, NavHistory, PortfolioSnapshot
+from typing import List, Dict, Optional, Tuple
+
+_UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def get_history_start(db: Session, user_id: int) -> Optional[date]:
+    """The day of a user's first investment or expense, or None if they have neither"""
+    first_investment = db.query(func.min(Investment.date)).filter(Investment.user_id == user_id).scalar()
+    first_expense = db.query(func.min(ExpenseDailyRollup.date)).filter(
+        ExpenseDailyRollup.user_id == user_id
+    ).scalar()
+    days = [day for day in (first_investment, first_expense) if day is not None]
+    return min(days) if days else None
+
+def get_snapshot_user_ids(db: Session) -> List[int]:
+    """Users with any investments or expenses, the ones that get snapshots"""
+    users = union_all(
+        select(Investment.user_id).distinct(),
+        select(ExpenseDailyRollup.user_id).distinct()
+    ).subquery()
+    return [user_id for (user_id,) in db.query(users.c.user_id).distinct().order_by(users.c.user_id).all()]
+
+def get_last_snapshot_dates(db: Session, user_id: Optional[int] = None) -> Dict[int, date]:
+    """The latest snapshot day of one user, or of every user"""
+    query = db.query(PortfolioSnapshot.user_id, func.max(PortfolioSnapshot.date))
+    if user_id is not None:
+        query = query.filter(PortfolioSnapshot.user_id == user_id)
+    return dict(query.group_by(PortfolioSnapshot.user_id).all())
+
+def get_daily_spend(db: Session, user_id: int, start: date, end: date) -> Tuple[float, List[Tuple[date, float]]]:
+    """A user's total spend before `start`, and (day, amount) spent on each day from `start` to `end`
+
+    Both come from the expense daily rollups.
+    """
+    before = db.query(func.sum(ExpenseDailyRollup.amount)).filter(
+        ExpenseDailyRollup.user_id == user_id,
+        ExpenseDailyRollup.date < start
+    ).scalar()
+    days = db.query(ExpenseDailyRollup.date, func.sum(ExpenseDailyRollup.amount)).filter(
+        ExpenseDailyRollup.user_id == user_id,
+        ExpenseDailyRollup.date >= start,
+        ExpenseDailyRollup.date <= end
+    ).group_by(ExpenseDailyRollup.date).all()
+    return float(before or 0), [(day, float(amount)) for day, amount in days]
+
+def upsert_snapshots(db: Session, rows: List[Dict]):
+    """Insert or overwrite (user_id, date) snapshot rows within the caller's transaction"""
+    if not rows:
+        return
+    upsert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        stmt = upsert(PortfolioSnapshot.__table__)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_={
+                'invested': stmt.excluded.invested,
+                'current_value': stmt.excluded.current_value,
+                'cumulative_spend': stmt.excluded.cumulative_spend,
+                'computed_at': func.now()
+            }
+        ), rows)
+    else:
+        days = [row['date'] for row in rows]
+        for user_id in {row['user_id'] for row in rows}:
+            db.query(PortfolioSnapshot).filter(
+                PortfolioSnapshot.user_id == user_id,
+                PortfolioSnapshot.date >= min(days),
+                PortfolioSnapshot.date <= max(days)
+            ).delete(synchronize_session=False)
+        db.execute(insert(PortfolioSnapshot.__table__), rows)
+
+def delete_user_snapshots(db: Session, user_id: int, start: Optional[date] = None):
+    """Remove a user's snapshots, or those from `start` on, within the caller's transaction
+
+    Call with the earliest day a change affects; the next timeline read or
+    scheduler run recomputes the removed days.
+    """
+    query = db.query(PortfolioSnapshot).filter(PortfolioSnapshot.user_id == user_id)
+    if start is not None:
+        query = query.filter(PortfolioSnapshot.date >= start)
+    query.delete(synchronize_session=False)
+
+def delete_scheme_snapshots(db: Session, scheme_starts: Dict[str, date]):
+    """Remove the snapshots of each scheme's holders from that scheme's `start` on
+
+    Holdings dated before their scheme's first NAV are valued at their
+    stored NAV until then, which revaluation moves to the latest price, so
+    their holders lose snapshots from the holding's date instead. Holders
+    of several changed schemes lose them from the earliest of these days;
+    users sharing a day go in one DELETE.
+    """
+    if not scheme_starts:
+        return
+    holdings = db.query(Investment.user_id, Investment.scheme_code, func.min(Investment.date)).filter(
+        Investment.scheme_code.isnot(None)
+    ).group_by(Investment.user_id, Investment.scheme_code).all()
+    holdings = [holding for holding in holdings if holding[1] in scheme_starts]
+    if not holdings:
+        return
+    first_navs = dict(db.query(NavHistory.scheme_code, func.min(NavHistory.date)).filter(
+        NavHistory.scheme_code.in_({scheme_code for _, scheme_code, _ in holdings})
+    ).group_by(NavHistory.scheme_code).all())
+
+    starts: Dict[int, date] = {}
+    for user_id, scheme_code, first_held in holdings:
+        start = scheme_starts[scheme_code]
+        if first_held < first_navs.get(scheme_code, first_held):
+            start = min(start, first_held)
+        if user_id not in starts or start < starts[user_id]:
+            starts[user_id] = start
+    users_by_start: Dict[date, List[int]] = {}
+    for user_id, start in starts.items():
+        users_by_start.setdefault(start, []).append(user_id)
+    for start, user_ids in users_by_start.items():
+        db.query(PortfolioSnapshot).filter(
+            PortfolioSnapshot.user_id.in_(user_ids),
+            PortfolioSnapshot.date >= start
+        ).delete(synchronize_session=False)
+
+def get_snapshots(db: Session, user_id: int, start: date, end: date) -> List[Dict]:
+    """A user's snapshots from `start` to `end`, oldest first"""
+    rows = db.query(
+        PortfolioSnapshot.date, PortfolioSnapshot.invested, PortfolioSnapshot.current_value,
+        PortfolioSnapshot.cumulative_spend
+    ).filter(
+        PortfolioSnapshot.user_id == user_id,
+        PortfolioSnapshot.date >= start,
+        PortfolioSnapshot.date <= end
+    ).order_by(PortfolioSnapshot.date).all()
+    return [row._asdict() for row in rows]
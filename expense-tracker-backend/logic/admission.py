@@ -0,0 +1,223 @@
+"""
+Admission Control
+Per-user token buckets, a global concurrency limit and a round-robin queue for expensive AI requests
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("AI_ADMISSION_ENABLED", "true").lower() == "true"
+# Requests running at once across all users; queued requests wait without holding a worker thread
+ADMISSION_MAX_CONCURRENT = int(os.getenv("AI_ADMISSION_MAX_CONCURRENT", "2"))
+ADMISSION_MAX_QUEUE = int(os.getenv("AI_ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_MAX_QUEUE_PER_USER = int(os.getenv("AI_ADMISSION_MAX_QUEUE_PER_USER", "4"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+# Token bucket per user: burst capacity and refill rate, in request cost units. The
+# burst covers a first session: training both engines (5 each), a forecast of each (1)
+# and a category forecast (2)
+ADMISSION_BURST = float(os.getenv("AI_ADMISSION_BURST", "15"))
+ADMISSION_REFILL_PER_MINUTE = float(os.getenv("AI_ADMISSION_REFILL_PER_MINUTE", "30"))
+
+class AdmissionRejected(Exception):
+    """A request turned away, with the HTTP status and seconds until a retry may succeed"""
+
+    def __init__(self, reason: str, status_code: int, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class TokenBucket:
+    """Refills continuously up to `capacity` at `rate` tokens per second
+
+    Queued requests hold `reserved` tokens, which later requests cannot
+    claim, and only take them once admitted; a request turned away from
+    the queue or timing out in it leaves the bucket as it was.
+    """
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'reserved', 'updated')
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.reserved = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, cost: float) -> float:
+        """Seconds until `cost` tokens beyond those reserved are available; 0 if they are now"""
+        self._refill(time.monotonic())
+        needed = cost + self.reserved - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / self.rate if self.rate > 0 else float('inf')
+
+    def take(self, cost: float, reserved: bool = False):
+        """Take `cost` tokens, checked available by `wait_for`, releasing them from reservation"""
+        self._refill(time.monotonic())
+        self.tokens -= cost
+        if reserved:
+            self.reserved -= cost
+
+    def full_at(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and not self.reserved
+
+class AdmissionController:
+    """Admits at most `max_concurrent` requests at once, serving queued users in turn
+
+    Every method runs on the event loop, so state needs no locks. Waiting
+    requests are futures rather than threads, which keeps the worker's
+    thread pool free for CRUD requests while AI requests queue.
+    """
+
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+                 max_queue: int = ADMISSION_MAX_QUEUE,
+                 max_queue_per_user: int = ADMISSION_MAX_QUEUE_PER_USER,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                 burst: float = ADMISSION_BURST,
+                 refill_per_minute: float = ADMISSION_REFILL_PER_MINUTE):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.burst = burst
+        self.refill_rate = refill_per_minute / 60
+        self.running = 0
+        self._buckets: Dict[int, TokenBucket] = {}
+        # user_id -> waiting futures, in the round-robin order users are served
+        self._queues: "OrderedDict[int, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self.admitted = 0
+        self.rejected = {'rate_limited': 0, 'queue_full': 0, 'queue_timeout': 0}
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._service_times: Deque[float] = deque(maxlen=1000)
+
+    def _bucket(self, user_id: int) -> TokenBucket:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                # Forget users whose buckets have refilled; a new bucket starts full anyway
+                now = time.monotonic()
+                self._buckets = {uid: b for uid, b in self._buckets.items() if not b.full_at(now)}
+            bucket = self._buckets[user_id] = TokenBucket(self.burst, self.refill_rate)
+        return bucket
+
+    def _estimated_wait(self, ahead: int) -> float:
+        service = sum(self._service_times) / len(self._service_times) if self._service_times else 1.0
+        return service * (ahead + 1) / self.max_concurrent
+
+    def _reject(self, reason: str, status_code: int, retry_after: float):
+        self.rejected[reason] += 1
+        raise AdmissionRejected(reason, status_code, retry_after)
+
+    async def acquire(self, user_id: int, cost: float = 1.0) -> float:
+        """Wait for a slot for `user_id` and return the seconds spent waiting
+
+        Raises AdmissionRejected when the user's bucket is empty (429), or the
+        queue is full or the wait times out (503). Tokens are only taken once
+        the request is admitted.
+        """
+        bucket = self._bucket(user_id)
+        wait = bucket.wait_for(cost)
+        if wait > 0:
+            self._reject('rate_limited', 429, wait)
+
+        if self.running < self.max_concurrent and not self._queued:
+            bucket.take(cost)
+            self.running += 1
+            self._record_admission(0.0)
+            return 0.0
+
+        user_queue = self._queues.get(user_id)
+        if self._queued >= self.max_queue or (user_queue and len(user_queue) >= self.max_queue_per_user):
+            self._reject('queue_full', 503, self._estimated_wait(self._queued))
+
+        future = asyncio.get_running_loop().create_future()
+        if user_queue is None:
+            user_queue = self._queues[user_id] = deque()
+        user_queue.append(future)
+        self._queued += 1
+        bucket.reserved += cost
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            bucket.reserved -= cost
+            if future.done() and not future.cancelled():
+                # Granted just as the wait ended: hand the slot on
+                self.release(0.0)
+            else:
+                future.cancel()
+                self._forget(user_id, future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject('queue_timeout', 503, self._estimated_wait(self._queued))
+
+        bucket.take(cost, reserved=True)
+        waited = time.monotonic() - started
+        self._record_admission(waited)
+        return waited
+
+    def _forget(self, user_id: int, future: asyncio.Future):
+        user_queue = self._queues.get(user_id)
+        if user_queue is not None and future in user_queue:
+            user_queue.remove(future)
+            self._queued -= 1
+            if not user_queue:
+                del self._queues[user_id]
+
+    def _record_admission(self, waited: float):
+        self.admitted += 1
+        self._waits.append(waited)
+
+    def release(self, service_seconds: float):
+        """Free a slot and grant it to the next user in round-robin order"""
+        if service_seconds:
+            self._service_times.append(service_seconds)
+        while self._queues:
+            user_id, user_queue = next(iter(self._queues.items()))
+            future = user_queue.popleft()
+            self._queued -= 1
+            # Move the user to the back so every waiting user gets a turn
+            del self._queues[user_id]
+            if user_queue:
+                self._queues[user_id] = user_queue
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def metrics(self) -> Dict:
+        """Queue depth, running requests, wait times and rejection counts"""
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            'enabled': ADMISSION_ENABLED,
+            'max_concurrent': self.max_concurrent,
+            'running': self.running,
+            'queue_depth': self._queued,
+            'queued_users': len(self._queues),
+            'admitted': self.admitted,
+            'rejected': dict(self.rejected),
+            'wait_ms': {'p50': percentile(0.5), 'p99': percentile(0.99), 'max': percentile(1.0)},
+            'mean_service_ms': round(sum(self._service_times) / len(self._service_times) * 1000, 1)
+            if self._service_times else 0.0
+        }
+
+controller = AdmissionController()
@@ -3,18 +3,22 @@ AI-Powered Expense Forecasting System
 Uses machine learning to predict monthly expenses based on historical patterns
 """
 
+import time
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
 from sqlalchemy.orm import Session
-from data_sources.ai_data import get_expenses_for_forecasting, get_recent_expenses_for_insights, get_similar_months_expenses
+from data_sources.ai_data import get_recent_expenses_for_insights
+from logic.model_sizing import fit_forest_within_budget
+from logic.compact_forest import CompactForest, CompactScaler, save_compact, load_compact
+from logic.forecast_common import MAX_HISTORY_DAYS, MAX_TRAINING_SAMPLES, future_months, interval_confidence
+from logic.forecast_engines import forecast_history
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,25 +26,79 @@ warnings.filterwarnings('ignore')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def aggregate_daily_totals(expenses_data: List[Dict]) -> List[Dict]:
+    """Collapse raw expenses into per-day, per-category totals and counts"""
+    df = pd.DataFrame(expenses_data)
+    df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    daily = df.groupby(['date', 'category_name'], sort=True)['amount'].agg(['sum', 'size']).reset_index()
+    return [{
+        'date': row.date,
+        'category_name': row.category_name,
+        'amount': float(row.sum),
+        'count': int(row.size)
+    } for row in daily.itertuples(index=False)]
+
+def category_codes_for(category_names) -> Dict[str, int]:
+    """Stable integer code per category name, shared by training and forecasting"""
+    return {name: code for code, name in enumerate(sorted(set(category_names)))}
+
+# Default RandomForestRegressor settings for the forest engine
+DEFAULT_MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'random_state': 42,
+    'n_jobs': -1
+}
+
+# Settings that fix the forest's size; without them it is sized adaptively
+FOREST_SIZE_PARAMS = ('n_estimators', 'max_depth')
+
+def fixes_forest_size(model_params: Optional[Dict]) -> bool:
+    """Whether `model_params` pins the forest's size rather than leaving it to adaptive sizing"""
+    return any(key in (model_params or {}) for key in FOREST_SIZE_PARAMS)
+
 class ExpenseForecaster:
     """AI-powered expense forecasting system"""
     
-    def __init__(self):
+    engine = 'forest'
+    
+    def __init__(self, model_params: Optional[Dict] = None):
+        self.model_params = {**DEFAULT_MODEL_PARAMS, **(model_params or {})}
+        # Unless its size is given, the forest is sized to the data and budget;
+        # other settings such as n_jobs still apply
+        self.adaptive = not fixes_forest_size(model_params)
+        self.training_config = None
         self.model = None
         self.scaler = StandardScaler()
         self.is_trained = False
+        # Reference points of the trained features
+        self.start_date = None
+        self.category_codes = {}
         self.feature_columns = [
             'month', 'day_of_month', 'day_of_week', 'is_weekend',
             'days_since_start', 'category_encoded', 'amount_log'
         ]
         
-    def prepare_features(self, expenses_data: List[Dict]) -> pd.DataFrame:
-        """Prepare features from expense data for machine learning"""
-        if not expenses_data:
+    def prepare_daily_features(self, daily_totals: List[Dict], start_date=None,
+                               category_codes: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+        """Prepare one feature row per day from per-day, per-category totals
+        
+        `start_date` and `category_codes` default to the first day and the
+        categories of `daily_totals`.
+        """
+        if not daily_totals:
             return pd.DataFrame()
             
-        df = pd.DataFrame(expenses_data)
-        df['date'] = pd.to_datetime(df['date'])
+        rows = pd.DataFrame(daily_totals)
+        rows['date'] = pd.to_datetime(rows['date'])
+        
+        # Collapse categories: day total, expense count and dominant category
+        rows = rows.sort_values(['date', 'amount'], ascending=[True, False], kind='stable')
+        df = rows.groupby('date', sort=True).agg(
+            amount=('amount', 'sum'),
+            count=('count', 'sum'),
+            category_name=('category_name', 'first')
+        ).reset_index()
         
         # Extract temporal features
         df['month'] = df['date'].dt.month
@@ -49,89 +107,115 @@ class ExpenseForecaster:
         df['is_weekend'] = df['date'].dt.dayofweek.isin([5, 6]).astype(int)
         
         # Calculate days since tracking started
-        start_date = df['date'].min()
+        start_date = df['date'].min() if start_date is None else pd.Timestamp(start_date)
         df['days_since_start'] = (df['date'] - start_date).dt.days
         
         # Encode categories
-        category_mapping = {cat: idx for idx, cat in enumerate(df['category_name'].unique())}
-        df['category_encoded'] = df['category_name'].map(category_mapping)
+        if category_codes is None:
+            category_codes = category_codes_for(rows['category_name'])
+        df['category_encoded'] = df['category_name'].map(category_codes)
         
-        # Log transform amount for better distribution
-        df['amount_log'] = np.log1p(df['amount'])
-        
-        # Select only feature columns
-        feature_df = df[self.feature_columns].copy()
+        # Log transform the day's average expense for better distribution
+        df['amount_log'] = np.log1p(df['amount'] / df['count'])
         
         # Handle missing values
-        feature_df = feature_df.fillna(0)
+        df[self.feature_columns] = df[self.feature_columns].fillna(0)
         
-        return feature_df
+        return df
+    
+    def build_training_set(self, daily_totals: List[Dict],
+                           max_history_days: int = MAX_HISTORY_DAYS,
+                           max_samples: int = MAX_TRAINING_SAMPLES,
+                           start_date=None,
+                           category_codes: Optional[Dict[str, int]] = None) -> Optional[pd.DataFrame]:
+        """Daily feature rows with their next-day target, bounded in time and count"""
+        df = self.prepare_daily_features(daily_totals, start_date, category_codes)
+        if df.empty:
+            return None
+        
+        # Bound the history window
+        window_start = df['date'].max() - pd.Timedelta(days=max_history_days)
+        df = df[df['date'] >= window_start].copy()
+        
+        # Create target: next day's total expense
+        df['next_day_amount'] = df['amount'].shift(-1)
+        
+        # Remove rows with missing targets and cap the sample count
+        return df.dropna(subset=['next_day_amount']).tail(max_samples)
     
     def train_model(self, expenses_data: List[Dict]) -> Dict:
         """Train the forecasting model on historical expense data"""
+        if len(expenses_data) < 10:
+            return {
+                'success': False,
+                'message': 'Need at least 10 expenses to train the model',
+                'metrics': {}
+            }
+        return self.train_on_daily_totals(aggregate_daily_totals(expenses_data))
+    
+    def train_on_daily_totals(self, daily_totals: List[Dict],
+                              max_history_days: int = MAX_HISTORY_DAYS,
+                              max_samples: int = MAX_TRAINING_SAMPLES,
+                              model_params: Optional[Dict] = None) -> Dict:
+        """Train the forecasting model on per-day, per-category expense totals
+        
+        Only the last `max_history_days` days before the latest expense are
+        used and at most the `max_samples` most recent days become training
+        rows, so fit cost is bounded however many expenses a user logs.
+        `model_params` that set the size, such as a tuned configuration, fit
+        that fixed forest instead of sizing one adaptively.
+        """
         try:
-            if len(expenses_data) < 10:
+            if sum(row['count'] for row in daily_totals) < 10:
                 return {
                     'success': False,
                     'message': 'Need at least 10 expenses to train the model',
                     'metrics': {}
                 }
             
-            # Prepare features
-            feature_df = self.prepare_features(expenses_data)
-            if feature_df.empty:
+            # Fix the feature reference points, then prepare features and targets
+            start_date = pd.to_datetime(min(row['date'] for row in daily_totals))
+            category_codes = category_codes_for(row['category_name'] for row in daily_totals)
+            df = self.build_training_set(daily_totals, max_history_days, max_samples,
+                                         start_date, category_codes)
+            if df is None:
                 return {
                     'success': False,
                     'message': 'Failed to prepare features',
                     'metrics': {}
                 }
             
-            # Prepare target (next day's total expense)
-            df = pd.DataFrame(expenses_data)
-            df['date'] = pd.to_datetime(df['date'])
-            daily_expenses = df.groupby('date')['amount'].sum().reset_index()
-            daily_expenses = daily_expenses.sort_values('date')
-            
-            # Create target: next day's total expense
-            daily_expenses['next_day_amount'] = daily_expenses['amount'].shift(-1)
-            
-            # Merge features with targets
-            feature_df['date'] = df['date'].dt.date
-            merged_df = feature_df.merge(daily_expenses[['date', 'next_day_amount']], 
-                                       left_on='date', right_on='date', how='left')
-            
-            # Remove rows with missing targets
-            merged_df = merged_df.dropna(subset=['next_day_amount'])
-            
-            if len(merged_df) < 5:
+            if len(df) < 5:
                 return {
                     'success': False,
                     'message': 'Insufficient data for training after feature preparation',
                     'metrics': {}
                 }
             
-            # Prepare X and y
-            X = merged_df[self.feature_columns].values
-            y = merged_df['next_day_amount'].values
+            # Prepare X and y in time order
+            X = df[self.feature_columns].values
+            y = df['next_day_amount'].values
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
+            # Hold out the most recent 20% so evaluation never sees the future
+            split = int(len(X) * 0.8)
+            X_train, X_test, y_train, y_test = X[:split], X[split:], y[:split], y[split:]
             
             # Scale features
             X_train_scaled = self.scaler.fit_transform(X_train)
             X_test_scaled = self.scaler.transform(X_test)
             
             # Train model
-            self.model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42,
-                n_jobs=-1
-            )
-            
-            self.model.fit(X_train_scaled, y_train)
+            params = {**self.model_params, **(model_params or {})}
+            if self.adaptive and not fixes_forest_size(model_params):
+                self.model, self.training_config = fit_forest_within_budget(
+                    X_train_scaled, y_train, params
+                )
+            else:
+                self.model = RandomForestRegressor(**params)
+                self.model.fit(X_train_scaled, y_train)
+                self.training_config = {
+                    key: params[key] for key in ('n_estimators', 'max_depth', 'min_samples_leaf') if key in params
+                }
             
             # Make predictions
             y_pred = self.model.predict(X_test_scaled)
@@ -142,6 +226,8 @@ class ExpenseForecaster:
             rmse = np.sqrt(mse)
             r2 = r2_score(y_test, y_pred)
             
+            self.start_date = start_date
+            self.category_codes = category_codes
             self.is_trained = True
             
             return {
@@ -153,7 +239,8 @@ class ExpenseForecaster:
                     'rmse': round(rmse, 2),
                     'r2': round(r2, 3),
                     'training_samples': len(X_train),
-                    'test_samples': len(X_test)
+                    'test_samples': len(X_test),
+                    'training_config': self.training_config
                 }
             }
             
@@ -168,6 +255,18 @@ class ExpenseForecaster:
     def predict_monthly_expenses(self, user_id: int, db: Session, 
                                months_ahead: int = 1) -> Dict:
         """Predict monthly expenses for the next few months"""
+        return self.predict_from_history(self.forecast_history(user_id, db), months_ahead)
+    
+    def forecast_history(self, user_id: int, db: Session) -> List[Dict]:
+        """Fetch the daily totals the month features look back over"""
+        return forecast_history(self.engine, user_id, db)
+    
+    def predict_from_history(self, daily_totals: List[Dict], months_ahead: int = 1,
+                             bands: Optional[Callable] = None) -> Dict:
+        """Predict monthly expenses from history fetched by `forecast_history`
+        
+        `bands` replaces `prediction_bands`, e.g. with a micro-batched version.
+        """
         try:
             if not self.is_trained:
                 return {
@@ -176,55 +275,22 @@ class ExpenseForecaster:
                     'predictions': []
                 }
             
-            # Get user's historical expenses
-            expenses_data = get_expenses_for_forecasting(db, user_id)
-            if not expenses_data:
+            if len(daily_totals) == 0:
                 return {
                     'success': False,
                     'message': 'No historical expenses found',
                     'predictions': []
                 }
             
-            # Get current date info
-            current_date = datetime.now()
-            current_month = current_date.month
-            current_year = current_date.year
-            
-            predictions = []
-            
-            for month_offset in range(1, months_ahead + 1):
-                # Calculate target month
-                target_date = current_date + timedelta(days=30 * month_offset)
-                target_month = target_date.month
-                target_year = target_date.year
-                
-                # Generate features for prediction
-                month_features = self._generate_month_features(
-                    target_month, target_year, user_id, db
-                )
-                
-                if month_features is not None:
-                    # Scale features
-                    features_scaled = self.scaler.transform([month_features])
-                    
-                    # Make prediction
-                    predicted_amount = self.model.predict(features_scaled)[0]
-                    
-                    # Ensure prediction is reasonable
-                    predicted_amount = max(0, predicted_amount)
-                    
-                    predictions.append({
-                        'month': target_month,
-                        'year': target_year,
-                        'month_name': target_date.strftime('%B %Y'),
-                        'predicted_amount': round(predicted_amount, 2),
-                        'confidence': self._calculate_confidence(month_features)
-                    })
+            started = time.perf_counter()
+            predictions = self.forecast_months(daily_totals, months_ahead, bands=bands)
+            forecast_ms = (time.perf_counter() - started) * 1000
             
             return {
                 'success': True,
                 'message': f'Generated {len(predictions)} month predictions',
-                'predictions': predictions
+                'predictions': predictions,
+                'forecast_ms': round(forecast_ms, 2)
             }
             
         except Exception as e:
@@ -235,38 +301,97 @@ class ExpenseForecaster:
                 'predictions': []
             }
     
+    def forecast_months(self, expenses_data: List[Dict], months_ahead: int,
+                        as_of: Optional[datetime] = None, bands: Optional[Callable] = None) -> List[Dict]:
+        """Forecast the months following `as_of` from an in-memory history
+        
+        `expenses_data` holds either raw expenses or per-day, per-category
+        totals with a `count` of the expenses behind each row.
+        """
+        history = pd.DataFrame(expenses_data)
+        history['date'] = pd.to_datetime(history['date'])
+        if 'count' not in history:
+            history['count'] = 1
+        
+        # Generate features for every target month
+        targets, rows = [], []
+        for target_year, target_month in future_months(as_of or datetime.now(), months_ahead):
+            month_features = self._generate_month_features(target_month, target_year, history)
+            if month_features is not None:
+                targets.append((target_year, target_month))
+                rows.append(month_features)
+        
+        if not rows:
+            return []
+        
+        # Scale features and predict every month with every tree at once
+        features_scaled = self.scaler.transform(rows)
+        mean, p10, p50, p90 = (bands or self.prediction_bands)(features_scaled)
+        
+        predictions = []
+        for (target_year, target_month), amount, low, median, high in zip(targets, mean, p10, p50, p90):
+            predictions.append({
+                'month': target_month,
+                'year': target_year,
+                'month_name': datetime(target_year, target_month, 1).strftime('%B %Y'),
+                'predicted_amount': round(float(amount), 2),
+                'p10': round(float(low), 2),
+                'p50': round(float(median), 2),
+                'p90': round(float(high), 2),
+                'confidence': interval_confidence(amount, low, high)
+            })
+        
+        return predictions
+    
+    def prediction_bands(self, features_scaled: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Forest mean and P10/P50/P90 across the per-tree predictions
+        
+        All rows go through every fitted tree in one stacked pass; the spread of
+        the trees' answers gives the band without any extra training. The fitted
+        tree structures are called directly, skipping the per-call validation
+        of `DecisionTreeRegressor.predict`; a compact forest walks all trees at once.
+        """
+        X = np.ascontiguousarray(features_scaled, dtype=np.float32)
+        if isinstance(self.model, CompactForest):
+            per_tree = self.model.predict_per_tree(X)
+        else:
+            per_tree = np.stack([tree.tree_.predict(X)[:, 0] for tree in self.model.estimators_])
+        per_tree = np.clip(per_tree, 0, None)
+        p10, p50, p90 = np.percentile(per_tree, [10, 50, 90], axis=0)
+        return per_tree.mean(axis=0), p10, p50, p90
+    
     def _generate_month_features(self, month: int, year: int, 
-                               user_id: int, db: Session) -> Optional[List[float]]:
+                               history: pd.DataFrame) -> Optional[List[float]]:
         """Generate features for a specific month"""
         try:
             # Get historical data for similar months
-            similar_months_data = get_similar_months_expenses(db, user_id, month, year)
+            window = (history['date'] >= datetime(year-2, month, 1)) & \
+                     (history['date'] < datetime(year+1, month, 1))
+            df = history[window]
             
-            if not similar_months_data:
+            if df.empty:
                 return None
             
-            # Calculate average features for this month
-            df = pd.DataFrame(similar_months_data)
-            
             # Encode category (use most common category for this month)
-            most_common_category = df['category_name'].mode().iloc[0] if not df.empty else 'Other'
-            category_mapping = {cat: idx for idx, cat in enumerate(df['category_name'].unique())}
-            category_encoded = category_mapping.get(most_common_category, 0)
+            expense_counts = df.groupby('category_name')['count'].sum()
+            most_common_category = expense_counts.idxmax()
+            category_codes = self.category_codes or category_codes_for(history['category_name'])
+            category_encoded = category_codes.get(most_common_category, 0)
             
             # Calculate average amount and log transform
-            avg_amount = df['amount'].mean() if not df.empty else 0
+            avg_amount = df['amount'].sum() / expense_counts.sum()
             amount_log = np.log1p(avg_amount)
             
-            # Generate features for the target month
+            # Generate features for the target month, counting days from the training start
             target_date = datetime(year, month, 15)  # Middle of month
-            start_date = datetime(2020, 1, 1)  # Arbitrary start date
+            start_date = self.start_date if self.start_date is not None else history['date'].min()
             
             features = [
                 month,  # month
                 15,     # day_of_month (middle of month)
                 target_date.weekday(),  # day_of_week
                 0,      # is_weekend (will be calculated)
-                (target_date - start_date).days,  # days_since_start
+                (pd.Timestamp(target_date) - pd.Timestamp(start_date)).days,  # days_since_start
                 category_encoded,  # category_encoded
                 amount_log  # amount_log
             ]
@@ -280,38 +405,14 @@ class ExpenseForecaster:
             logger.error(f"Error generating month features: {str(e)}")
             return None
     
-    def _calculate_confidence(self, features: List[float]) -> float:
-        """Calculate confidence score for prediction"""
-        try:
-            # Simple confidence based on feature quality
-            # Higher confidence for more recent months, lower for future months
-            current_month = datetime.now().month
-            predicted_month = features[0]
-            
-            month_diff = abs(predicted_month - current_month)
-            
-            if month_diff == 0:
-                confidence = 0.9  # Current month
-            elif month_diff == 1:
-                confidence = 0.8  # Next month
-            elif month_diff == 2:
-                confidence = 0.7  # Two months ahead
-            else:
-                confidence = max(0.5, 0.9 - (month_diff * 0.1))  # Decreasing confidence
-            
-            return round(confidence, 2)
-            
-        except Exception as e:
-            logger.error(f"Error calculating confidence: {str(e)}")
-            return 0.5
-    
     def get_spending_insights(self, user_id: int, db: Session) -> Dict:
         """Generate spending insights and recommendations"""
+        return self.spending_insights(get_recent_expenses_for_insights(db, user_id))
+    
+    def spending_insights(self, recent_expenses_data: List[Dict]) -> Dict:
+        """Generate spending insights from recent per-day, per-category totals"""
         try:
-            # Get recent expenses
-            recent_expenses_data = get_recent_expenses_for_insights(db, user_id)
-            
-            if not recent_expenses_data:
+            if len(recent_expenses_data) == 0:
                 return {
                     'success': False,
                     'message': 'No recent expenses for insights',
@@ -393,10 +494,28 @@ class ExpenseForecaster:
             if not self.is_trained:
                 return False
             
+            if filepath.endswith('.npz'):
+                save_compact(
+                    filepath,
+                    self.model if isinstance(self.model, CompactForest) else CompactForest.from_forest(self.model),
+                    self.scaler if isinstance(self.scaler, CompactScaler) else CompactScaler.from_scaler(self.scaler),
+                    {
+                        'feature_columns': self.feature_columns,
+                        'training_config': self.training_config,
+                        'start_date': self.start_date.isoformat() if self.start_date is not None else None,
+                        'category_codes': self.category_codes,
+                        'trained_date': datetime.now().isoformat()
+                    }
+                )
+                return True
+
             model_data = {
                 'model': self.model,
                 'scaler': self.scaler,
                 'feature_columns': self.feature_columns,
+                'training_config': self.training_config,
+                'start_date': self.start_date,
+                'category_codes': self.category_codes,
                 'trained_date': datetime.now()
             }
             
@@ -408,12 +527,29 @@ class ExpenseForecaster:
             return False
     
     def load_model(self, filepath: str) -> bool:
-        """Load a trained model from disk"""
+        """Load a trained model from disk
+        
+        `.npz` files hold the compact inference-only forest, anything else
+        a joblib pickle of the fitted estimator.
+        """
         try:
+            if filepath.endswith('.npz'):
+                self.model, self.scaler, metadata = load_compact(filepath)
+                self.feature_columns = metadata['feature_columns']
+                self.training_config = metadata.get('training_config')
+                start_date = metadata.get('start_date')
+                self.start_date = pd.Timestamp(start_date) if start_date else None
+                self.category_codes = metadata.get('category_codes', {})
+                self.is_trained = True
+                return True
+
             model_data = joblib.load(filepath)
             self.model = model_data['model']
             self.scaler = model_data['scaler']
             self.feature_columns = model_data['feature_columns']
+            self.training_config = model_data.get('training_config')
+            self.start_date = model_data.get('start_date')
+            self.category_codes = model_data.get('category_codes', {})
             self.is_trained = True
             return True
             
@@ -0,0 +1,245 @@
+"""
+Forecast Backtesting
+Rolling-origin evaluation of the forecasting engines on monthly totals
+"""
+
+import json
+import pickle
+import calendar
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+import logging
+
+from logic.ai_logic import ExpenseForecaster
+from logic.statistical_forecaster import (
+    StatisticalForecaster, SEASON_LENGTH, PHI_GRID,
+    monthly_category_matrix, smoothing_method, smoothing_path
+)
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_CATEGORIES = {
+    # name: (monthly base amount, yearly seasonal swing, expenses per month)
+    'Food & Dining': (12000, 0.10, 40),
+    'Transportation': (4000, 0.05, 20),
+    'Shopping': (8000, 0.45, 8),
+    'Bills & Utilities': (6000, 0.20, 5),
+    'Entertainment': (3000, 0.25, 6),
+}
+
+# Engine configurations compared by default: (engine, label, model_params)
+DEFAULT_CONFIGS = [
+    ('forest', 'adaptive', {}),
+    ('forest', 'n_estimators=30,max_depth=6', {'n_estimators': 30, 'max_depth': 6}),
+    ('statistical', 'damped', {}),
+    ('statistical', 'undamped', {'phi_grid': (1.0,)}),
+]
+
+def generate_synthetic_expenses(months: int, seed: int, end: Optional[datetime] = None,
+                                scale: float = 1.0) -> List[Dict]:
+    """Generate a reproducible expense history for the months before `end`"""
+    rng = np.random.default_rng(seed)
+    last_period = pd.Period(end or datetime.now(), freq='M') - 1
+    periods = pd.period_range(end=last_period, periods=months, freq='M')
+    expenses = []
+    for index, period in enumerate(periods):
+        growth = 1 + 0.01 * index
+        for name, (base, swing, count) in SYNTHETIC_CATEGORIES.items():
+            seasonal = 1 + swing * np.sin(2 * np.pi * (period.month - 3) / 12)
+            total = base * growth * seasonal * rng.lognormal(0, 0.1)
+            n = max(1, rng.poisson(count * scale))
+            shares = rng.dirichlet(np.ones(n))
+            days = rng.integers(1, period.days_in_month + 1, size=n)
+            for share, day in zip(shares, days):
+                expenses.append({
+                    'description': name,
+                    'amount': round(float(total * share), 2),
+                    'date': datetime(period.year, period.month, int(day)),
+                    'category_name': name
+                })
+    return expenses
+
+def forest_monthly_total(prediction: Dict) -> float:
+    """A forest month prediction scaled to a monthly total
+
+    The forest's target is the next day's total, so its `predicted_amount`
+    is one day's expected spend. Times the days in the month it can be
+    scored against monthly actuals like the statistical engine.
+    """
+    return prediction['predicted_amount'] * calendar.monthrange(prediction['year'], prediction['month'])[1]
+
+def rolling_origins(n_months: int, horizon: int, min_train_months: int, step: int = 1) -> np.ndarray:
+    """Training lengths of every fold that still has `horizon` months to score
+
+    A fold with origin `o` trains on months [0, o), treats month `o` as the
+    month in progress and scores the `horizon` months after it, the same
+    layout as a live forecast made mid-month.
+    """
+    return np.arange(min_train_months, n_months - horizon, step)
+
+def _score(predicted: np.ndarray, actual: np.ndarray) -> Dict:
+    """MAE overall and per horizon, plus MAPE over non-zero months"""
+    errors = np.abs(predicted - actual)
+    nonzero = actual > 0
+    return {
+        'mae': float(errors.mean()),
+        'mape': float((errors[nonzero] / actual[nonzero]).mean()) if nonzero.any() else 0.0,
+        'mae_by_horizon': [round(float(e), 2) for e in errors.mean(axis=0)]
+    }
+
+def backtest_statistical(Y: np.ndarray, origins: np.ndarray, horizon: int,
+                         model_params: Optional[Dict] = None) -> np.ndarray:
+    """Forecast totals for every fold from one smoothing pass, shape (folds, horizon)
+
+    The smoothing recursion only looks backwards, so the state after month
+    o - 1 is exactly the fit on the first o months. Folds are grouped by the
+    smoothing variant their history length selects and read off one path each.
+    """
+    params = {'season_length': SEASON_LENGTH, 'phi_grid': PHI_GRID, **(model_params or {})}
+    m = params['season_length']
+    C = Y.shape[1]
+    cols = np.arange(C)
+    # Horizon h targets month o + h: month o is in progress at the origin
+    steps = np.arange(2, horizon + 2)
+    totals = np.zeros((len(origins), horizon))
+
+    methods = np.array([smoothing_method(o, m) for o in origins])
+    for method in np.unique(methods):
+        mask = methods == method
+        o = origins[mask]
+
+        if method == 'naive':
+            means = np.cumsum(Y, axis=0)[o - 1] / o[:, None]
+            totals[mask] = means.sum(axis=1)[:, None]
+            continue
+
+        path = smoothing_path(Y, method, m, params['phi_grid'])
+        last = (o - 1)[:, None]
+        best = np.argmin(path['cum_sse'][:, o - 1], axis=0)
+        level = path['level'][best, last, cols]
+        trend = path['trend'][best, last, cols]
+        phi = path['grid'][best, 3]
+        season = path['season'][best, last, :, cols]
+
+        slots = (last + steps[None, :]) % m
+        seasonal = np.take_along_axis(season, slots[:, None, :].repeat(C, axis=1), axis=2)
+        powers = phi[..., None] ** np.arange(1, steps.max() + 1)
+        damped = np.cumsum(powers, axis=2)[..., steps - 1]
+        forecast = np.clip(level[..., None] + damped * trend[..., None] + seasonal, 0, None)
+        totals[mask] = forecast.sum(axis=1)
+
+    return totals
+
+def backtest_forest(expenses_data: List[Dict], periods: pd.PeriodIndex, origins: np.ndarray,
+                    horizon: int, model_params: Optional[Dict] = None) -> Tuple[np.ndarray, List[float]]:
+    """Refit the forest at every origin; returns monthly totals and per-fold fit times"""
+    history = pd.DataFrame(expenses_data)
+    history['date'] = pd.to_datetime(history['date'])
+    totals = np.zeros((len(origins), horizon))
+    fit_ms = []
+    for fold, origin in enumerate(origins):
+        as_of = periods[origin].start_time.to_pydatetime()
+        train = [e for e, keep in zip(expenses_data, history['date'] < as_of) if keep]
+        engine = ExpenseForecaster(model_params)
+        started = time.perf_counter()
+        result = engine.train_model(train)
+        fit_ms.append((time.perf_counter() - started) * 1000)
+        if not result['success']:
+            totals[fold] = np.nan
+            continue
+        predictions = {(p['year'], p['month']): forest_monthly_total(p)
+                       for p in engine.forecast_months(train, horizon, as_of=as_of)}
+        totals[fold] = [predictions.get((p.year, p.month), np.nan)
+                        for p in periods[origin + 1:origin + 1 + horizon]]
+    return totals, fit_ms
+
+def _model_size(engine: str, expenses_data: List[Dict], model_params: Dict) -> Tuple[float, int]:
+    """Fit one production-size model and return (fit ms, serialized bytes)"""
+    if engine == StatisticalForecaster.engine:
+        forecaster = StatisticalForecaster(model_params)
+    else:
+        forecaster = ExpenseForecaster(model_params)
+    started = time.perf_counter()
+    result = forecaster.train_model(expenses_data)
+    fit_ms = (time.perf_counter() - started) * 1000
+    if not result['success']:
+        return fit_ms, 0
+    if engine == StatisticalForecaster.engine:
+        state = {key: np.asarray(value).tolist() for key, value in forecaster.state.items()}
+        return fit_ms, len(json.dumps(state))
+    return fit_ms, len(pickle.dumps({'model': forecaster.model, 'scaler': forecaster.scaler}))
+
+def backtest_user(expenses_data: List[Dict], configs: List[Tuple[str, str, Dict]] = DEFAULT_CONFIGS,
+                  horizon: int = 3, min_train_months: int = 12, step: int = 1) -> List[Dict]:
+    """Rolling-origin backtest of every configuration on one user's history"""
+    periods, _, Y = monthly_category_matrix(expenses_data)
+    origins = rolling_origins(len(periods), horizon, min_train_months, step)
+    if len(origins) == 0:
+        return []
+    actual = Y.sum(axis=1)[origins[:, None] + np.arange(1, horizon + 1)[None, :]]
+
+    rows = []
+    for engine, label, params in configs:
+        started = time.perf_counter()
+        if engine == StatisticalForecaster.engine:
+            predicted = backtest_statistical(Y, origins, horizon, params)
+        else:
+            predicted, _ = backtest_forest(expenses_data, periods, origins, horizon, params)
+        backtest_ms = (time.perf_counter() - started) * 1000
+        fit_ms, model_bytes = _model_size(engine, expenses_data, params)
+
+        valid = ~np.isnan(predicted).any(axis=1)
+        rows.append({
+            'engine': engine,
+            'config': label,
+            'folds': int(valid.sum()),
+            **_score(predicted[valid], actual[valid]),
+            'fit_ms': round(fit_ms, 2),
+            'backtest_ms': round(backtest_ms, 2),
+            'model_bytes': model_bytes
+        })
+    return rows
+
+def _backtest_job(args: Tuple) -> Tuple[str, List[Dict]]:
+    """Process pool entry point for one user"""
+    key, expenses_data, configs, horizon, min_train_months = args
+    # Users already run in parallel, so each forest fits on a single core
+    configs = [(engine, label, {**params, 'n_jobs': 1} if engine == ExpenseForecaster.engine else params)
+               for engine, label, params in configs]
+    return key, backtest_user(expenses_data, configs, horizon, min_train_months)
+
+def backtest_users(datasets: Dict[str, List[Dict]], configs: List[Tuple[str, str, Dict]] = DEFAULT_CONFIGS,
+                   horizon: int = 3, min_train_months: int = 12,
+                   max_workers: Optional[int] = None) -> Dict[str, List[Dict]]:
+    """Backtest many users in parallel worker processes"""
+    jobs = [(key, data, configs, horizon, min_train_months) for key, data in datasets.items()]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return dict(pool.map(_backtest_job, jobs))
+
+def summarize(results: Dict[str, List[Dict]]) -> List[Dict]:
+    """Average the per-user rows into one row per (engine, config)"""
+    frame = pd.DataFrame([row for rows in results.values() for row in rows])
+    if frame.empty:
+        return []
+    summary = frame.groupby(['engine', 'config'], sort=False).agg(
+        users=('mae', 'size'), folds=('folds', 'sum'), mae=('mae', 'mean'), mape=('mape', 'mean'),
+        fit_ms=('fit_ms', 'mean'), model_bytes=('model_bytes', 'mean')
+    ).reset_index()
+    return summary.to_dict('records')
+
+def format_report(summary: List[Dict]) -> str:
+    """Render summary rows as a plain-text table"""
+    lines = [
+        f"{'Engine':<12} {'Config':<30} {'Users':>5} {'Folds':>6} {'MAE':>9} {'MAPE':>7} {'Fit ms':>9} {'Model KB':>9}",
+        "-" * 94
+    ]
+    for row in summary:
+        lines.append(
+            f"{row['engine']:<12} {row['config']:<30} {row['users']:>5} {row['folds']:>6} "
+            f"{row['mae']:>9.0f} {row['mape']:>7.1%} {row['fit_ms']:>9.1f} {row['model_bytes'] / 1024:>9.1f}"
+        )
+    return "\n".join(lines)
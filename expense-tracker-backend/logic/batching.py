@@ -0,0 +1,161 @@
+"""
+Micro-batched Inference
+Collects concurrent forest predictions for a few milliseconds and runs one stacked pass per model
+"""
+
+import os
+import queue
+import threading
+import time
+import numpy as np
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCHING_ENABLED = os.getenv("AI_BATCHING_ENABLED", "true").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "2"))
+
+class _PendingPredict:
+    __slots__ = ('forecaster', 'features', 'done', 'result', 'error')
+
+    def __init__(self, forecaster, features: np.ndarray):
+        self.forecaster = forecaster
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def _model_key(forecaster) -> Tuple[str, int]:
+    return (forecaster.engine, id(forecaster.model))
+
+class InferenceBatcher:
+    """Groups concurrent `prediction_bands` calls by model and fans the results back out
+
+    Every user has their own model, so only calls on the same model can be
+    stacked into one pass through its trees. A call whose model has no other
+    call in flight predicts directly in its own thread. Only calls that find
+    their model busy are queued. A batch takes whatever calls are queued and
+    waits up to `max_wait_ms` for more, to at most `max_batch_size` calls,
+    only when two of them share a model.
+    """
+
+    def __init__(self, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Calls in flight per model, queued or predicting directly
+        self._in_flight: Dict[Tuple[str, int], int] = {}
+        self._in_flight_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.model_passes = 0
+        self.direct = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                    self._thread.start()
+
+    def prediction_bands(self, forecaster, features_scaled: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Bands for rows of `forecaster`, batched with concurrent calls on the same model"""
+        key = _model_key(forecaster)
+        with self._in_flight_lock:
+            shared = self._in_flight.get(key, 0) > 0
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            if not shared:
+                self.direct += 1
+        try:
+            if not shared:
+                return forecaster.prediction_bands(features_scaled)
+            self._ensure_started()
+            pending = _PendingPredict(forecaster, features_scaled)
+            self._queue.put(pending)
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        finally:
+            with self._in_flight_lock:
+                self._in_flight[key] -= 1
+                if not self._in_flight[key]:
+                    del self._in_flight[key]
+
+    def _drain(self, batch: list):
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            self._drain(batch)
+            if len({_model_key(pending.forecaster) for pending in batch}) == len(batch):
+                self._dispatch(batch)
+                continue
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        groups: Dict[Tuple[str, int], list] = {}
+        for pending in batch:
+            groups.setdefault(_model_key(pending.forecaster), []).append(pending)
+
+        for group in groups.values():
+            try:
+                stacked = np.vstack([pending.features for pending in group])
+                bands = group[0].forecaster.prediction_bands(stacked)
+                splits = np.cumsum([len(pending.features) for pending in group])[:-1]
+                parts = [np.split(band, splits) for band in bands]
+                for index, pending in enumerate(group):
+                    pending.result = tuple(part[index] for part in parts)
+            except Exception as e:
+                logger.error(f"Batched prediction failed: {str(e)}")
+                for pending in group:
+                    pending.error = e
+            finally:
+                for pending in group:
+                    pending.done.set()
+
+        self.batches += 1
+        self.requests += len(batch)
+        self.model_passes += len(groups)
+
+    def stats(self) -> Dict:
+        """Counters since start: direct calls, batches, batched requests and stacked model passes
+
+        `mean_pass_size` is the batching actually achieved: batched requests
+        served per pass through a model's trees.
+        """
+        return {
+            'direct': self.direct,
+            'batches': self.batches,
+            'requests': self.requests,
+            'model_passes': self.model_passes,
+            'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'mean_pass_size': round(self.requests / self.model_passes, 2) if self.model_passes else 0.0
+        }
+
+batcher = InferenceBatcher()
+
+def bands_for(forecaster) -> Optional[Callable]:
+    """Batched `prediction_bands` for forest models, or None to predict directly"""
+    if not BATCHING_ENABLED or not hasattr(forecaster, 'prediction_bands') or forecaster.model is None:
+        return None
+    return partial(batcher.prediction_bands, forecaster)
@@ -0,0 +1,108 @@
+"""
+Per-Category Expense Forecasting
+One multi-output Random Forest predicts every category's monthly spend at once
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from datetime import datetime
+from typing import List, Dict, Optional
+import logging
+
+from logic.ai_logic import DEFAULT_MODEL_PARAMS, future_months
+from logic.statistical_forecaster import monthly_category_matrix
+
+logger = logging.getLogger(__name__)
+
+class CategoryForecaster:
+    """Multi-output forecaster over a (months x categories) total matrix"""
+
+    def __init__(self, model_params: Optional[Dict] = None):
+        self.model_params = {**DEFAULT_MODEL_PARAMS, **(model_params or {})}
+        self.model = None
+        self.is_trained = False
+        self.categories = []
+        self.Y = None
+        self.last_period = None
+
+    def _month_features(self, indices: np.ndarray, month_of_year: np.ndarray) -> np.ndarray:
+        """Features for month positions relative to the start of the history
+
+        Each row holds the month-of-year on the unit circle, the position and
+        the reference spend for every category: the same month a year earlier
+        when it was observed, otherwise the average of all observed months
+        before the position.
+        """
+        T = len(self.Y)
+        cumulative = np.vstack([np.zeros(self.Y.shape[1]), np.cumsum(self.Y, axis=0)])
+        observed = np.minimum(indices, T)
+        reference = cumulative[observed] / np.maximum(observed, 1)[:, None]
+        last_year = (indices >= 12) & (indices - 12 < T)
+        reference[last_year] = self.Y[indices[last_year] - 12]
+
+        angle = 2 * np.pi * (month_of_year - 1) / 12
+        return np.column_stack([np.sin(angle), np.cos(angle), indices, reference])
+
+    def train_model(self, monthly_totals: List[Dict], as_of: Optional[datetime] = None) -> Dict:
+        """Fit one model on the monthly per-category totals of complete months"""
+        try:
+            periods, categories, Y = monthly_category_matrix(monthly_totals, as_of)
+            if len(periods) < 3:
+                return {
+                    'success': False,
+                    'message': 'Need at least 3 complete months of expenses',
+                    'metrics': {}
+                }
+
+            started = time.perf_counter()
+            self.Y = Y
+            self.categories = categories
+            self.last_period = periods[-1]
+
+            indices = np.arange(1, len(periods))
+            X = self._month_features(indices, periods.month.to_numpy()[1:])
+            self.model = RandomForestRegressor(**self.model_params)
+            self.model.fit(X, Y[1:])
+            self.is_trained = True
+
+            return {
+                'success': True,
+                'message': 'Model trained successfully',
+                'metrics': {
+                    'training_months': len(periods),
+                    'categories': len(categories),
+                    'training_ms': round((time.perf_counter() - started) * 1000, 2)
+                }
+            }
+
+        except Exception as e:
+            logger.error(f"Error training category model: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Training failed: {str(e)}',
+                'metrics': {}
+            }
+
+    def forecast_months(self, months_ahead: int, as_of: Optional[datetime] = None) -> List[Dict]:
+        """Predict every category for the months after `as_of` in one call"""
+        targets = future_months(as_of or datetime.now(), months_ahead)
+        target_periods = pd.PeriodIndex([pd.Period(year=y, month=m, freq='M') for y, m in targets])
+        indices = np.array([(p - self.last_period).n for p in target_periods]) + len(self.Y) - 1
+
+        X = self._month_features(indices, target_periods.month.to_numpy())
+        forecast = np.clip(self.model.predict(X).reshape(len(targets), -1), 0, None)
+
+        predictions = []
+        for (year, month), amounts in zip(targets, forecast):
+            predictions.append({
+                'month': month,
+                'year': year,
+                'month_name': datetime(year, month, 1).strftime('%B %Y'),
+                'predicted_amount': round(float(amounts.sum()), 2),
+                'categories': {
+                    name: round(float(amount), 2) for name, amount in zip(self.categories, amounts)
+                }
+            })
+        return predictions
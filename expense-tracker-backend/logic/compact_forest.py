@@ -0,0 +1,121 @@
+"""
+Compact Forest
+Flat array-backed Random Forest for inference, exported from a trained RandomForestRegressor
+"""
+
+import json
+import numpy as np
+from typing import Dict
+
+def _round_down_float32(values: np.ndarray) -> np.ndarray:
+    """Largest float32 not above each value, so `x <= t` is unchanged for float32 `x`"""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+class CompactForest:
+    """Every tree of a forest in shared flat arrays
+
+    Nodes of all trees are numbered consecutively. Internal nodes hold a
+    feature index, a float32 threshold and int32 child indexes; a leaf points
+    both children at itself and stores its value in the threshold slot, so
+    `max_depth` vectorized steps route every (tree, row) pair to its leaf.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 roots: np.ndarray, max_depth: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_forest(cls, model) -> "CompactForest":
+        """Export the fitted trees of a single-output RandomForestRegressor"""
+        features, thresholds, children, roots = [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            index = np.arange(tree.node_count) + offset
+            leaf = tree.children_left == -1
+
+            threshold = _round_down_float32(tree.threshold)
+            threshold[leaf] = tree.value[leaf, 0, 0]
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int16))
+            thresholds.append(threshold)
+            children.append(np.column_stack([
+                np.where(leaf, index, tree.children_left + offset),
+                np.where(leaf, index, tree.children_right + offset)
+            ]).astype(np.int32))
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(np.concatenate(features), np.concatenate(thresholds),
+                   np.concatenate(children), np.array(roots, dtype=np.int32), max_depth)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.roots))
+
+    def predict_per_tree(self, X: np.ndarray) -> np.ndarray:
+        """Every tree's prediction for every row, shape (trees, rows)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        # Flat offsets and np.take avoid the overhead of 2-D fancy indexing
+        flat_X = X.ravel()
+        flat_children = self.children.ravel()
+        row_offsets = np.arange(n_rows, dtype=np.intp) * n_features
+        nodes = np.repeat(self.roots[:, None].astype(np.intp), n_rows, axis=1)
+        for _ in range(self.max_depth):
+            go_right = np.take(flat_X, row_offsets + np.take(self.feature, nodes)) > np.take(self.threshold, nodes)
+            nodes = np.take(flat_children, 2 * nodes + go_right)
+        return np.take(self.threshold, nodes).astype(np.float64)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Forest mean prediction per row"""
+        return self.predict_per_tree(X).mean(axis=0)
+
+class CompactScaler:
+    """The `transform` of a fitted StandardScaler, from its mean and scale arrays"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    @classmethod
+    def from_scaler(cls, scaler) -> "CompactScaler":
+        return cls(np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64))
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+def save_compact(filepath: str, forest: CompactForest, scaler: CompactScaler, metadata: Dict):
+    """Write the forest, scaler and JSON metadata into one uncompressed .npz file"""
+    with open(filepath, 'wb') as f:
+        np.savez(
+            f,
+            feature=forest.feature,
+            threshold=forest.threshold,
+            children=forest.children,
+            roots=forest.roots,
+            max_depth=np.array(forest.max_depth),
+            scaler_mean=scaler.mean_,
+            scaler_scale=scaler.scale_,
+            metadata=np.frombuffer(json.dumps(metadata, default=str).encode('utf-8'), dtype=np.uint8)
+        )
+
+def load_compact(filepath: str) -> tuple:
+    """Read (forest, scaler, metadata) written by `save_compact`"""
+    with np.load(filepath) as data:
+        forest = CompactForest(data['feature'], data['threshold'], data['children'],
+                               data['roots'], int(data['max_depth']))
+        scaler = CompactScaler(data['scaler_mean'], data['scaler_scale'])
+        metadata = json.loads(data['metadata'].tobytes().decode('utf-8'))
+    return forest, scaler, metadata
@@ -0,0 +1,34 @@
+"""
+Forecasting Common
+Calendar, confidence and training-window helpers shared by the engines, importable without their model libraries
+"""
+
+import os
+from datetime import datetime
+from typing import List, Tuple
+
+# Bounds on the training data of the forest engine
+MAX_HISTORY_DAYS = int(os.getenv("AI_MAX_HISTORY_DAYS", "1095"))
+MAX_TRAINING_SAMPLES = int(os.getenv("AI_MAX_TRAINING_SAMPLES", "730"))
+
+def future_months(as_of: datetime, months_ahead: int) -> List[Tuple[int, int]]:
+    """Return (year, month) pairs for the calendar months following `as_of`"""
+    months = []
+    for month_offset in range(1, months_ahead + 1):
+        index = as_of.year * 12 + (as_of.month - 1) + month_offset
+        months.append((index // 12, index % 12 + 1))
+    return months
+
+def interval_confidence(center: float, p10: float, p90: float) -> float:
+    """Confidence score from how narrow the P10-P90 band is around the forecast
+
+    The band's width relative to the forecast maps to 1 / (1 + width): a
+    band as wide as the forecast scores 0.5, and wider bands keep falling
+    towards 0 without reaching it. Per-tree bands on daily targets are
+    often wider than twice the forecast, which a linear scale would
+    flatten to 0 for every forest prediction.
+    """
+    if center <= 0:
+        return 0.0
+    relative_width = max(p90 - p10, 0) / center
+    return round(float(1 / (1 + relative_width)), 2)
@@ -0,0 +1,82 @@
+"""
+Forecasting engine registry
+Maps the `engine` names accepted by the AI endpoints to forecaster classes and model paths
+"""
+
+import os
+import importlib
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, List
+from sqlalchemy.orm import Session
+
+from logic.forecast_common import future_months
+from data_sources.ai_data import get_daily_category_totals
+
+if TYPE_CHECKING:
+    from logic.ai_logic import ExpenseForecaster
+
+DEFAULT_ENGINE = os.getenv("AI_DEFAULT_ENGINE", "forest")
+# "compact" stores forests as flat .npz arrays, "pickle" as joblib pickles of the estimator
+FOREST_MODEL_FORMAT = os.getenv("AI_FOREST_MODEL_FORMAT", "compact")
+
+FOREST_ENGINE = 'forest'
+
+# Forecaster class behind each engine name. Classes are imported on first use, so
+# API workers that only talk to the inference sidecar never load scikit-learn or pandas.
+ENGINE_CLASSES = {
+    FOREST_ENGINE: 'logic.ai_logic.ExpenseForecaster',
+    'statistical': 'logic.statistical_forecaster.StatisticalForecaster',
+}
+
+# Shared forecaster instances, one per engine, created on first use
+forecasters: Dict[str, 'ExpenseForecaster'] = {}
+
+def check_engine(engine: str):
+    """Raise ValueError for an engine name that is not registered"""
+    if engine not in ENGINE_CLASSES:
+        raise ValueError(
+            f"Unknown forecasting engine '{engine}'. Available engines: {', '.join(ENGINE_CLASSES)}"
+        )
+
+def engine_class(engine: str) -> type:
+    """Return the forecaster class for an engine name, importing its module if needed"""
+    check_engine(engine)
+    module, name = ENGINE_CLASSES[engine].rsplit('.', 1)
+    return getattr(importlib.import_module(module), name)
+
+def get_forecaster(engine: str) -> 'ExpenseForecaster':
+    """Return the shared forecaster for an engine name, for work that needs no trained model"""
+    if engine not in forecasters:
+        forecasters[engine] = engine_class(engine)()
+    return forecasters[engine]
+
+def create_forecaster(engine: str) -> 'ExpenseForecaster':
+    """Return a new, untrained forecaster for an engine name"""
+    return engine_class(engine)()
+
+def forecast_history(engine: str, user_id: int, db: Session) -> List[Dict]:
+    """Fetch the history an engine forecasts from, without importing the engine
+
+    The forest's month features look back over daily totals from two years
+    before the first forecast month; the statistical engine forecasts from
+    its fitted state alone.
+    """
+    check_engine(engine)
+    if engine != FOREST_ENGINE:
+        return []
+    first_year, first_month = future_months(datetime.now(), 1)[0]
+    return get_daily_category_totals(db, user_id, since=date(first_year - 2, first_month, 1))
+
+def get_model_path(user_id: int, engine: str) -> str:
+    """Return where unversioned models of earlier releases were stored"""
+    if engine == FOREST_ENGINE:
+        return f"models/user_{user_id}_forecast_model.pkl"
+    return f"models/user_{user_id}_{engine}_model.json"
+
+def get_versioned_model_path(user_id: int, engine: str, version: int) -> str:
+    """Return where one version of a user's model for an engine is stored"""
+    if engine != FOREST_ENGINE:
+        extension = 'json'
+    else:
+        extension = 'npz' if FOREST_MODEL_FORMAT == 'compact' else 'pkl'
+    return f"models/user_{user_id}_{engine}_v{version}.{extension}"
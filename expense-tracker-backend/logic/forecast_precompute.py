@@ -0,0 +1,144 @@
+"""
+Forecast Precomputation
+Computes forecasts and insights for active users ahead of time and serves them while still current
+"""
+
+import os
+import time
+from datetime import datetime, date
+from typing import Dict, List, Optional
+import logging
+from sqlalchemy.orm import Session
+
+from logic.forecast_common import interval_confidence
+from logic.forecast_engines import ENGINE_CLASSES, forecast_history
+from logic.model_registry import current_model_info
+from logic import inference
+from data_sources.ai_data import get_data_watermarks, get_active_user_ids
+from data_sources.forecast_store import get_stored_forecasts, replace_forecasts, get_stored_insights, save_insights
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_MONTHS = int(os.getenv("AI_PRECOMPUTE_MONTHS", "12"))
+PRECOMPUTE_BATCH_SIZE = int(os.getenv("AI_PRECOMPUTE_BATCH_SIZE", "100"))
+PRECOMPUTE_ACTIVE_DAYS = int(os.getenv("AI_PRECOMPUTE_ACTIVE_DAYS", "90"))
+# Insights look at the last 90 days from today, so a nightly snapshot goes stale after a day
+INSIGHTS_MAX_AGE_HOURS = float(os.getenv("AI_INSIGHTS_MAX_AGE_HOURS", "26"))
+
+def next_month_start(today: Optional[date] = None) -> date:
+    """First day of the month after `today`, the first month every forecast covers"""
+    today = today or date.today()
+    return date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+def _model_version(user_id: int, engine: str) -> Optional[int]:
+    info = current_model_info(user_id, engine)
+    return info['version'] if info else None
+
+def _local_naive(value: datetime) -> datetime:
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+def stored_forecast(db: Session, user_id: int, engine: str, months_ahead: int,
+                    watermark: str) -> Optional[Dict]:
+    """The precomputed forecast, if it was made from the same data and model version
+
+    None when rows are missing, cover fewer months than asked, or were
+    computed before the data watermark moved or the model was retrained.
+    """
+    rows = get_stored_forecasts(db, user_id, engine, next_month_start())[:months_ahead]
+    if len(rows) < months_ahead:
+        return None
+    if any(row['data_watermark'] != watermark for row in rows):
+        return None
+    if rows[0]['model_version'] != _model_version(user_id, engine):
+        return None
+
+    predictions = [{
+        'month': row['month'].month,
+        'year': row['month'].year,
+        'month_name': row['month'].strftime('%B %Y'),
+        'predicted_amount': row['amount'],
+        'p10': row['p10'],
+        'p50': row['p50'],
+        'p90': row['p90'],
+        'confidence': interval_confidence(row['amount'], row['p10'], row['p90'])
+    } for row in rows]
+    return {
+        'success': True,
+        'message': f'Generated {len(predictions)} month predictions',
+        'predictions': predictions,
+        'computed_at': min(row['computed_at'] for row in rows)
+    }
+
+def stored_insights(db: Session, user_id: int, watermark: str) -> Optional[Dict]:
+    """The precomputed insights, if made from the same data within INSIGHTS_MAX_AGE_HOURS"""
+    stored = get_stored_insights(db, user_id)
+    if stored is None or stored['data_watermark'] != watermark:
+        return None
+    age_hours = (datetime.now() - _local_naive(stored['computed_at'])).total_seconds() / 3600
+    if age_hours > INSIGHTS_MAX_AGE_HOURS:
+        return None
+    return {
+        'success': True,
+        'message': f"Generated {len(stored['insights'])} insights",
+        'insights': stored['insights'],
+        'computed_at': stored['computed_at']
+    }
+
+def precompute_user(db: Session, user_id: int, watermark: str, engines: List[str]) -> Dict:
+    """Compute and store one user's forecasts for every trained engine, and their insights
+
+    Writes join the caller's transaction. Engines whose stored forecast already
+    matches the watermark and model version are skipped.
+    """
+    written, skipped = [], []
+    for engine in engines:
+        if current_model_info(user_id, engine) is None:
+            continue
+        if stored_forecast(db, user_id, engine, PRECOMPUTE_MONTHS, watermark) is not None:
+            skipped.append(engine)
+            continue
+        history = forecast_history(engine, user_id, db)
+        result = inference.forecast(user_id, engine, history, PRECOMPUTE_MONTHS)
+        if result is None or not result['success']:
+            continue
+        replace_forecasts(db, user_id, engine, result['predictions'], _model_version(user_id, engine), watermark)
+        written.append(engine)
+
+    insights = inference.get_spending_insights(user_id, db)
+    if insights['success']:
+        save_insights(db, user_id, insights['insights'], watermark)
+
+    return {'written': written, 'skipped': skipped, 'insights': insights['success']}
+
+def precompute_all(db: Session, batch_size: int = PRECOMPUTE_BATCH_SIZE,
+                   engines: Optional[List[str]] = None) -> Dict:
+    """Precompute forecasts and insights for all active users in batches
+
+    Each batch fetches its users' watermarks in one query. Every user is
+    committed on its own, so a failure only rolls back that user's rows.
+    """
+    started = time.perf_counter()
+    engines = engines or list(ENGINE_CLASSES)
+    user_ids = get_active_user_ids(db, PRECOMPUTE_ACTIVE_DAYS)
+    summary = {'users': len(user_ids), 'forecasts_written': 0, 'forecasts_skipped': 0,
+               'insights_written': 0, 'failed_users': []}
+
+    for offset in range(0, len(user_ids), batch_size):
+        batch = user_ids[offset:offset + batch_size]
+        watermarks = get_data_watermarks(db, batch)
+        for user_id in batch:
+            try:
+                result = precompute_user(db, user_id, watermarks[user_id], engines)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Precomputing forecasts for user {user_id} failed: {str(e)}")
+                summary['failed_users'].append(user_id)
+                continue
+            summary['forecasts_written'] += len(result['written'])
+            summary['forecasts_skipped'] += len(result['skipped'])
+            summary['insights_written'] += int(result['insights'])
+
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(f"Precomputed forecasts for {summary['users']} users in {summary['seconds']}s")
+    return summary
@@ -0,0 +1,267 @@
+"""
+Background Hyperparameter Search
+Opt-in per-user tuning of the forest on time-series folds, with cached fold results
+"""
+
+import os
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import product
+from threadpoolctl import threadpool_limits
+from typing import List, Dict, Optional
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Searches only run when explicitly enabled
+HPSEARCH_ENABLED = os.getenv("AI_HPSEARCH_ENABLED", "false").lower() == "true"
+# Searches running at once across every API worker on the host
+HPSEARCH_WORKERS = int(os.getenv("AI_HPSEARCH_WORKERS", "1"))
+# Scheduling priority of search workers; 19 is the lowest
+HPSEARCH_NICE = int(os.getenv("AI_HPSEARCH_NICE", "19"))
+HPSEARCH_FOLDS = 4
+HPSEARCH_DIR = "models/hpsearch"
+HPSEARCH_LOCK_DIR = os.path.join(HPSEARCH_DIR, "locks")
+# How long a search waits for its user's lock, which a status check may hold briefly
+USER_LOCK_WAIT_SECONDS = 1.0
+SLOT_POLL_SECONDS = 1.0
+
+# Candidate forest configurations
+SEARCH_SPACE = {
+    'n_estimators': (30, 60, 100),
+    'max_depth': (4, 6, 10),
+    'min_samples_leaf': (1, 3),
+}
+
+def candidate_configs(space: Dict = SEARCH_SPACE) -> List[Dict]:
+    """Every combination of the search space"""
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in product(*(space[key] for key in keys))]
+
+def config_key(config: Dict) -> str:
+    """Stable text key for a configuration"""
+    return json.dumps(config, sort_keys=True)
+
+def get_cache_path(user_id: int) -> str:
+    """Fold result cache for one user"""
+    return os.path.join(HPSEARCH_DIR, f"user_{user_id}.json")
+
+def get_config_path(user_id: int) -> str:
+    """Promoted forest configuration for one user"""
+    return f"models/user_{user_id}_forest_config.json"
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path: str, data: Dict):
+    """Write through a temporary file so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _save_results(user_id: int, watermark: str, results: Dict):
+    """Merge `results` with the fold errors already on disk for `watermark` and write them back"""
+    cache = _read_json(get_cache_path(user_id)) or {}
+    if cache.get('watermark') == watermark:
+        for key, value in cache.get('results', {}).items():
+            results.setdefault(key, value)
+    _write_json(get_cache_path(user_id), {'watermark': watermark, 'results': results})
+
+def _try_lock(name: str):
+    """Exclusive file lock `name` without blocking: the open lock file, or None if another process holds it
+
+    Closing the file releases the lock.
+    """
+    os.makedirs(HPSEARCH_LOCK_DIR, exist_ok=True)
+    lock_file = open(os.path.join(HPSEARCH_LOCK_DIR, f"{name}.lock"), 'a')
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def _search_running(user_id: int) -> bool:
+    """Whether a process on this host holds the user's search lock"""
+    lock_file = _try_lock(f"user_{user_id}")
+    if lock_file is None:
+        return True
+    lock_file.close()
+    return False
+
+@contextmanager
+def _search_slot():
+    """Hold one of the host's HPSEARCH_WORKERS search slots, waiting for one to free up"""
+    while True:
+        for slot in range(HPSEARCH_WORKERS):
+            lock_file = _try_lock(f"slot_{slot}")
+            if lock_file is not None:
+                try:
+                    yield
+                finally:
+                    lock_file.close()
+                return
+        time.sleep(SLOT_POLL_SECONDS)
+
+def load_tuned_config(user_id: int) -> Optional[Dict]:
+    """Forest parameters promoted by the last search, if any"""
+    promoted = _read_json(get_config_path(user_id))
+    return promoted['config'] if promoted else None
+
+def evaluate_config(X: np.ndarray, y: np.ndarray, config: Dict, n_folds: int = HPSEARCH_FOLDS) -> List[float]:
+    """Mean absolute error of a configuration on each expanding-window fold"""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import TimeSeriesSplit
+    from logic.ai_logic import DEFAULT_MODEL_PARAMS
+
+    errors = []
+    for train_idx, test_idx in TimeSeriesSplit(n_splits=n_folds).split(X):
+        model = RandomForestRegressor(**{**DEFAULT_MODEL_PARAMS, **config, 'n_jobs': 1})
+        model.fit(X[train_idx], y[train_idx])
+        errors.append(float(np.abs(model.predict(X[test_idx]) - y[test_idx]).mean()))
+    return errors
+
+def run_search(user_id: int, daily_totals: List[Dict], watermark: str,
+               configs: Optional[List[Dict]] = None) -> Dict:
+    """Evaluate the configurations missing from the cache and promote the best one
+
+    Cached fold errors are reused while the data watermark is unchanged, so a
+    re-run only fits configurations that were added since; entries for older
+    watermarks are dropped. Runs in the search pool, so the model libraries
+    are imported here rather than in every API worker.
+    """
+    from logic.ai_logic import ExpenseForecaster
+
+    configs = configs or candidate_configs()
+    forecaster = ExpenseForecaster()
+    df = forecaster.build_training_set(daily_totals)
+    if df is None or len(df) < 5 * (HPSEARCH_FOLDS + 1):
+        return {'success': False, 'message': 'Not enough history to tune the model'}
+    X = df[forecaster.feature_columns].to_numpy()
+    y = df['next_day_amount'].to_numpy()
+
+    cache = _read_json(get_cache_path(user_id)) or {}
+    results = cache.get('results', {}) if cache.get('watermark') == watermark else {}
+
+    started = time.perf_counter()
+    evaluated = 0
+    for config in configs:
+        key = config_key(config)
+        if key in results:
+            continue
+        fold_errors = evaluate_config(X, y, config)
+        results[key] = {'fold_mae': fold_errors, 'mae': float(np.mean(fold_errors))}
+        evaluated += 1
+        # Persist after every configuration so an interrupted search resumes
+        _save_results(user_id, watermark, results)
+
+    best_key = min((config_key(c) for c in configs), key=lambda k: results[k]['mae'])
+    promoted = {
+        'config': json.loads(best_key),
+        'mae': results[best_key]['mae'],
+        'watermark': watermark,
+        'promoted_at': time.time()
+    }
+    _write_json(get_config_path(user_id), promoted)
+    logger.info(f"Tuned forest for user {user_id}: {best_key} "
+                f"({evaluated} evaluated, {len(configs) - evaluated} cached)")
+    return {
+        'success': True,
+        'message': 'Search complete',
+        'best_config': promoted['config'],
+        'best_mae': round(promoted['mae'], 2),
+        'evaluated': evaluated,
+        'cached': len(configs) - evaluated,
+        'search_seconds': round(time.perf_counter() - started, 3)
+    }
+
+def _run_exclusive(user_id: int, daily_totals: List[Dict], watermark: str) -> Dict:
+    """Pool entry point: `run_search` under the user's lock and one of the host's search slots
+
+    Every API worker has its own pool, so these file locks are what keep one
+    search per user and at most HPSEARCH_WORKERS searches on the host. A
+    search waiting for a slot holds the user's lock but uses no CPU.
+    """
+    deadline = time.monotonic() + USER_LOCK_WAIT_SECONDS
+    user_lock = _try_lock(f"user_{user_id}")
+    while user_lock is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        user_lock = _try_lock(f"user_{user_id}")
+    if user_lock is None:
+        return {'success': False, 'message': 'A search is already running for this user'}
+    try:
+        with _search_slot():
+            return run_search(user_id, daily_totals, watermark)
+    finally:
+        user_lock.close()
+
+def _lower_priority():
+    """Worker initializer: lowest CPU priority and single-threaded native code"""
+    try:
+        os.nice(HPSEARCH_NICE)
+    except (AttributeError, OSError):
+        pass
+    threadpool_limits(1)
+
+_pool = None
+_in_flight = {}
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=HPSEARCH_WORKERS, initializer=_lower_priority)
+    return _pool
+
+def schedule_search(user_id: int, daily_totals: List[Dict], watermark: str) -> bool:
+    """Queue a background search; returns False if one is already running for the user in any worker"""
+    running = _in_flight.get(user_id)
+    if (running is not None and not running.done()) or _search_running(user_id):
+        return False
+    future = _get_pool().submit(_run_exclusive, user_id, daily_totals, watermark)
+    future.add_done_callback(_log_result)
+    _in_flight[user_id] = future
+    return True
+
+def _log_result(future):
+    try:
+        result = future.result()
+        if not result['success']:
+            logger.info(f"Hyperparameter search skipped: {result['message']}")
+    except Exception as e:
+        logger.error(f"Hyperparameter search failed: {str(e)}")
+
+def search_status(user_id: int, watermark: Optional[str] = None) -> Dict:
+    """Running state, cached evaluations and the promoted configuration"""
+    running = _in_flight.get(user_id)
+    cache = _read_json(get_cache_path(user_id)) or {}
+    promoted = _read_json(get_config_path(user_id))
+    return {
+        'enabled': HPSEARCH_ENABLED,
+        'running': (running is not None and not running.done()) or _search_running(user_id),
+        'cached_results': len(cache.get('results', {})),
+        'cache_current': watermark is not None and cache.get('watermark') == watermark,
+        'promoted': promoted
+    }
+
+def shutdown():
+    """Stop the search workers"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,121 @@
+"""
+Inference Facade
+Runs forecasts, insights and model status in process or through the inference sidecar
+"""
+
+import os
+import socket
+import threading
+from typing import List, Dict, Optional
+import logging
+from sqlalchemy.orm import Session
+
+from logic.inference_protocol import (
+    OP_FORECAST, OP_INSIGHTS, OP_STATUS, STATUS_OK, STATUS_NOT_TRAINED,
+    RESPONSE_HEADER, recv_exact, encode_request, decode_forecast, decode_json
+)
+from logic.forecast_engines import DEFAULT_ENGINE, forecast_history, get_forecaster
+from logic.model_registry import load_current_model
+from logic.batching import bands_for
+from data_sources.ai_data import get_recent_expenses_for_insights
+
+logger = logging.getLogger(__name__)
+
+# "inprocess" loads models in every API worker, "sidecar" asks the inference server
+INFERENCE_MODE = os.getenv("AI_INFERENCE_MODE", "inprocess")
+INFERENCE_SOCKET = os.getenv("AI_INFERENCE_SOCKET", "/tmp/expense-tracker-inference.sock")
+INFERENCE_TIMEOUT_SECONDS = float(os.getenv("AI_INFERENCE_TIMEOUT_SECONDS", "10"))
+
+class SidecarClient:
+    """One persistent socket per thread to the inference server"""
+
+    def __init__(self, socket_path: str = INFERENCE_SOCKET, timeout: float = INFERENCE_TIMEOUT_SECONDS):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def call(self, request: bytes):
+        """Send one request frame and return (status, payload)
+
+        A connection the server has dropped is reopened once.
+        """
+        for attempt in range(2):
+            sock = getattr(self._local, 'sock', None)
+            try:
+                if sock is None:
+                    sock = self._connect()
+                sock.sendall(request)
+                status, length = RESPONSE_HEADER.unpack(recv_exact(sock.recv, RESPONSE_HEADER.size))
+                return status, recv_exact(sock.recv, length)
+            except (OSError, EOFError):
+                self._close()
+                if attempt:
+                    raise
+
+    def request(self, op: int, engine: str, user_id: int, months_ahead: int = 0,
+                rows: List[Dict] = ()) -> Optional[bytes]:
+        """Payload of a successful response, or None when the user has no model"""
+        status, payload = self.call(encode_request(op, engine, user_id, months_ahead, rows))
+        if status == STATUS_NOT_TRAINED:
+            return None
+        if status != STATUS_OK:
+            raise RuntimeError(f"Inference server error: {payload.decode('utf-8', 'replace')}")
+        return payload
+
+_client = None
+
+def get_client() -> SidecarClient:
+    global _client
+    if _client is None:
+        _client = SidecarClient()
+    return _client
+
+def forecast(user_id: int, engine: str, history: List[Dict], months_ahead: int) -> Optional[Dict]:
+    """Forecast from prefetched history; None if the user has no trained model"""
+    if INFERENCE_MODE == 'sidecar':
+        payload = get_client().request(OP_FORECAST, engine, user_id, months_ahead, history)
+        return decode_forecast(payload) if payload is not None else None
+
+    forecaster = load_current_model(user_id, engine)
+    if forecaster is None:
+        return None
+    return forecaster.predict_from_history(history, months_ahead, bands=bands_for(forecaster))
+
+def predict_monthly_expenses(user_id: int, engine: str, db: Session, months_ahead: int) -> Optional[Dict]:
+    """Fetch the engine's forecast history and forecast the coming months"""
+    history = forecast_history(engine, user_id, db)
+    return forecast(user_id, engine, history, months_ahead)
+
+def get_spending_insights(user_id: int, db: Session) -> Dict:
+    """Spending insights from the user's recent daily totals"""
+    recent = get_recent_expenses_for_insights(db, user_id)
+    if INFERENCE_MODE == 'sidecar':
+        return decode_json(get_client().request(OP_INSIGHTS, DEFAULT_ENGINE, user_id, 0, recent))
+    return get_forecaster(DEFAULT_ENGINE).spending_insights(recent)
+
+def get_model_status(user_id: int, engine: str) -> Optional[Dict]:
+    """Feature columns and training configuration of the current model, if any"""
+    if INFERENCE_MODE == 'sidecar':
+        payload = get_client().request(OP_STATUS, engine, user_id)
+        return decode_json(payload) if payload is not None else None
+
+    forecaster = load_current_model(user_id, engine)
+    if forecaster is None:
+        return None
+    return {
+        'feature_columns': forecaster.feature_columns,
+        'training_config': forecaster.training_config
+    }
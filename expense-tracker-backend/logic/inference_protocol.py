@@ -0,0 +1,123 @@
+"""
+Inference Sidecar Protocol
+Binary frames exchanged between API workers and the inference server over a Unix socket
+"""
+
+import json
+import struct
+import numpy as np
+from datetime import date, datetime
+from typing import List, Dict, Tuple
+
+OP_FORECAST = 1
+OP_INSIGHTS = 2
+OP_STATUS = 3
+
+STATUS_OK = 0
+STATUS_NOT_TRAINED = 1
+STATUS_ERROR = 2
+
+# Engine codes on the wire, by position
+ENGINES = ('forest', 'statistical')
+
+# op, engine code, user id, months ahead, category name bytes, row count
+REQUEST_HEADER = struct.Struct('!BBIHII')
+# status, payload bytes
+RESPONSE_HEADER = struct.Struct('!BI')
+# success, forecast ms, message bytes, prediction count
+FORECAST_HEADER = struct.Struct('!BdHH')
+# year, month, predicted amount, p10, p50, p90, confidence
+PREDICTION = struct.Struct('!HBddddd')
+# One per-day, per-category total; days are proleptic Gregorian ordinals
+ROW_DTYPE = np.dtype([('day', '>i4'), ('category', '>u2'), ('amount', '>f8'), ('count', '>i4')])
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def recv_exact(read, n: int) -> bytes:
+    """Read exactly `n` bytes with `read`, raising EOFError if the peer closes first"""
+    chunks, remaining = [], n
+    while remaining:
+        chunk = read(remaining)
+        if not chunk:
+            raise EOFError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+def encode_rows(rows: List[Dict]) -> Tuple[bytes, bytes, int]:
+    """Pack daily totals into (category names, fixed-size records, row count)"""
+    names = sorted({row['category_name'] for row in rows})
+    codes = {name: code for code, name in enumerate(names)}
+    records = np.empty(len(rows), dtype=ROW_DTYPE)
+    records['day'] = [row['date'].toordinal() for row in rows]
+    records['category'] = [codes[row['category_name']] for row in rows]
+    records['amount'] = [row['amount'] for row in rows]
+    records['count'] = [row.get('count', 1) for row in rows]
+    return '\0'.join(names).encode('utf-8'), records.tobytes(), len(rows)
+
+def decode_rows(names_blob: bytes, records_blob: bytes):
+    """Unpack daily totals into a pandas frame with date, category_name, amount and count
+
+    Only the inference server decodes rows, so the API workers that encode
+    them never import pandas.
+    """
+    import pandas as pd
+    names = np.array(names_blob.decode('utf-8').split('\0') if names_blob else [], dtype=object)
+    records = np.frombuffer(records_blob, dtype=ROW_DTYPE)
+    return pd.DataFrame({
+        'date': (records['day'].astype(np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]'),
+        'category_name': names[records['category'].astype(np.intp)] if len(records) else [],
+        'amount': records['amount'].astype(np.float64),
+        'count': records['count'].astype(np.int64)
+    })
+
+def encode_request(op: int, engine: str, user_id: int, months_ahead: int = 0,
+                   rows: List[Dict] = ()) -> bytes:
+    names, records, n_rows = encode_rows(list(rows))
+    return REQUEST_HEADER.pack(op, ENGINES.index(engine), user_id, months_ahead,
+                               len(names), n_rows) + names + records
+
+def encode_response(status: int, payload: bytes = b'') -> bytes:
+    return RESPONSE_HEADER.pack(status, len(payload)) + payload
+
+def encode_forecast(result: Dict) -> bytes:
+    """Pack a `predict_from_history` result"""
+    message = result['message'].encode('utf-8')
+    predictions = result['predictions']
+    parts = [FORECAST_HEADER.pack(result['success'], result.get('forecast_ms') or 0.0,
+                                  len(message), len(predictions)), message]
+    for p in predictions:
+        parts.append(PREDICTION.pack(p['year'], p['month'], p['predicted_amount'],
+                                     p['p10'], p['p50'], p['p90'], p['confidence']))
+    return b''.join(parts)
+
+def decode_forecast(payload: bytes) -> Dict:
+    """Unpack a forecast result into the dict `predict_from_history` returns"""
+    success, forecast_ms, message_len, count = FORECAST_HEADER.unpack_from(payload)
+    offset = FORECAST_HEADER.size
+    message = payload[offset:offset + message_len].decode('utf-8')
+    offset += message_len
+
+    predictions = []
+    for year, month, amount, p10, p50, p90, confidence in PREDICTION.iter_unpack(
+            payload[offset:offset + count * PREDICTION.size]):
+        predictions.append({
+            'month': month,
+            'year': year,
+            'month_name': datetime(year, month, 1).strftime('%B %Y'),
+            'predicted_amount': amount,
+            'p10': p10,
+            'p50': p50,
+            'p90': p90,
+            'confidence': confidence
+        })
+    result = {'success': bool(success), 'message': message, 'predictions': predictions}
+    if success:
+        result['forecast_ms'] = forecast_ms
+    return result
+
+def encode_json(data: Dict) -> bytes:
+    return json.dumps(data, default=str).encode('utf-8')
+
+def decode_json(payload: bytes) -> Dict:
+    return json.loads(payload.decode('utf-8'))
@@ -0,0 +1,87 @@
+"""
+Inference Sidecar Server
+One process that owns the loaded models and answers forecast, insight and status requests
+from the API workers over a Unix domain socket
+
+Run from the backend directory with `python -m logic.inference_server`.
+"""
+
+import os
+import argparse
+import socketserver
+import logging
+
+from logic.inference_protocol import (
+    OP_FORECAST, OP_INSIGHTS, OP_STATUS, STATUS_OK, STATUS_NOT_TRAINED, STATUS_ERROR,
+    ENGINES, REQUEST_HEADER, ROW_DTYPE, recv_exact, decode_rows,
+    encode_response, encode_forecast, encode_json
+)
+from logic.forecast_engines import DEFAULT_ENGINE, get_forecaster
+from logic.model_registry import load_current_model
+from logic.batching import bands_for
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_SOCKET = os.getenv("AI_INFERENCE_SOCKET", "/tmp/expense-tracker-inference.sock")
+
+def handle_request(op: int, engine: str, user_id: int, months_ahead: int, history) -> bytes:
+    """Answer one decoded request with an encoded response frame"""
+    if op == OP_INSIGHTS:
+        return encode_response(STATUS_OK, encode_json(get_forecaster(DEFAULT_ENGINE).spending_insights(history)))
+
+    forecaster = load_current_model(user_id, engine)
+    if forecaster is None:
+        return encode_response(STATUS_NOT_TRAINED)
+    if op == OP_FORECAST:
+        return encode_response(STATUS_OK, encode_forecast(
+            forecaster.predict_from_history(history, months_ahead, bands=bands_for(forecaster))
+        ))
+    if op == OP_STATUS:
+        return encode_response(STATUS_OK, encode_json({
+            'feature_columns': forecaster.feature_columns,
+            'training_config': forecaster.training_config
+        }))
+    return encode_response(STATUS_ERROR, f"Unknown operation {op}".encode('utf-8'))
+
+class InferenceHandler(socketserver.StreamRequestHandler):
+    """Serves requests from one API worker connection until it closes"""
+
+    def handle(self):
+        read = self.rfile.read
+        while True:
+            try:
+                header = recv_exact(read, REQUEST_HEADER.size)
+            except EOFError:
+                return
+            op, engine_code, user_id, months_ahead, names_len, n_rows = REQUEST_HEADER.unpack(header)
+            names = recv_exact(read, names_len)
+            records = recv_exact(read, n_rows * ROW_DTYPE.itemsize)
+            try:
+                response = handle_request(op, ENGINES[engine_code], user_id, months_ahead,
+                                          decode_rows(names, records))
+            except Exception as e:
+                logger.error(f"Inference request failed: {str(e)}")
+                response = encode_response(STATUS_ERROR, str(e).encode('utf-8'))
+            self.wfile.write(response)
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socket_path: str = INFERENCE_SOCKET):
+    """Listen on `socket_path` until interrupted"""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with InferenceServer(socket_path, InferenceHandler) as server:
+        # Only the user running the API may connect
+        os.chmod(socket_path, 0o600)
+        logger.info(f"Inference server listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the inference sidecar")
+    parser.add_argument("--socket", default=INFERENCE_SOCKET, help="Unix socket path")
+    args = parser.parse_args()
+    serve(args.socket)
@@ -0,0 +1,79 @@
+"""
+Interest Accrual
+Accrued interest and maturity value of interest-bearing holdings, computed with NumPy arrays
+"""
+
+import numpy as np
+from datetime import date
+from typing import Dict, List, Optional
+import logging
+from sqlalchemy.orm import Session
+
+from data_sources.investment_data import get_accrual_inputs
+from logic.portfolio_valuation import holdings_to_arrays, compounded_values
+
+logger = logging.getLogger(__name__)
+
+def maturity_values(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Invested amount compounded until maturity; NaN without a rate or a maturity date"""
+    return np.where(np.isnat(arrays['maturity']), np.nan, compounded_values(arrays, arrays['maturity']))
+
+def _amounts(values: np.ndarray) -> List[Optional[float]]:
+    rounded = np.round(values, 2).tolist()
+    return [value if value == value else None for value in rounded]
+
+def accrue(holdings: List[Dict], as_of: date) -> List[Dict]:
+    """Accrued value and interest on `as_of`, and value at maturity, of every holding at once
+
+    Interest compounds `periods_per_year` times a year (from `frequency`,
+    else the investment type's usual compounding) and stops at maturity.
+    Holdings without a maturity date have no maturity value.
+    """
+    if not holdings:
+        return []
+    arrays = holdings_to_arrays(holdings)
+    day = np.datetime64(as_of, 'D')
+    accrued = compounded_values(arrays, day)
+    at_maturity = maturity_values(arrays)
+    periods = arrays['periods_per_year']
+    effective = (1 + arrays['interest_rate'] / 100 / periods) ** periods - 1
+    days_left = np.maximum((arrays['maturity'] - day).astype(np.float64), 0)
+
+    columns = zip(
+        holdings, periods.tolist(), np.round(effective * 100, 4).tolist(),
+        _amounts(accrued), _amounts(accrued - arrays['amount']),
+        _amounts(at_maturity), _amounts(at_maturity - arrays['amount']),
+        [None if np.isnat(maturity) else int(days) for maturity, days in zip(arrays['maturity'], days_left)]
+    )
+    return [{
+        'investment_id': holding['id'],
+        'investment_type': holding.get('investment_type'),
+        'principal': holding['amount'],
+        'interest_rate': holding['interest_rate'],
+        'compounding_per_year': compounding,
+        'effective_annual_rate': effective_rate,
+        'accrued_value': accrued_value,
+        'accrued_interest': accrued_interest,
+        'maturity_date': holding.get('maturity_date'),
+        'maturity_value': maturity_value,
+        'maturity_interest': maturity_interest,
+        'days_to_maturity': days_to_maturity
+    } for (holding, compounding, effective_rate, accrued_value, accrued_interest,
+           maturity_value, maturity_interest, days_to_maturity) in columns]
+
+def get_accruals(db: Session, user_id: int, investment_id: Optional[int] = None) -> List[Dict]:
+    """Today's accruals of a user's interest-bearing holdings, or of one of them, in one array pass"""
+    holdings = get_accrual_inputs(db, user_id, investment_id)
+    return accrue(holdings, date.today())
+
+def summarize_accruals(rows: List[Dict]) -> Dict:
+    """Totals of accrual rows for the investment summary"""
+    with_maturity = [row for row in rows if row['maturity_value'] is not None]
+    return {
+        'holdings': len(rows),
+        'principal': round(sum(row['principal'] for row in rows), 2),
+        'accrued_value': round(sum(row['accrued_value'] for row in rows), 2),
+        'accrued_interest': round(sum(row['accrued_interest'] for row in rows), 2),
+        'maturity_value': round(sum(row['maturity_value'] for row in with_maturity), 2),
+        'maturity_interest': round(sum(row['maturity_interest'] for row in with_maturity), 2)
+    }
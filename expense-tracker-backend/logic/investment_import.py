@@ -0,0 +1,295 @@
+"""
+Investment Import
+Streams broker CSV and CAS statement exports into investments, de-duplicated and written in batches in one transaction
+"""
+
+import os
+import re
+import csv
+import time
+from datetime import date
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from data_sources.models import Investment
+from data_sources.investment_data import get_existing_investment_keys
+from data_sources.maturity_store import get_maturity_inputs, replace_maturities
+from data_sources.snapshot_store import delete_user_snapshots
+from logic.maturity_calendar import calendar_rows
+from logic.nav_loader import parse_date
+import schema.schemas as schemas
+
+logger = logging.getLogger(__name__)
+
+# Rows validated, de-duplicated against the database and inserted together
+IMPORT_BATCH_ROWS = int(os.getenv("INVESTMENT_IMPORT_BATCH_ROWS", "1000"))
+
+CSV_ALIASES = {
+    'name': ('name', 'scheme', 'scheme name', 'scheme_name', 'fund', 'fund name', 'security', 'instrument',
+             'stock', 'symbol'),
+    'investment_type': ('investment_type', 'investment type', 'type', 'asset class', 'category'),
+    'amount': ('amount', 'invested amount', 'investment amount', 'purchase value', 'amount (inr)', 'value'),
+    'date': ('date', 'transaction date', 'trade date', 'purchase date', 'txn date'),
+    'units': ('units', 'quantity', 'qty', 'shares'),
+    'nav': ('nav', 'price', 'purchase nav', 'purchase price', 'avg price'),
+    'folio_number': ('folio_number', 'folio number', 'folio', 'folio no', 'folio no.', 'account'),
+    'scheme_code': ('scheme_code', 'scheme code', 'amfi code', 'amfi_code'),
+    'institution': ('institution', 'amc', 'broker', 'registrar'),
+    'status': ('status',),
+    'maturity_date': ('maturity_date', 'maturity date'),
+    'interest_rate': ('interest_rate', 'interest rate', 'rate of interest'),
+    'frequency': ('frequency',),
+    'description': ('description', 'narration', 'remarks', 'notes'),
+    'transaction_type': ('transaction type', 'transaction_type', 'txn type', 'transaction')
+}
+TYPE_ALIASES = {
+    **{member.value.lower(): member.value for member in schemas.InvestmentType},
+    'mutual fund': 'Mutual Funds', 'mf': 'Mutual Funds', 'stock': 'Stocks', 'equity': 'Stocks', 'etf': 'Stocks',
+    'fd': 'Fixed Deposit', 'bond': 'Bonds', 'crypto': 'Cryptocurrency'
+}
+NUMERIC_FIELDS = ('amount', 'units', 'nav', 'interest_rate')
+DATE_FIELDS = ('date', 'maturity_date')
+# Transactions that take money out; an investment row only records money put in
+OUTFLOW_PATTERN = re.compile(r'redemption|redeem|\bsell\b|\bsold\b|switch[- ]?out|withdraw', re.IGNORECASE)
+
+CAS_MARKER = re.compile(r'consolidated account statement|^\s*folio\s*no\s*[:.]', re.IGNORECASE | re.MULTILINE)
+CAS_FOLIO = re.compile(r'Folio\s*No\s*[:.]?\s*([\w/ -]+?)(?:\s{2,}|\s+KYC|\s+PAN|$)', re.IGNORECASE)
+CAS_SCHEME_CODE = re.compile(r'AMFI\s*(?:code)?\s*[:.]?\s*(\d+)', re.IGNORECASE)
+CAS_REGISTRAR = re.compile(r'Registrar\s*:\s*(\w+)', re.IGNORECASE)
+CAS_SCHEME_SUFFIX = re.compile(r'\s*\((?:Advisor|AMFI)|\s+Registrar\s*:|\s+AMFI\s', re.IGNORECASE)
+_NUMBER = r'\(?-?[\d,]+\.\d+\)?'
+CAS_TRANSACTION = re.compile(
+    rf'^\s*(\d{{2}}-[A-Za-z]{{3}}-\d{{4}})\s+(.+?)\s+({_NUMBER})\s+({_NUMBER})\s+({_NUMBER})\s+({_NUMBER})\s*$'
+)
+
+def _number(value: Optional[str]) -> Optional[float]:
+    """A float from statement-style text: commas, currency marks and (negative) parentheses allowed"""
+    if value is None:
+        return None
+    text = value.strip().replace(',', '').replace('₹', '').replace('INR', '').strip()
+    if not text:
+        return None
+    negative = text.startswith('(') and text.endswith(')')
+    number = float(text.strip('()'))
+    return -number if negative else number
+
+def detect_format(first_lines: List[str]) -> str:
+    """'cas' for consolidated account statement text, 'csv' otherwise"""
+    return 'cas' if CAS_MARKER.search(''.join(first_lines)) else 'csv'
+
+def parse_csv_rows(lines: Iterable[str]) -> Iterator[Tuple[int, Dict]]:
+    """(line number, raw investment fields) per CSV row, with columns matched by header name"""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in CSV_ALIASES.items():
+        index = next((names.index(alias) for alias in aliases if alias in names), None)
+        if index is not None:
+            columns[field] = index
+    if 'amount' not in columns or 'date' not in columns:
+        raise ValueError("CSV header needs amount and date columns")
+
+    for line_number, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        yield line_number, {
+            field: values[index].strip() if index < len(values) and values[index].strip() else None
+            for field, index in columns.items()
+        }
+
+def parse_cas_lines(lines: Iterable[str]) -> Iterator[Tuple[int, Dict]]:
+    """(line number, raw investment fields) per transaction of a CAS text export
+
+    A "Folio No:" line starts a folio, the next line that is not a
+    transaction names its scheme (with any "(Advisor ...)" and "Registrar"
+    suffixes removed), and each "date description amount units price
+    balance" line is a transaction in that scheme.
+    """
+    folio, scheme, scheme_code, registrar = None, None, None, None
+    for line_number, line in enumerate(lines, start=1):
+        match = CAS_TRANSACTION.match(line)
+        if match:
+            if scheme is None:
+                continue
+            day, description, amount, units, price, _ = match.groups()
+            yield line_number, {
+                'name': scheme, 'investment_type': 'Mutual Funds', 'amount': amount, 'date': day,
+                'units': units, 'nav': price, 'folio_number': folio, 'scheme_code': scheme_code,
+                'institution': registrar, 'description': description.strip(),
+                'transaction_type': description.strip()
+            }
+            continue
+
+        folio_match = CAS_FOLIO.search(line)
+        if folio_match:
+            folio, scheme, scheme_code, registrar = folio_match.group(1).strip(), None, None, None
+            continue
+        text = line.strip()
+        if folio is not None and scheme is None and text and not text.lower().startswith(('opening', 'closing')):
+            registrar_match = CAS_REGISTRAR.search(text)
+            registrar = registrar_match.group(1) if registrar_match else None
+            code_match = CAS_SCHEME_CODE.search(text)
+            scheme_code = code_match.group(1) if code_match else None
+            scheme = CAS_SCHEME_SUFFIX.split(text)[0].strip()
+
+def _to_investment(fields: Dict, dates: Dict[str, Optional[date]]) -> Tuple[Optional[Dict], str, Optional[str]]:
+    """(row to insert, status, message) for one parsed row; status is 'new', 'skipped' or 'error'
+
+    `dates` caches parsed date strings across rows; a statement repeats few distinct dates.
+    """
+    transaction = fields.pop('transaction_type', None)
+    if transaction and OUTFLOW_PATTERN.search(transaction):
+        return None, 'skipped', f"Outflow not imported: {transaction}"
+    try:
+        for field in NUMERIC_FIELDS:
+            if field in fields:
+                fields[field] = _number(fields[field])
+        for field in DATE_FIELDS:
+            if fields.get(field) is not None:
+                raw = fields[field]
+                parsed = dates[raw] if raw in dates else dates.setdefault(raw, parse_date(raw))
+                if parsed is None:
+                    return None, 'error', f"Unrecognised {field}: {fields[field]}"
+                fields[field] = parsed
+    except ValueError as e:
+        return None, 'error', f"Unrecognised number: {str(e)}"
+    if fields.get('amount') is not None and fields['amount'] <= 0:
+        return None, 'skipped', "Outflow not imported: negative amount"
+
+    raw_type = fields.get('investment_type')
+    if raw_type is None:
+        fields['investment_type'] = 'Mutual Funds' if fields.get('folio_number') else 'Other'
+    else:
+        fields['investment_type'] = TYPE_ALIASES.get(raw_type.lower(), raw_type)
+    if not fields.get('name'):
+        fields['name'] = fields.get('folio_number') or fields['investment_type']
+    if fields.get('description') is None and transaction:
+        fields['description'] = transaction
+    if fields.get('status') is not None:
+        fields['status'] = fields['status'].capitalize()
+
+    try:
+        investment = schemas.InvestmentCreate(**{k: v for k, v in fields.items() if v is not None})
+    except ValidationError as e:
+        error = e.errors()[0]
+        return None, 'error', f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+    row = investment.model_dump()
+    row['investment_type'] = investment.investment_type.value
+    row['status'] = investment.status.value
+    return row, 'new', None
+
+def _dedupe_key(folio_number: Optional[str], name: str, day: date, amount: float) -> Tuple:
+    """(folio_number, date, amount); the name stands in for a missing folio"""
+    return folio_number or f"name:{name}", day, round(amount, 2)
+
+def import_investments(db: Session, user_id: int, lines: Iterable[str], file_format: Optional[str] = None,
+                       dry_run: bool = False) -> Dict:
+    """Import a CSV or CAS export for one user and report on every row
+
+    Rows already in the file or the database on (folio_number, date,
+    amount) are reported as duplicates. New rows are inserted
+    `IMPORT_BATCH_ROWS` at a time; everything, including the user's
+    maturity calendar, commits once at the end, or nothing does.
+    """
+    started = time.perf_counter()
+    lines = iter(lines)
+    first_lines = []
+    for line in lines:
+        first_lines.append(line)
+        if len(first_lines) >= 20:
+            break
+    file_format = file_format or detect_format(first_lines)
+    parser = parse_cas_lines if file_format == 'cas' else parse_csv_rows
+    all_lines = chain(first_lines, lines)
+
+    report: List[Dict] = []
+    counts = {'imported': 0, 'duplicate': 0, 'skipped': 0, 'error': 0}
+    seen = set()
+    dates: Dict[str, Optional[date]] = {}
+    batch: List[Tuple[Dict, Dict]] = []
+    earliest: List[date] = []
+
+    def flush():
+        matches = get_existing_investment_keys(db, user_id, [row for row, _ in batch])
+        existing = {_dedupe_key(*match) for match in matches}
+        new_rows = []
+        for row, entry in batch:
+            if _dedupe_key(row['folio_number'], row['name'], row['date'], row['amount']) in existing:
+                entry['status'], entry['message'] = 'duplicate', "Already imported"
+                counts['duplicate'] += 1
+            else:
+                entry['status'] = 'imported'
+                counts['imported'] += 1
+                new_rows.append({**row, 'user_id': user_id})
+        if new_rows and not dry_run:
+            db.execute(insert(Investment.__table__), new_rows)
+            earliest.append(min(row['date'] for row in new_rows))
+        batch.clear()
+
+    try:
+        for line_number, fields in parser(all_lines):
+            row, status, message = _to_investment(fields, dates)
+            entry = {
+                'line': line_number,
+                'status': status,
+                'message': message,
+                'name': row['name'] if row else fields.get('name'),
+                'folio_number': row['folio_number'] if row else fields.get('folio_number'),
+                'date': row['date'] if row else None,
+                'amount': row['amount'] if row else None
+            }
+            report.append(entry)
+            if row is None:
+                counts[status] += 1
+                continue
+            key = _dedupe_key(row['folio_number'], row['name'], row['date'], row['amount'])
+            if key in seen:
+                entry['status'], entry['message'] = 'duplicate', "Repeated in this file"
+                counts['duplicate'] += 1
+                continue
+            seen.add(key)
+            batch.append((row, entry))
+            if len(batch) >= IMPORT_BATCH_ROWS:
+                flush()
+        if batch:
+            flush()
+
+        if dry_run:
+            db.rollback()
+        else:
+            if counts['imported']:
+                replace_maturities(db, calendar_rows(get_maturity_inputs(db, user_id=user_id)), user_id)
+                delete_user_snapshots(db, user_id, min(earliest))
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error importing investments for user {user_id}: {str(e)}")
+        return {
+            'success': False, 'message': f"Import failed, nothing was saved: {str(e)}", 'format': file_format,
+            'dry_run': dry_run, 'total_rows': len(report), 'imported': 0, 'duplicates': 0, 'skipped': 0,
+            'errors': 0, 'seconds': round(time.perf_counter() - started, 2), 'rows': report
+        }
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Imported {counts['imported']} of {len(report)} investment rows for user {user_id} "
+                f"in {elapsed:.2f}s")
+    return {
+        'success': True,
+        'message': f"{'Would import' if dry_run else 'Imported'} {counts['imported']} of {len(report)} rows",
+        'format': file_format,
+        'dry_run': dry_run,
+        'total_rows': len(report),
+        'imported': counts['imported'],
+        'duplicates': counts['duplicate'],
+        'skipped': counts['skipped'],
+        'errors': counts['error'],
+        'seconds': round(elapsed, 2),
+        'rows': report
+    }
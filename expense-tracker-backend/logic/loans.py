@@ -0,0 +1,291 @@
+"""
+Loans
+EMI schedules, outstanding balances and prepayment simulations for many loans at once, computed with NumPy arrays
+"""
+
+import time
+import numpy as np
+from datetime import date
+from typing import Dict, List, Optional
+import logging
+from sqlalchemy.orm import Session
+
+from data_sources.models import Category, Expense
+from data_sources.feature_store import add_expense_to_rollups
+from data_sources.snapshot_store import delete_user_snapshots
+from data_sources.loan_data import (
+    get_loan_inputs, get_prepayments, get_linked_installments, get_category_by_name, get_unlinked_expenses,
+    link_expenses
+)
+from logic.portfolio_valuation import day_numbers
+
+logger = logging.getLogger(__name__)
+
+PREPAYMENT_STRATEGIES = ('reduce_tenure', 'reduce_emi')
+# Balances below half a paisa count as repaid
+BALANCE_EPSILON = 0.005
+EMI_CATEGORY = {"name": "Housing", "description": "Rent, mortgage, and housing expenses", "color": "#45B7D1"}
+# An existing expense within this much of an EMI, in the EMI's month, is taken to be that EMI
+EMI_MATCH_TOLERANCE = 1.0
+SCHEDULE_FIELDS = ('installment', 'due_date', 'opening_balance', 'emi', 'interest', 'principal', 'prepayment',
+                   'closing_balance')
+
+def emi_amounts(principal: np.ndarray, monthly_rate: np.ndarray, tenure: np.ndarray) -> np.ndarray:
+    """Equated monthly installment repaying `principal` over `tenure` months"""
+    growth = (1 + monthly_rate) ** tenure
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(monthly_rate > 0, principal * monthly_rate * growth / (growth - 1), principal / tenure)
+
+def loans_to_arrays(loans: List[Dict]) -> Dict[str, np.ndarray]:
+    """Column arrays of the fields amortization uses"""
+    principal = np.array([loan['principal'] for loan in loans], dtype=np.float64)
+    rate = np.array([loan['interest_rate'] for loan in loans], dtype=np.float64) / 12 / 100
+    tenure = np.array([loan['tenure_months'] for loan in loans], dtype=np.int64)
+    return {
+        'principal': principal,
+        'rate': rate,
+        'tenure': tenure,
+        'start': day_numbers([loan['start_date'] for loan in loans]),
+        'reduce_emi': np.array([loan.get('prepayment_strategy') == 'reduce_emi' for loan in loans]),
+        'emi': emi_amounts(principal, rate, tenure)
+    }
+
+def _due_dates(start: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """`months` months after `start`, on the same day of the month or the month's last day"""
+    start_month = start.astype('datetime64[M]')
+    day_of_month = start - start_month.astype('datetime64[D]')
+    month = start_month + months
+    month_end = (month + 1).astype('datetime64[D]') - 1
+    return np.minimum(month.astype('datetime64[D]') + day_of_month, month_end)
+
+def amortize(arrays: Dict[str, np.ndarray], prepayments: List[Dict], loan_ids: List[int]) -> Dict[str, np.ndarray]:
+    """Every installment of every loan as (loans, months) arrays
+
+    The balance after installment k has a closed form, so all periods come
+    from one pass over the grid. With g = (1 + r)^k, a prepayment p_j made
+    with installment k_j and the original EMI:
+
+    - reduce_tenure keeps the EMI: B_k = P·g − EMI·(g − 1)/r − g·Σ p_j/g_j
+    - reduce_emi keeps the end date: the no-prepayment balance A_k is scaled
+      by C_k = 1 − Σ p_j/A_j, and so is the EMI after each prepayment.
+
+    Sums run over prepayments with k_j ≤ k, as cumulative sums along the
+    months. A prepayment applies with the last installment due on or
+    before its date (the first, if it comes earlier); ones after the final
+    installment are ignored. Balances are then floored at zero: payments
+    stop once a loan is repaid, and the last payment is only what is owed.
+    """
+    n_loans = len(loan_ids)
+    n_months = int(arrays['tenure'].max()) if n_loans else 0
+    k = np.arange(n_months + 1)
+    principal, rate, tenure = arrays['principal'][:, None], arrays['rate'][:, None], arrays['tenure'][:, None]
+    growth = (1 + rate) ** k
+
+    prepaid = np.zeros((n_loans, n_months + 1))
+    if prepayments:
+        index = {loan_id: i for i, loan_id in enumerate(loan_ids)}
+        rows = np.array([index[p['loan_id']] for p in prepayments])
+        paid_on = day_numbers([p['date'] for p in prepayments])
+        months = (paid_on.astype('datetime64[M]') - arrays['start'][rows].astype('datetime64[M]')).astype(np.int64)
+        installment = np.where(_due_dates(arrays['start'][rows], months) <= paid_on, months, months - 1)
+        installment = np.maximum(installment, 1)
+        applies = installment <= arrays['tenure'][rows]
+        np.add.at(prepaid, (rows[applies], installment[applies]),
+                  np.array([p['amount'] for p in prepayments], dtype=np.float64)[applies])
+
+    emi = arrays['emi'][:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # reduce_tenure
+        kept_emi = np.where(
+            rate > 0,
+            principal * growth - emi * (growth - 1) / rate - growth * np.cumsum(prepaid / growth, axis=1),
+            principal - emi * k - np.cumsum(prepaid, axis=1)
+        )
+        # reduce_emi
+        final_growth = (1 + rate) ** tenure
+        annuity = np.where(rate > 0, principal * (final_growth - growth) / (final_growth - 1),
+                           principal * (tenure - k) / tenure)
+        annuity = np.maximum(annuity, 0)
+        scale = 1 - np.cumsum(np.where(annuity > 0, prepaid / annuity, 0), axis=1)
+    reduce_emi = arrays['reduce_emi'][:, None]
+    balance = np.where(reduce_emi, annuity * scale, kept_emi)
+    balance = np.where((balance > BALANCE_EPSILON) & (k <= tenure), balance, 0.0)
+    balance[:, 0] = principal[:, 0]
+
+    opening, closing = balance[:, :-1], balance[:, 1:]
+    interest = opening * rate
+    owed = opening + interest
+    installment_emi = np.where(reduce_emi, emi * np.maximum(scale[:, :-1], 0), emi)
+    payment = np.minimum(installment_emi, owed)
+    return {
+        'installment': np.broadcast_to(k[1:], opening.shape),
+        'due_date': _due_dates(arrays['start'][:, None], k[None, 1:]),
+        'opening_balance': opening,
+        'emi': payment,
+        'scheduled_emi': installment_emi,
+        'interest': interest,
+        'principal': payment - interest,
+        'prepayment': np.maximum(owed - payment - closing, 0),
+        'closing_balance': closing,
+        'active': opening > BALANCE_EPSILON
+    }
+
+def _round(values: np.ndarray) -> List[float]:
+    return np.round(values, 2).tolist()
+
+def loan_schedules(loans: List[Dict], prepayments: List[Dict]) -> Dict[int, Dict]:
+    """Per loan: its EMI, every installment up to repayment, and totals
+
+    `final_emi` is the EMI in force at the end, lower than `emi` when
+    prepayments reduced it.
+    """
+    if not loans:
+        return {}
+    loan_ids = [loan['id'] for loan in loans]
+    arrays = loans_to_arrays(loans)
+    grid = amortize(arrays, prepayments, loan_ids)
+    active = grid['active']
+    counts = active.sum(axis=1)
+
+    # Active installments are a prefix of each row, so the flat selection splits by count
+    columns = [grid[field][active] for field in SCHEDULE_FIELDS]
+    columns[1] = columns[1].astype(object)
+    flat = list(zip(columns[0].tolist(), columns[1].tolist(), *(_round(column) for column in columns[2:])))
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+
+    total_interest = np.where(active, grid['interest'], 0).sum(axis=1)
+    total_prepaid = np.where(active, grid['prepayment'], 0).sum(axis=1)
+    last = np.maximum(counts - 1, 0)
+    closes_on = grid['due_date'][np.arange(len(loans)), last]
+    schedules = {}
+    for i, loan in enumerate(loans):
+        schedules[loan['id']] = {
+            'emi': round(float(arrays['emi'][i]), 2),
+            'final_emi': round(float(grid['scheduled_emi'][i, last[i]]), 2),
+            'installments': int(counts[i]),
+            'total_interest': round(float(total_interest[i]), 2),
+            'total_prepaid': round(float(total_prepaid[i]), 2),
+            'total_paid': round(float(arrays['principal'][i] + total_interest[i]), 2),
+            'closes_on': closes_on[i].astype(object) if counts[i] else None,
+            'rows': [dict(zip(SCHEDULE_FIELDS, row)) for row in flat[bounds[i]:bounds[i + 1]]]
+        }
+    return schedules
+
+def loan_balances(loans: List[Dict], prepayments: List[Dict], as_of: date) -> Dict[int, Dict]:
+    """Per loan: what has been repaid and what is outstanding after the installments due by `as_of`"""
+    if not loans:
+        return {}
+    loan_ids = [loan['id'] for loan in loans]
+    arrays = loans_to_arrays(loans)
+    grid = amortize(arrays, prepayments, loan_ids)
+    active = grid['active']
+    paid = active & (grid['due_date'] <= np.datetime64(as_of, 'D'))
+    upcoming = active & ~paid
+    rows = np.arange(len(loans))
+
+    paid_count = paid.sum(axis=1)
+    outstanding = np.where(paid_count > 0, grid['closing_balance'][rows, np.maximum(paid_count - 1, 0)],
+                           arrays['principal'])
+    interest_paid = np.where(paid, grid['interest'], 0).sum(axis=1)
+    principal_paid = np.where(paid, grid['principal'] + grid['prepayment'], 0).sum(axis=1)
+    remaining_interest = np.where(upcoming, grid['interest'], 0).sum(axis=1)
+    has_next = upcoming.any(axis=1)
+    next_index = np.argmax(upcoming, axis=1)
+
+    return {loan['id']: {
+        'as_of': as_of,
+        'emi': round(float(arrays['emi'][i]), 2),
+        'installments_paid': int(paid_count[i]),
+        'installments_remaining': int(upcoming[i].sum()),
+        'outstanding_principal': round(float(outstanding[i]), 2),
+        'principal_repaid': round(float(principal_paid[i]), 2),
+        'interest_paid': round(float(interest_paid[i]), 2),
+        'remaining_interest': round(float(remaining_interest[i]), 2),
+        'next_due_date': grid['due_date'][i, next_index[i]].astype(object) if has_next[i] else None,
+        'next_emi': round(float(grid['emi'][i, next_index[i]]), 2) if has_next[i] else None
+    } for i, loan in enumerate(loans)}
+
+def simulate_prepayments(loan: Dict, prepayments: List[Dict], extra: List[Dict],
+                         strategy: Optional[str] = None) -> Dict:
+    """The loan as recorded against the loan with `extra` prepayments, computed together"""
+    simulated = {**loan, 'id': -1, 'prepayment_strategy': strategy or loan['prepayment_strategy']}
+    schedules = loan_schedules(
+        [loan, simulated],
+        prepayments + [{**p, 'loan_id': -1} for p in prepayments + extra]
+    )
+    current, scenario = schedules[loan['id']], schedules[-1]
+    return {
+        'strategy': simulated['prepayment_strategy'],
+        'current': {key: value for key, value in current.items() if key != 'rows'},
+        'simulated': {key: value for key, value in scenario.items() if key != 'rows'},
+        'interest_saved': round(current['total_interest'] - scenario['total_interest'], 2),
+        'installments_saved': current['installments'] - scenario['installments'],
+        'schedule': scenario['rows']
+    }
+
+def _emi_category(db: Session, user_id: int) -> Category:
+    category = get_category_by_name(db, user_id, EMI_CATEGORY['name'])
+    if category is None:
+        category = Category(user_id=user_id, **EMI_CATEGORY)
+        db.add(category)
+        db.flush()
+    return category
+
+def sync_emi_expenses(db: Session, through: date, user_id: Optional[int] = None,
+                      loan_ids: Optional[List[int]] = None) -> Dict:
+    """Record every EMI due by `through` as a Housing expense linked to its installment
+
+    Runs in the caller's transaction, for the tracked loans of one user,
+    given loans, or everyone. Installments already linked are left alone.
+    An unlinked Housing expense in the EMI's month within
+    `EMI_MATCH_TOLERANCE` of its amount is linked instead of adding a
+    duplicate, so EMIs entered by hand before the loan existed are kept.
+    """
+    started = time.perf_counter()
+    loans = get_loan_inputs(db, user_id=user_id, loan_ids=loan_ids, tracked_only=True)
+    if not loans:
+        return {'loans': 0, 'linked': 0, 'created': 0, 'seconds': 0.0}
+    ids = [loan['id'] for loan in loans]
+    schedules = loan_schedules(loans, get_prepayments(db, ids))
+    linked = get_linked_installments(db, ids)
+
+    links, created = [], 0
+    # Earliest new EMI per user; their net worth snapshots from then on carry the old spend
+    earliest: Dict[int, date] = {}
+    for loan in loans:
+        due = [row for row in schedules[loan['id']]['rows']
+               if row['due_date'] <= through and (loan['id'], row['installment']) not in linked]
+        if not due:
+            continue
+        category = _emi_category(db, loan['user_id'])
+        candidates = {}
+        for expense_id, day, amount in get_unlinked_expenses(
+            db, loan['user_id'], category.id, due[0]['due_date'].replace(day=1), due[-1]['due_date']
+        ):
+            candidates.setdefault((day.year, day.month), []).append((expense_id, amount))
+        for row in due:
+            month = candidates.get((row['due_date'].year, row['due_date'].month), [])
+            match = next((c for c in month if abs(c[1] - row['emi']) <= EMI_MATCH_TOLERANCE), None)
+            if match is not None:
+                month.remove(match)
+                links.append({'id': match[0], 'loan_id': loan['id'], 'loan_installment': row['installment']})
+                continue
+            expense = Expense(
+                description=f"EMI {row['installment']}/{len(schedules[loan['id']]['rows'])} - {loan['name']}",
+                amount=row['emi'],
+                date=row['due_date'],
+                category_id=category.id,
+                user_id=loan['user_id'],
+                loan_id=loan['id'],
+                loan_installment=row['installment']
+            )
+            db.add(expense)
+            add_expense_to_rollups(db, expense)
+            created += 1
+            if loan['user_id'] not in earliest or row['due_date'] < earliest[loan['user_id']]:
+                earliest[loan['user_id']] = row['due_date']
+    link_expenses(db, links)
+    for loan_user_id, start in earliest.items():
+        delete_user_snapshots(db, loan_user_id, start)
+    return {'loans': len(loans), 'linked': len(links), 'created': created,
+            'seconds': round(time.perf_counter() - started, 2)}
@@ -0,0 +1,81 @@
+"""
+Maturity Calendar
+Projected maturity payouts of open investments, stored for date-range reads and refreshed on writes and by the scheduler
+"""
+
+import os
+import time
+import numpy as np
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import logging
+from sqlalchemy.orm import Session
+
+from data_sources.maturity_store import (
+    get_maturity_inputs, replace_maturities, replace_investment_maturity, get_maturities
+)
+from logic.portfolio_valuation import holdings_to_arrays
+from logic.interest_accrual import maturity_values
+
+logger = logging.getLogger(__name__)
+
+# Maturities listed in the investment summary, in days from today
+MATURITY_SUMMARY_DAYS = int(os.getenv("INVESTMENT_MATURITY_SUMMARY_DAYS", "90"))
+
+def calendar_rows(holdings: List[Dict]) -> List[Dict]:
+    """One calendar row per holding, with its payout projected to its maturity date
+
+    Holdings with units and NAV pay out their current market value;
+    interest-bearing ones their amount compounded until maturity; the rest
+    their principal.
+    """
+    if not holdings:
+        return []
+    arrays = holdings_to_arrays(holdings)
+    market = arrays['units'] * arrays['nav']
+    accrued = maturity_values(arrays)
+    payouts = np.where(np.isfinite(market), market, np.where(np.isfinite(accrued), accrued, arrays['amount']))
+    basis = np.where(np.isfinite(market), 'market_value',
+                     np.where(np.isfinite(accrued), 'interest', 'principal'))
+    return [{
+        'investment_id': holding['id'],
+        'user_id': holding['user_id'],
+        'name': holding['name'],
+        'investment_type': holding['investment_type'],
+        'maturity_date': holding['maturity_date'],
+        'principal': holding['amount'],
+        'interest_rate': holding['interest_rate'],
+        'projected_payout': round(float(payout), 2),
+        'payout_basis': str(payout_basis)
+    } for holding, payout, payout_basis in zip(holdings, payouts, basis)]
+
+def refresh_maturity_calendar(db: Session, user_id: Optional[int] = None) -> Dict:
+    """Rebuild the calendar of one user, or of everyone, within the caller's transaction"""
+    started = time.perf_counter()
+    rows = calendar_rows(get_maturity_inputs(db, user_id=user_id))
+    replace_maturities(db, rows, user_id)
+    return {'rows': len(rows), 'seconds': round(time.perf_counter() - started, 2)}
+
+def refresh_investment_maturity(db: Session, investment_id: int):
+    """Bring one investment's calendar row in line with it, in the caller's transaction
+
+    Call after the investment's changes are flushed; an investment that is
+    closed or has no maturity date loses its row.
+    """
+    rows = calendar_rows(get_maturity_inputs(db, investment_id=investment_id))
+    replace_investment_maturity(db, investment_id, rows[0] if rows else None)
+
+def upcoming_maturities(db: Session, user_id: int, today: date, days: int = MATURITY_SUMMARY_DAYS) -> List[Dict]:
+    """Active investments' calendar rows maturing in the next `days` days, shaped for the investment summary
+
+    The calendar also holds Paused investments and ones without a status; the
+    summary keeps listing only Active ones, as it always has.
+    """
+    return [{
+        'id': row['investment_id'],
+        'name': row['name'],
+        'amount': row['principal'],
+        'projected_payout': row['projected_payout'],
+        'maturity_date': row['maturity_date'],
+        'days_remaining': (row['maturity_date'] - today).days
+    } for row in get_maturities(db, user_id, today, today + timedelta(days=days), status="Active")]
@@ -0,0 +1,171 @@
+"""
+Model Registry
+Versioned per-user model files behind an atomically replaced manifest, with a revalidating cache
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
+import logging
+
+from logic.forecast_engines import create_forecaster, get_model_path, get_versioned_model_path
+
+if TYPE_CHECKING:
+    from logic.ai_logic import ExpenseForecaster
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = "models"
+# Versions kept per user and engine, including the current one
+MODEL_RETENTION = max(1, int(os.getenv("AI_MODEL_RETENTION", "3")))
+# Loaded models kept in memory per worker
+MODEL_CACHE_SIZE = int(os.getenv("AI_MODEL_CACHE_SIZE", "256"))
+
+def get_manifest_path(user_id: int) -> str:
+    """Manifest listing the model versions of one user"""
+    return os.path.join(MODEL_DIR, f"user_{user_id}_manifest.json")
+
+def read_manifest(user_id: int) -> Dict:
+    """Current manifest of a user, empty if none has been written"""
+    try:
+        with open(get_manifest_path(user_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_manifest(user_id: int, manifest: Dict):
+    path = get_manifest_path(user_id)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+@contextmanager
+def _manifest_lock(user_id: int):
+    """Serialize manifest updates for a user across processes"""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with open(f"{get_manifest_path(user_id)}.lock", 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def publish_model(user_id: int, engine: str, forecaster: 'ExpenseForecaster',
+                  metadata: Optional[Dict] = None) -> Optional[int]:
+    """Save a trained model as the user's next version and make it current
+
+    The model is written to a temporary file and renamed into place before the
+    manifest points at it, so readers only ever see complete files. Versions
+    beyond MODEL_RETENTION are deleted afterwards.
+    """
+    with _manifest_lock(user_id):
+        manifest = read_manifest(user_id)
+        entry = manifest.get(engine, {'current': None, 'versions': []})
+        version = max((v['version'] for v in entry['versions']), default=0) + 1
+
+        path = get_versioned_model_path(user_id, engine, version)
+        # Keep the extension last, save_model picks the file format from it
+        stem, extension = os.path.splitext(path)
+        tmp_path = f"{stem}.{os.getpid()}.tmp{extension}"
+        if not forecaster.save_model(tmp_path):
+            return None
+        os.replace(tmp_path, path)
+
+        entry['versions'].append({
+            'version': version,
+            'file': path,
+            'saved_at': datetime.now().isoformat(),
+            **(metadata or {})
+        })
+        entry['current'] = version
+        expired = entry['versions'][:-MODEL_RETENTION]
+        entry['versions'] = entry['versions'][-MODEL_RETENTION:]
+        manifest[engine] = entry
+        _write_manifest(user_id, manifest)
+
+    # Workers still reading an expired file keep their open handle
+    for old in expired:
+        try:
+            os.remove(old['file'])
+        except FileNotFoundError:
+            pass
+    logger.info(f"Published {engine} model v{version} for user {user_id}")
+    return version
+
+def current_model_info(user_id: int, engine: str) -> Optional[Dict]:
+    """Manifest entry of the current version, if there is one"""
+    entry = read_manifest(user_id).get(engine)
+    if not entry or entry.get('current') is None:
+        return None
+    return next((v for v in entry['versions'] if v['version'] == entry['current']), None)
+
+# (user_id, engine) -> (signature, version, forecaster), least recently used first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _signature(path: str):
+    """Changes whenever the file at `path` is replaced"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def _remember(key, signature, version, forecaster: 'ExpenseForecaster') -> 'ExpenseForecaster':
+    with _cache_lock:
+        _cache[key] = (signature, version, forecaster)
+        _cache.move_to_end(key)
+        while len(_cache) > MODEL_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return forecaster
+
+def load_current_model(user_id: int, engine: str) -> Optional['ExpenseForecaster']:
+    """The user's current trained model, reloaded only when the manifest changes
+
+    A stat of the manifest revalidates a cached model; a new version
+    published by any worker is picked up on the next call. Users without a
+    manifest fall back to the unversioned file of earlier releases.
+    """
+    key = (user_id, engine)
+    signature = _signature(get_manifest_path(user_id))
+    if signature is None:
+        legacy_path = get_model_path(user_id, engine)
+        signature, version, path = _signature(legacy_path), 'legacy', legacy_path
+        if signature is None:
+            return None
+    else:
+        version = path = None
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None and cached[0] == signature:
+        return cached[2]
+
+    if version is None:
+        info = current_model_info(user_id, engine)
+        if info is None:
+            return None
+        version, path = info['version'], info['file']
+        if cached is not None and cached[1] == version:
+            return _remember(key, signature, version, cached[2])
+
+    forecaster = create_forecaster(engine)
+    if not forecaster.load_model(path):
+        return None
+    return _remember(key, signature, version, forecaster)
@@ -0,0 +1,97 @@
+"""
+Adaptive Forest Sizing
+Picks Random Forest size from the training set and grows it within a time budget
+"""
+
+import os
+import time
+import math
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock and CPU seconds one forest fit may use
+TRAINING_BUDGET_SECONDS = float(os.getenv("AI_TRAINING_BUDGET_SECONDS", "2.0"))
+TRAINING_CPU_BUDGET_SECONDS = float(os.getenv("AI_TRAINING_CPU_BUDGET_SECONDS", "4.0"))
+
+MAX_TREES = 200
+TREE_STEP = 10
+# Minimum out-of-bag R² gain per step, and how many flat steps end growth
+OOB_TOLERANCE = 0.002
+OOB_PATIENCE = 2
+# Below this many rows out-of-bag scores are too noisy to steer growth
+MIN_OOB_SAMPLES = 30
+
+def choose_forest_config(n_samples: int) -> Dict:
+    """Pick depth, leaf size and bootstrap size from the training set size"""
+    depth = int(np.clip(math.log2(max(n_samples, 2)), 3, 12))
+    return {
+        'max_depth': depth,
+        'min_samples_leaf': 1 if n_samples < 200 else 2 if n_samples < 2000 else 5,
+        # Large sets bootstrap a fixed-size sample so per-tree cost stays flat
+        'max_samples': None if n_samples <= 2000 else 2000 / n_samples,
+        'max_trees': MAX_TREES if n_samples >= MIN_OOB_SAMPLES else 50
+    }
+
+def fit_forest_within_budget(X: np.ndarray, y: np.ndarray, model_params: Dict,
+                             budget_seconds: Optional[float] = None,
+                             cpu_budget_seconds: Optional[float] = None) -> Tuple[RandomForestRegressor, Dict]:
+    """Grow a forest in steps of TREE_STEP trees until it stops paying off
+
+    Growth ends when the out-of-bag R² has not improved by OOB_TOLERANCE for
+    OOB_PATIENCE steps, when another step would not fit in the wall-clock or
+    CPU budget, or at the size cap. Returns the model and the configuration
+    actually used.
+    """
+    budget_seconds = TRAINING_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    cpu_budget_seconds = TRAINING_CPU_BUDGET_SECONDS if cpu_budget_seconds is None else cpu_budget_seconds
+    config = choose_forest_config(len(X))
+    use_oob = len(X) >= MIN_OOB_SAMPLES
+
+    params = {key: value for key, value in model_params.items() if key != 'n_estimators'}
+    params.update(max_depth=config['max_depth'], min_samples_leaf=config['min_samples_leaf'],
+                  max_samples=config['max_samples'])
+    model = RandomForestRegressor(n_estimators=0, warm_start=True, oob_score=use_oob, **params)
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    best_oob, flat_steps = -np.inf, 0
+    stop_reason = 'max_trees'
+    while model.n_estimators < config['max_trees']:
+        step_start, step_cpu = time.perf_counter(), time.process_time()
+        model.set_params(n_estimators=model.n_estimators + TREE_STEP)
+        model.fit(X, y)
+        step_wall = time.perf_counter() - step_start
+        step_cpu = time.process_time() - step_cpu
+
+        if use_oob:
+            if model.oob_score_ > best_oob + OOB_TOLERANCE:
+                best_oob, flat_steps = model.oob_score_, 0
+            else:
+                flat_steps += 1
+            if flat_steps >= OOB_PATIENCE:
+                stop_reason = 'oob_plateau'
+                break
+
+        # Stop if one more step would overrun either budget
+        if (time.perf_counter() - wall_start + step_wall > budget_seconds or
+                time.process_time() - cpu_start + step_cpu > cpu_budget_seconds):
+            stop_reason = 'budget'
+            break
+
+    training_config = {
+        'n_estimators': model.n_estimators,
+        'max_depth': config['max_depth'],
+        'min_samples_leaf': config['min_samples_leaf'],
+        'max_samples': config['max_samples'],
+        'oob_score': round(float(model.oob_score_), 4) if use_oob else None,
+        'stop_reason': stop_reason,
+        'fit_seconds': round(time.perf_counter() - wall_start, 3),
+        'fit_cpu_seconds': round(time.process_time() - cpu_start, 3),
+        'budget_seconds': budget_seconds,
+        'training_samples': len(X)
+    }
+    logger.info(f"Forest sized to {model.n_estimators} trees ({stop_reason}) on {len(X)} samples")
+    return model, training_config
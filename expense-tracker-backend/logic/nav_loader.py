@@ -0,0 +1,125 @@
+"""
+NAV Loader
+Streams AMFI-style NAV files into nav_history and revalues holdings from it
+"""
+
+import os
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import logging
+from sqlalchemy.orm import Session
+
+from data_sources.nav_data import load_nav_rows, revalue_investments
+from data_sources.snapshot_store import delete_scheme_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Rows sent to the database per COPY or executemany
+NAV_LOAD_CHUNK_ROWS = int(os.getenv("NAV_LOAD_CHUNK_ROWS", "50000"))
+DATE_FORMATS = ('%d-%b-%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y')
+HEADER_ALIASES = {
+    'scheme_code': ('scheme code', 'scheme_code', 'schemecode', 'code'),
+    'nav': ('net asset value', 'nav'),
+    'date': ('date', 'nav date', 'nav_date')
+}
+
+def parse_date(value: str) -> Optional[date]:
+    """A date in any of `DATE_FORMATS`, or None"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def parse_nav_lines(lines: Iterable[str], stats: Dict) -> Iterator[Tuple[str, date, float]]:
+    """(scheme_code, date, nav) from the lines of an AMFI NAV file or a plain CSV
+
+    The first non-empty line is the header; columns are found by name, and
+    the delimiter is `;` when the header has one (AMFI's NAVAll.txt and NAV
+    history reports) and `,` otherwise. Lines without the delimiter are the
+    fund-house and category headings of AMFI files and are ignored. Rows
+    with an unparseable date or NAV (AMFI prints "N.A.") are counted in
+    `stats['skipped']`.
+    """
+    lines = iter(lines)
+    header = next((line for line in lines if line.strip()), None)
+    if header is None:
+        return
+    delimiter = ';' if ';' in header else ','
+    names = [name.strip().lower() for name in header.strip().split(delimiter)]
+    try:
+        columns = {
+            field: next(i for i, name in enumerate(names) if name in aliases)
+            for field, aliases in HEADER_ALIASES.items()
+        }
+    except StopIteration:
+        raise ValueError(f"NAV file header needs scheme code, NAV and date columns: {header.strip()}")
+
+    # Files repeat the same few dates on every row, so each is parsed once
+    dates: Dict[str, Optional[date]] = {}
+    for line in lines:
+        if delimiter not in line:
+            continue
+        values = line.rstrip('\r\n').split(delimiter)
+        if len(values) != len(names):
+            stats['skipped'] += 1
+            continue
+        code = values[columns['scheme_code']].strip()
+        raw_date = values[columns['date']].strip()
+        day = dates[raw_date] if raw_date in dates else dates.setdefault(raw_date, parse_date(raw_date))
+        try:
+            nav = float(values[columns['nav']].replace(',', ''))
+        except ValueError:
+            nav = None
+        if not code or day is None or nav is None or nav <= 0:
+            stats['skipped'] += 1
+            continue
+        yield code, day, nav
+
+def load_nav_file(db: Session, lines: Iterable[str], revalue: bool = True) -> Dict:
+    """Load one NAV file in a single transaction, then optionally revalue holdings
+
+    Rows are deduplicated per chunk (the last NAV for a scheme and date
+    wins) and loaded `NAV_LOAD_CHUNK_ROWS` at a time, so files of any size
+    stream in constant memory. Net worth snapshots of each scheme's holders
+    are dropped from its earliest loaded date, to be recomputed.
+    """
+    started = time.perf_counter()
+    stats = {'skipped': 0}
+    loaded = 0
+    latest: Optional[date] = None
+    chunk: Dict[Tuple[str, date], float] = {}
+    earliest: Dict[str, date] = {}
+    try:
+        for code, day, nav in parse_nav_lines(lines, stats):
+            chunk[(code, day)] = nav
+            latest = day if latest is None or day > latest else latest
+            if code not in earliest or day < earliest[code]:
+                earliest[code] = day
+            if len(chunk) >= NAV_LOAD_CHUNK_ROWS:
+                load_nav_rows(db, [(code, day, nav) for (code, day), nav in chunk.items()])
+                loaded += len(chunk)
+                chunk = {}
+        load_nav_rows(db, [(code, day, nav) for (code, day), nav in chunk.items()])
+        loaded += len(chunk)
+        delete_scheme_snapshots(db, earliest)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error loading NAV file: {str(e)}")
+        return {'success': False, 'message': f"Error loading NAV file: {str(e)}", 'loaded': 0}
+
+    revalued = revalue_investments(db, date.today()) if revalue and loaded else 0
+    elapsed = time.perf_counter() - started
+    logger.info(f"Loaded {loaded} NAVs ({stats['skipped']} skipped), revalued {revalued} investments")
+    return {
+        'success': True,
+        'message': f"Loaded {loaded} NAVs up to {latest}" if loaded else "No NAV rows found",
+        'loaded': loaded,
+        'skipped': stats['skipped'],
+        'latest_date': latest,
+        'revalued_investments': revalued,
+        'seconds': round(elapsed, 2)
+    }
@@ -0,0 +1,183 @@
+"""
+Net Worth Timeline
+Daily invested amount, portfolio value and cumulative spend per user, snapshotted and extended incrementally
+"""
+
+import os
+import time
+import numpy as np
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+from sqlalchemy.orm import Session
+
+from data_sources.investment_data import get_valuation_inputs
+from data_sources.nav_data import get_nav_series
+from data_sources.snapshot_store import (
+    get_history_start, get_snapshot_user_ids, get_last_snapshot_dates, get_daily_spend, upsert_snapshots,
+    delete_user_snapshots, get_snapshots
+)
+from logic.portfolio_valuation import holdings_to_arrays, current_values, day_numbers
+
+logger = logging.getLogger(__name__)
+
+# Holding-days valued at once for interest-bearing holdings; bounds backfill memory
+SNAPSHOT_BLOCK_CELLS = int(os.getenv("NETWORTH_SNAPSHOT_BLOCK_CELLS", "2000000"))
+TIMELINE_DEFAULT_DAYS = 365
+
+def _running_totals(groups: np.ndarray, day_index: np.ndarray, weights: np.ndarray,
+                    n_groups: int, n_days: int) -> np.ndarray:
+    """(n_groups, n_days) running sums, each weight counted from its day on"""
+    keep = day_index < n_days
+    added = np.bincount(groups[keep] * n_days + day_index[keep], weights=weights[keep],
+                        minlength=n_groups * n_days)
+    return np.cumsum(added.reshape(n_groups, n_days), axis=1)
+
+def _nav_grid(navs: List[Tuple[str, date, float]], codes: Dict[str, int], first: np.datetime64,
+              n_days: int) -> np.ndarray:
+    """(schemes, days) NAVs carried forward from each scheme's latest price; NaN before its first"""
+    grid = np.full((len(codes), n_days), np.nan)
+    if navs:
+        scheme_codes, days, prices = zip(*navs)
+        days = day_numbers(days)
+        # Prices from before the range land on day 0, where the latest one must win
+        order = np.argsort(days, kind='stable')[::-1]
+        rows = np.array([codes[code] for code in scheme_codes])[order]
+        cols = np.maximum((days[order] - first).astype(np.int64), 0)
+        cells, latest = np.unique(rows * n_days + cols, return_index=True)
+        grid.flat[cells] = np.array(prices)[order][latest]
+    known = np.where(np.isfinite(grid), np.arange(n_days), 0)
+    return grid[np.arange(len(codes))[:, None], np.maximum.accumulate(known, axis=1)]
+
+def daily_values(holdings: List[Dict], navs: List[Tuple[str, date, float]],
+                 start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+    """Invested amount and current value of the portfolio on every day from `start` to `end`
+
+    Values match `portfolio_performance` as of each day. Holdings are split
+    so that most of the work is running sums over the days:
+
+    - priced ones (units and a scheme with NAV history) are summed per
+      scheme as units held times that day's NAV; before a scheme's first
+      NAV they count at their stored NAV, or their amount;
+    - interest-bearing ones are valued on a holdings-by-days grid, in blocks
+      of `SNAPSHOT_BLOCK_CELLS`;
+    - the rest hold their market value or amount from their start date.
+    """
+    first = np.datetime64(start, 'D')
+    n_days = (end - start).days + 1
+    if not holdings or n_days <= 0:
+        return np.zeros(max(n_days, 0)), np.zeros(max(n_days, 0))
+
+    arrays = holdings_to_arrays(holdings)
+    n = len(holdings)
+    # Holdings started before the range count from its first day
+    day_index = np.maximum((arrays['start'] - first).astype(np.int64), 0)
+    single = np.zeros(n, dtype=np.int64)
+    invested = _running_totals(single, day_index, arrays['amount'], 1, n_days)[0]
+
+    market = arrays['units'] * arrays['nav']
+    fixed = np.where(np.isfinite(market), market, arrays['amount'])
+    codes = {code: index for index, code in enumerate(sorted({code for code, _, _ in navs}))}
+    scheme = np.array([codes.get(h.get('scheme_code'), -1) for h in holdings])
+    priced = (scheme >= 0) & np.isfinite(arrays['units'])
+    accruing = ~priced & ~np.isfinite(market) & np.isfinite(arrays['interest_rate'])
+    flat = ~priced & ~accruing
+
+    values = _running_totals(single[flat], day_index[flat], fixed[flat], 1, n_days)[0]
+
+    if priced.any():
+        units = _running_totals(scheme[priced], day_index[priced], arrays['units'][priced], len(codes), n_days)
+        fallback = _running_totals(scheme[priced], day_index[priced], fixed[priced], len(codes), n_days)
+        nav = _nav_grid(navs, codes, first, n_days)
+        values += np.where(np.isfinite(nav), nav * units, fallback).sum(axis=0)
+
+    if accruing.any():
+        subset = {key: array[accruing][:, None] for key, array in arrays.items()}
+        days = first + np.arange(n_days)
+        block = max(SNAPSHOT_BLOCK_CELLS // int(accruing.sum()), 1)
+        for offset in range(0, n_days, block):
+            as_of = days[None, offset:offset + block]
+            accrued = current_values(subset, as_of)
+            values[offset:offset + block] += np.where(subset['start'] <= as_of, accrued, 0).sum(axis=0)
+
+    return invested, values
+
+def snapshot_rows(user_id: int, holdings: List[Dict], navs: List[Tuple[str, date, float]],
+                  spend_before: float, spend: List[Tuple[date, float]], start: date, end: date) -> List[Dict]:
+    """One snapshot row per day from `start` to `end`"""
+    n_days = (end - start).days + 1
+    invested, values = daily_values(holdings, navs, start, end)
+    daily_spend = np.zeros(n_days)
+    if spend:
+        np.add.at(daily_spend, np.array([(day - start).days for day, _ in spend]), [amount for _, amount in spend])
+    cumulative_spend = spend_before + np.cumsum(daily_spend)
+
+    return [{
+        'user_id': user_id,
+        'date': start + timedelta(days=offset),
+        'invested': day_invested,
+        'current_value': day_value,
+        'cumulative_spend': day_spend
+    } for offset, (day_invested, day_value, day_spend) in enumerate(zip(
+        np.round(invested, 2).tolist(), np.round(values, 2).tolist(), np.round(cumulative_spend, 2).tolist()
+    ))]
+
+def extend_user_snapshots(db: Session, user_id: int, through: date, last: Optional[date] = None) -> int:
+    """Snapshot a user's days from `last` (redone, it may have been taken mid-day) through `through`
+
+    Without `last`, starts from the user's first investment or expense.
+    Runs in the caller's transaction; returns the number of days written.
+    """
+    start = last or get_history_start(db, user_id)
+    if start is None or start > through:
+        return 0
+    holdings = get_valuation_inputs(db, user_id)
+    navs = get_nav_series(db, user_id, start, through)
+    spend_before, spend = get_daily_spend(db, user_id, start, through)
+    rows = snapshot_rows(user_id, holdings, navs, spend_before, spend, start, through)
+    upsert_snapshots(db, rows)
+    return len(rows)
+
+def extend_snapshots(db: Session, through: Optional[date] = None) -> Dict:
+    """Bring every user's snapshots up to `through` (today), one transaction per user
+
+    Only the days since each user's last snapshot are computed; users
+    without snapshots are backfilled from their first record.
+    """
+    started = time.perf_counter()
+    through = through or date.today()
+    last_dates = get_last_snapshot_dates(db)
+    user_ids = get_snapshot_user_ids(db)
+    days, failed = 0, []
+    for user_id in user_ids:
+        try:
+            days += extend_user_snapshots(db, user_id, through, last_dates.get(user_id))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Extending net worth snapshots of user {user_id} failed: {str(e)}")
+            failed.append(user_id)
+    return {'users': len(user_ids), 'days': days, 'failed_users': failed,
+            'seconds': round(time.perf_counter() - started, 2)}
+
+def backfill_snapshots(db: Session, user_id: int, through: Optional[date] = None) -> Dict:
+    """Recompute a user's whole snapshot history in one transaction"""
+    started = time.perf_counter()
+    delete_user_snapshots(db, user_id)
+    days = extend_user_snapshots(db, user_id, through or date.today())
+    db.commit()
+    return {'days': days, 'seconds': round(time.perf_counter() - started, 2)}
+
+def get_timeline(db: Session, user_id: int, start: date, end: date) -> List[Dict]:
+    """A user's daily snapshots from `start` to `end`
+
+    Days up to today that the scheduler has not reached yet are snapshotted
+    first, so the timeline is never behind; that is one day for a user the
+    scheduler is keeping up with, and their whole history on a first read.
+    """
+    today = date.today()
+    last = get_last_snapshot_dates(db, user_id).get(user_id)
+    if last is None or last < min(end, today):
+        extend_user_snapshots(db, user_id, today, last)
+        db.commit()
+    return get_snapshots(db, user_id, start, end)
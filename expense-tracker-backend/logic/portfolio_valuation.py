@@ -0,0 +1,224 @@
+"""
+Portfolio Valuation
+Current value, absolute return, CAGR and XIRR for every holding and the whole portfolio, computed with NumPy arrays
+"""
+
+import time
+import numpy as np
+from datetime import date
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365.0
+# Months between SIP installments, and compounding periods per year for interest-bearing holdings
+FREQUENCY_MONTHS = {'monthly': 1, 'quarterly': 3, 'half-yearly': 6, 'semi-annually': 6, 'yearly': 12, 'annually': 12}
+COMPOUNDING_PER_YEAR = {'monthly': 12, 'quarterly': 4, 'half-yearly': 2, 'semi-annually': 2, 'yearly': 1, 'annually': 1}
+# Compounding assumed by investment type when no frequency is recorded; yearly otherwise
+TYPE_COMPOUNDING_PER_YEAR = {'fixed deposit': 4, 'bonds': 2}
+# XIRR is solved for x = ln(1 + rate) within these bounds: -99.99% to +100,000% a year
+XIRR_LOG_BOUNDS = (np.log(1e-4), np.log(1e3))
+XIRR_TOLERANCE = 1e-12
+XIRR_MAX_ITERATIONS = 100
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NAT = np.iinfo(np.int64).min
+HOLDING_FIELDS = ('id', 'name', 'investment_type', 'invested_amount', 'current_value', 'absolute_return',
+                  'return_pct', 'cagr', 'xirr')
+
+def frequency_codes(values: List[Optional[str]], mapping: Dict[str, int], default: int) -> np.ndarray:
+    """`mapping`'s code for each frequency name, matched case-insensitively, or `default`"""
+    codes = {value: mapping.get((value or '').strip().lower(), default) for value in set(values)}
+    return np.array([codes[value] for value in values], dtype=np.int64)
+
+def day_numbers(values: List[Optional[date]]) -> np.ndarray:
+    """Dates as datetime64[D], NaT for missing ones; ordinals convert far faster than date objects"""
+    return np.array([value.toordinal() - EPOCH_ORDINAL if value else NAT for value in values]).astype('datetime64[D]')
+
+def holdings_to_arrays(holdings: List[Dict]) -> Dict[str, np.ndarray]:
+    """Column arrays for the fields valuation uses; missing numbers become NaN"""
+    def column(key: str) -> np.ndarray:
+        return np.array([h.get(key) for h in holdings], dtype=np.float64)
+
+    periods = frequency_codes([h.get('frequency') for h in holdings], COMPOUNDING_PER_YEAR, 0)
+    type_periods = frequency_codes([h.get('investment_type') for h in holdings], TYPE_COMPOUNDING_PER_YEAR, 1)
+    return {
+        'amount': column('amount'),
+        'units': column('units'),
+        'nav': column('nav'),
+        'interest_rate': column('interest_rate'),
+        'sip_amount': column('sip_amount'),
+        'is_sip': np.array([bool(h.get('is_sip')) for h in holdings]),
+        'start': day_numbers([h['date'] for h in holdings]),
+        'maturity': day_numbers([h.get('maturity_date') for h in holdings]),
+        'sip_months': frequency_codes([h.get('sip_frequency') or h.get('frequency') for h in holdings],
+                                       FREQUENCY_MONTHS, 1),
+        'periods_per_year': np.where(periods > 0, periods, type_periods)
+    }
+
+def compounded_values(arrays: Dict[str, np.ndarray], as_of: np.ndarray) -> np.ndarray:
+    """Invested amount compounded at `interest_rate` from the start date until maturity or `as_of`
+
+    `periods_per_year` compoundings a year, fractional periods included.
+    NaN for holdings without a rate.
+    """
+    end = np.where(np.isnat(arrays['maturity']), as_of, np.minimum(arrays['maturity'], as_of))
+    years = np.maximum((end - arrays['start']).astype(np.float64), 0) / DAYS_PER_YEAR
+    periods = arrays['periods_per_year']
+    return arrays['amount'] * (1 + arrays['interest_rate'] / 100 / periods) ** (periods * years)
+
+def current_values(arrays: Dict[str, np.ndarray], as_of: np.datetime64) -> np.ndarray:
+    """Value of every holding on `as_of`
+
+    Units times NAV where both are known; otherwise the invested amount
+    compounded at `interest_rate` until maturity or `as_of`; otherwise the
+    invested amount itself.
+    """
+    amount = arrays['amount']
+    market = arrays['units'] * arrays['nav']
+    accrued = compounded_values(arrays, as_of)
+    return np.where(np.isfinite(market), market, np.where(np.isfinite(accrued), accrued, amount))
+
+def build_cashflows(arrays: Dict[str, np.ndarray], values: np.ndarray, as_of: np.datetime64):
+    """Flat cashflow series: (series index, amount, days before `as_of`) per flow
+
+    A lump sum is one outflow on its date. A SIP spreads its invested amount
+    over equal installments every `sip_months` months from its start date,
+    as many as `amount / sip_amount` (but none after `as_of`). Every series
+    ends with its current value as an inflow on `as_of`.
+    """
+    n = len(values)
+    start_month = arrays['start'].astype('datetime64[M]')
+    months_elapsed = np.maximum((as_of.astype('datetime64[M]') - start_month).astype(np.int64), 0)
+    possible = months_elapsed // arrays['sip_months'] + 1
+    sip = arrays['is_sip'] & (arrays['sip_amount'] > 0)
+    wanted = np.ceil(np.divide(arrays['amount'], arrays['sip_amount'], where=sip, out=np.ones(n)))
+    installments = np.where(sip, np.clip(wanted, 1, possible), 1).astype(np.int64)
+
+    series = np.repeat(np.arange(n), installments)
+    offsets = np.cumsum(installments) - installments
+    k = np.arange(len(series)) - np.repeat(offsets, installments)
+    month = start_month[series] + k * arrays['sip_months'][series]
+    day_of_month = (arrays['start'] - start_month.astype('datetime64[D]'))[series]
+    month_end = (month + 1).astype('datetime64[D]') - 1
+    flow_date = np.minimum(month.astype('datetime64[D]') + day_of_month, month_end)
+
+    outflows = -(arrays['amount'] / installments)[series]
+    return (
+        np.concatenate([series, np.arange(n)]),
+        np.concatenate([outflows, values]),
+        np.concatenate([(as_of - flow_date).astype(np.float64), np.zeros(n)])
+    )
+
+def xirr(series: np.ndarray, amounts: np.ndarray, days_before: np.ndarray, n_series: int) -> np.ndarray:
+    """Annualised internal rate of return of many cashflow series at once
+
+    Flows are flat arrays tagged with their series index, so series of any
+    length share one pass per iteration with no padding. Each series is
+    solved for x = ln(1 + rate), where its value at `as_of`,
+    sum(amount * exp(x * years_before)), increases with x for the usual
+    invest-then-value pattern. Newton steps are taken while they stay inside
+    the series' bracket and bisection otherwise. Series with no sign change
+    in their flows get NaN.
+    """
+    years = days_before / DAYS_PER_YEAR
+    scale = np.bincount(series, weights=np.abs(amounts), minlength=n_series)
+
+    def value_and_slope(x: np.ndarray, series: np.ndarray, amounts: np.ndarray, years: np.ndarray):
+        grown = amounts * np.exp(x[series] * years)
+        return (np.bincount(series, weights=grown, minlength=n_series),
+                np.bincount(series, weights=grown * years, minlength=n_series))
+
+    lo = np.full(n_series, XIRR_LOG_BOUNDS[0])
+    hi = np.full(n_series, XIRR_LOG_BOUNDS[1])
+    f_lo, _ = value_and_slope(lo, series, amounts, years)
+    f_hi, _ = value_and_slope(hi, series, amounts, years)
+    solvable = (np.sign(f_lo) != np.sign(f_hi)) & (scale > 0)
+    # Orient brackets so that value(lo) < 0 < value(hi)
+    flip = f_lo > 0
+    lo, hi = np.where(flip, hi, lo), np.where(flip, lo, hi)
+
+    x = np.zeros(n_series)
+    active = solvable.copy()
+    for _ in range(XIRR_MAX_ITERATIONS):
+        # Only flows of unconverged series are evaluated, so late iterations are cheap
+        keep = active[series]
+        series, amounts, years = series[keep], amounts[keep], years[keep]
+        if not len(series):
+            break
+        f, slope = value_and_slope(x, series, amounts, years)
+        below = f < 0
+        lo = np.where(active & below, x, lo)
+        hi = np.where(active & ~below, x, hi)
+        converged = (np.abs(f) <= XIRR_TOLERANCE * scale) | (np.abs(hi - lo) <= XIRR_TOLERANCE)
+        active &= ~converged
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = x - f / slope
+        inside = np.isfinite(newton) & (newton > np.minimum(lo, hi)) & (newton < np.maximum(lo, hi))
+        x = np.where(active, np.where(inside, newton, (lo + hi) / 2), x)
+
+    return np.where(solvable, np.expm1(x), np.nan)
+
+def _clean(value) -> Optional[float]:
+    return round(float(value), 6) if np.isfinite(value) else None
+
+def _column(values: np.ndarray, digits: int) -> List[Optional[float]]:
+    """Rounded values as Python floats, with None for NaN and infinities"""
+    rounded = np.round(np.where(np.isfinite(values), values, np.nan), digits).tolist()
+    return [value if value == value else None for value in rounded]
+
+def portfolio_performance(holdings: List[Dict], as_of: Optional[date] = None) -> Dict:
+    """Per-holding and portfolio value, absolute return, CAGR and XIRR
+
+    The portfolio CAGR uses the amount-weighted average holding period; its
+    XIRR solves all holdings' cashflows together with the total value.
+    Holdings dated after `as_of` are left out: their outflow would fall
+    after the closing value and leave the portfolio XIRR without a root.
+    """
+    started = time.perf_counter()
+    as_of_date = as_of or date.today()
+    as_of = np.datetime64(as_of_date, 'D')
+    holdings = [h for h in holdings if h['date'] <= as_of_date]
+    if not holdings:
+        return {'holdings': [], 'portfolio': None, 'as_of': str(as_of), 'compute_ms': 0.0}
+
+    arrays = holdings_to_arrays(holdings)
+    n = len(holdings)
+    invested = arrays['amount']
+    values = current_values(arrays, as_of)
+    gain = values - invested
+    years = (as_of - arrays['start']).astype(np.float64) / DAYS_PER_YEAR
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return_pct = gain / invested * 100
+        cagr = np.where(years > 0, (values / invested) ** (1 / years) - 1, np.nan)
+
+    series, amounts, days_before = build_cashflows(arrays, values, as_of)
+    holding_xirr = xirr(series, amounts, days_before, n)
+
+    total_invested = float(invested.sum())
+    total_value = float(values.sum())
+    mean_years = float((invested * years).sum() / total_invested) if total_invested > 0 else 0.0
+    portfolio_xirr = xirr(np.zeros(len(amounts), dtype=np.int64), amounts, days_before, 1)[0]
+
+    columns = zip(
+        (h['id'] for h in holdings), (h['name'] for h in holdings), (h.get('investment_type') for h in holdings),
+        _column(invested, 2), _column(values, 2), _column(gain, 2),
+        _column(return_pct, 6), _column(cagr, 6), _column(holding_xirr, 6)
+    )
+    holding_rows = [dict(zip(HOLDING_FIELDS, row)) for row in columns]
+
+    return {
+        'holdings': holding_rows,
+        'portfolio': {
+            'invested_amount': round(total_invested, 2),
+            'current_value': round(total_value, 2),
+            'absolute_return': round(total_value - total_invested, 2),
+            'return_pct': _clean((total_value - total_invested) / total_invested * 100) if total_invested else None,
+            'cagr': _clean((total_value / total_invested) ** (1 / mean_years) - 1)
+            if total_invested > 0 and mean_years > 0 else None,
+            'xirr': _clean(portfolio_xirr)
+        },
+        'as_of': str(as_of),
+        'compute_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,126 @@
+"""
+Scheduled Tasks
+The maintenance jobs run by the periodic scheduler
+"""
+
+import os
+import glob
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+import logging
+from sqlalchemy.orm import Session
+
+from logic.scheduler import PeriodicTask, Scheduler
+from logic.forecast_engines import ENGINE_CLASSES
+from logic.model_registry import MODEL_DIR, current_model_info
+from logic.training import train_user_model
+from logic.forecast_precompute import PRECOMPUTE_ACTIVE_DAYS, precompute_all
+from logic.maturity_calendar import refresh_maturity_calendar
+from logic.networth import extend_snapshots
+from logic.loans import sync_emi_expenses
+from data_sources.ai_data import get_active_user_ids, get_data_watermarks
+from data_sources.feature_store import find_rollup_drift, rebuild_user_rollups
+from data_sources.forecast_store import delete_past_forecasts
+from data_sources.investment_data import mark_matured_investments
+from data_sources.nav_data import revalue_investments
+from data_sources.models import TaskRun
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_HISTORY_DAYS = int(os.getenv("SCHEDULER_HISTORY_DAYS", "30"))
+# Temporary model files older than this were left by a crashed publish
+STALE_TMP_SECONDS = 3600
+
+def retrain_stale_models(db: Session) -> Dict:
+    """Retrain active users' models whose data watermark has moved since they were published"""
+    user_ids = get_active_user_ids(db, PRECOMPUTE_ACTIVE_DAYS)
+    watermarks = get_data_watermarks(db, user_ids) if user_ids else {}
+    retrained, failed = 0, 0
+    for user_id in user_ids:
+        for engine in ENGINE_CLASSES:
+            info = current_model_info(user_id, engine)
+            if info is None or info.get('data_watermark') == watermarks[user_id]:
+                continue
+            try:
+                result = train_user_model(db, user_id, engine)
+            except Exception as e:
+                logger.error(f"Retraining {engine} for user {user_id} failed: {str(e)}")
+                result = {'success': False}
+            retrained += int(result['success'])
+            failed += int(not result['success'])
+    return {'users': len(user_ids), 'retrained': retrained, 'failed': failed}
+
+def nightly_forecasts(db: Session) -> Dict:
+    """Retrain stale models, then precompute forecasts and insights from the current ones"""
+    return {
+        'retraining': retrain_stale_models(db),
+        'precompute': precompute_all(db)
+    }
+
+def verify_rollups(db: Session) -> Dict:
+    """Rebuild the daily rollups of users whose totals drifted from their expenses"""
+    drifted = find_rollup_drift(db)
+    for user_id in drifted:
+        logger.warning(f"Rollups of user {user_id} drifted from expenses; rebuilding")
+        rebuild_user_rollups(db, user_id)
+    return {'rebuilt_users': drifted}
+
+def scan_maturities(db: Session) -> Dict:
+    """Mark investments past their maturity date as Matured, then rebuild the maturity calendar
+
+    Both steps commit together, so the calendar never disagrees with the statuses.
+    """
+    matured = mark_matured_investments(db, date.today())
+    calendar = refresh_maturity_calendar(db)
+    db.commit()
+    return {'matured': matured, 'calendar': calendar}
+
+def revalue_holdings(db: Session) -> Dict:
+    """Bring scheme-coded investments up to the latest loaded NAV"""
+    return {'revalued': revalue_investments(db, date.today())}
+
+def snapshot_networth(db: Session) -> Dict:
+    """Extend every user's daily portfolio snapshots through today"""
+    return extend_snapshots(db)
+
+def post_loan_emis(db: Session) -> Dict:
+    """Record EMIs that have fallen due on tracked loans as Housing expenses"""
+    result = sync_emi_expenses(db, date.today())
+    db.commit()
+    return result
+
+def cleanup(db: Session) -> Dict:
+    """Prune old task runs and past forecasts, and remove abandoned temporary model files"""
+    cutoff = datetime.now() - timedelta(days=SCHEDULER_HISTORY_DAYS)
+    runs = db.query(TaskRun).filter(TaskRun.started_at < cutoff, TaskRun.status != 'running').delete(
+        synchronize_session=False
+    )
+    db.commit()
+
+    today = date.today()
+    forecasts = delete_past_forecasts(db, date(today.year, today.month, 1))
+
+    removed: List[str] = []
+    for path in glob.glob(os.path.join(MODEL_DIR, "*.tmp*")):
+        try:
+            if time.time() - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                os.remove(path)
+                removed.append(os.path.basename(path))
+        except FileNotFoundError:
+            pass
+    return {'task_runs': runs, 'forecasts': forecasts, 'tmp_files': removed}
+
+def default_tasks() -> List[PeriodicTask]:
+    """Every maintenance task with its default interval in seconds"""
+    return [
+        PeriodicTask('nightly_forecasts', nightly_forecasts, interval=24 * 3600, max_runtime=4 * 3600),
+        PeriodicTask('verify_rollups', verify_rollups, interval=24 * 3600),
+        PeriodicTask('scan_maturities', scan_maturities, interval=6 * 3600),
+        PeriodicTask('revalue_holdings', revalue_holdings, interval=6 * 3600),
+        PeriodicTask('snapshot_networth', snapshot_networth, interval=24 * 3600),
+        PeriodicTask('post_loan_emis', post_loan_emis, interval=24 * 3600),
+        PeriodicTask('cleanup', cleanup, interval=24 * 3600),
+    ]
+
+scheduler = Scheduler(default_tasks())
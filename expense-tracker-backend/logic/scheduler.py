@@ -0,0 +1,250 @@
+"""
+Periodic Task Scheduler
+Runs maintenance tasks from every API worker, with one leader per task run elected through a database or file lock
+"""
+
+import os
+import json
+import time
+import zlib
+import random
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import logging
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from data_sources.database import engine, SessionLocal
+from data_sources.models import TaskRun
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "30"))
+SCHEDULER_LOCK_DIR = os.getenv("SCHEDULER_LOCK_DIR", "models/locks")
+SCHEDULER_DISABLED_TASKS = {
+    name.strip() for name in os.getenv("SCHEDULER_DISABLED_TASKS", "").split(",") if name.strip()
+}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+def _local_naive(value: datetime) -> datetime:
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+class PeriodicTask:
+    """A function of a database session run every `interval` seconds by one worker
+
+    `jitter` spreads each worker's checks over that many seconds so workers
+    don't contend for the lock at the same instant. A run that exceeds
+    `max_runtime` is reported as an overrun; the lock keeps it from being
+    started again until it finishes.
+    """
+
+    def __init__(self, name: str, func: Callable[[Session], Dict], interval: float,
+                 jitter: float = 300, max_runtime: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.interval = float(os.getenv(f"SCHEDULER_{name.upper()}_INTERVAL_SECONDS", interval))
+        self.jitter = jitter
+        self.max_runtime = max_runtime or self.interval / 2
+        self.next_check = time.monotonic() + random.uniform(0, jitter)
+        self.running_since: Optional[float] = None
+        self.overrun_reported = False
+        self.stats = {
+            'runs': 0, 'succeeded': 0, 'failed': 0, 'not_due': 0, 'locked_elsewhere': 0,
+            'overruns': 0, 'last_status': None, 'last_started_at': None, 'last_duration_ms': None
+        }
+
+    @property
+    def lock_key(self) -> int:
+        """Stable 32-bit key for the Postgres advisory lock"""
+        return zlib.crc32(f"scheduler:{self.name}".encode('utf-8'))
+
+@contextmanager
+def leader_lock(task: PeriodicTask):
+    """Yield True to the one worker that holds the task's lock, False to the rest
+
+    Postgres uses a session-level advisory lock on a dedicated autocommit
+    connection; other databases fall back to an exclusive file lock, which
+    covers workers on one host (the SQLite case). Both are released if the
+    worker dies.
+    """
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {'key': task.lock_key}
+            ).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': task.lock_key})
+        return
+
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(SCHEDULER_LOCK_DIR, exist_ok=True)
+    with open(os.path.join(SCHEDULER_LOCK_DIR, f"task_{task.name}.lock"), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _last_run(db: Session, task_name: str) -> Optional[TaskRun]:
+    return db.query(TaskRun).filter(TaskRun.task_name == task_name).order_by(
+        TaskRun.started_at.desc()
+    ).first()
+
+def run_task(task: PeriodicTask, force: bool = False) -> Optional[str]:
+    """Run `task` if this worker wins its lock and the run history says it is due
+
+    Returns the run's status, or None when it was skipped. A `running` row
+    found while holding the lock belongs to a worker that died mid-run and
+    is marked abandoned.
+    """
+    with leader_lock(task) as leader:
+        if not leader:
+            task.stats['locked_elsewhere'] += 1
+            return None
+
+        db = SessionLocal()
+        try:
+            last = _last_run(db, task.name)
+            if last is not None and last.status == 'running':
+                last.status = 'abandoned'
+                db.commit()
+            if not force and last is not None and \
+                    _local_naive(last.started_at) > datetime.now() - timedelta(seconds=task.interval):
+                task.stats['not_due'] += 1
+                return None
+
+            run = TaskRun(task_name=task.name, status='running', worker=WORKER_ID, started_at=datetime.now())
+            db.add(run)
+            db.commit()
+
+            task.running_since = time.monotonic()
+            task.overrun_reported = False
+            task.stats['runs'] += 1
+            task.stats['last_started_at'] = run.started_at.isoformat()
+            try:
+                details = task.func(db)
+                run.status = 'success'
+                run.details = json.dumps(details, default=str)
+                task.stats['succeeded'] += 1
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Scheduled task {task.name} failed: {str(e)}")
+                run.status = 'failed'
+                run.error = str(e)
+                task.stats['failed'] += 1
+            duration_ms = (time.monotonic() - task.running_since) * 1000
+            run.finished_at = datetime.now()
+            run.duration_ms = round(duration_ms, 1)
+            db.commit()
+
+            task.stats['last_status'] = run.status
+            task.stats['last_duration_ms'] = run.duration_ms
+            return run.status
+        finally:
+            task.running_since = None
+            db.close()
+
+class Scheduler:
+    """Checks every task each tick and runs due ones on their own threads"""
+
+    def __init__(self, tasks: List[PeriodicTask], tick_seconds: float = SCHEDULER_TICK_SECONDS):
+        self.tasks = [task for task in tasks if task.name not in SCHEDULER_DISABLED_TASKS]
+        self.tick_seconds = tick_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+            logger.info(f"Scheduler started with tasks: {[task.name for task in self.tasks]}")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.tick_seconds):
+            self.tick()
+
+    def tick(self):
+        now = time.monotonic()
+        for task in self.tasks:
+            if task.running_since is not None:
+                # Still running in this worker: never start it twice, report long runs once
+                if not task.overrun_reported and now - task.running_since > task.max_runtime:
+                    task.overrun_reported = True
+                    task.stats['overruns'] += 1
+                    logger.warning(f"Scheduled task {task.name} has run over {task.max_runtime:.0f}s")
+                continue
+            if now < task.next_check:
+                continue
+            task.next_check = now + min(task.interval, 3600) / 4 + random.uniform(0, task.jitter)
+            task.running_since = now
+            threading.Thread(target=self._run, args=(task,), name=f"task-{task.name}", daemon=True).start()
+
+    def _run(self, task: PeriodicTask):
+        try:
+            run_task(task)
+        except Exception as e:
+            logger.error(f"Scheduler could not run {task.name}: {str(e)}")
+        finally:
+            task.running_since = None
+
+    def metrics(self) -> Dict:
+        """Per-task counters for this worker"""
+        return {
+            'worker': WORKER_ID,
+            'enabled': SCHEDULER_ENABLED,
+            'tasks': {
+                task.name: {
+                    'interval_seconds': task.interval,
+                    'running': task.running_since is not None,
+                    **task.stats
+                } for task in self.tasks
+            }
+        }
+
+def recent_runs(limit: int = 20, with_details: bool = False) -> List[Dict]:
+    """The latest task runs across all workers
+
+    Run details (failed user ids, per-user counts) and error messages are
+    only included with `with_details`; they stay in `task_runs` otherwise.
+    """
+    db = SessionLocal()
+    try:
+        runs = db.query(TaskRun).order_by(TaskRun.started_at.desc()).limit(limit).all()
+        rows = []
+        for run in runs:
+            row = {
+                'task_name': run.task_name,
+                'status': run.status,
+                'worker': run.worker,
+                'started_at': run.started_at,
+                'duration_ms': run.duration_ms
+            }
+            if with_details:
+                row['details'] = json.loads(run.details) if run.details else None
+                row['error'] = run.error
+            rows.append(row)
+        return rows
+    finally:
+        db.close()
@@ -0,0 +1,204 @@
+"""
+SIP Projection
+Future SIP contribution schedules and projected corpus by month and investment type, cached per portfolio version
+"""
+
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional
+import logging
+from sqlalchemy.orm import Session
+
+from data_sources.investment_data import COMPLETED_STATUSES, get_valuation_inputs
+from logic.portfolio_valuation import DAYS_PER_YEAR, frequency_codes, holdings_to_arrays, current_values
+
+logger = logging.getLogger(__name__)
+
+# Annual return assumed for holdings without an interest rate, as a fraction
+PROJECTION_DEFAULT_RETURN = float(os.getenv("INVESTMENT_PROJECTION_RETURN", "0.10"))
+# Projections kept in memory per worker
+PROJECTION_CACHE_SIZE = int(os.getenv("INVESTMENT_PROJECTION_CACHE_SIZE", "256"))
+# SIP frequencies stepped in days rather than calendar months
+FREQUENCY_DAYS = {'daily': 1, 'weekly': 7, 'fortnightly': 14, 'bi-weekly': 14, 'biweekly': 14}
+
+def _days(values: np.ndarray) -> np.ndarray:
+    return values.astype('datetime64[D]').astype(np.int64)
+
+def contribution_schedule(arrays: Dict[str, np.ndarray], as_of: np.datetime64, months: int):
+    """Installments per holding in each of `months` calendar months, and the first installment date in each
+
+    Month 0 is the current month and only counts installments after `as_of`.
+    Month-stepped SIPs fall on their start day (clamped to the month's last
+    day) every `sip_months` months; day-stepped ones every `sip_days` days
+    from their start. No installment falls after a holding's maturity date.
+    Returns (installments, first_dates, window_days), the last being the
+    days each month contributes to growth.
+    """
+    current_month = as_of.astype('datetime64[M]')
+    month_index = current_month + np.arange(months)
+    month_start = _days(month_index)
+    month_end = _days(month_index + 1) - 1
+    today = _days(as_of)
+    window_start = np.maximum(month_start - 1, today)
+
+    maturity = np.where(np.isnat(arrays['maturity']), np.iinfo(np.int64).max, _days(arrays['maturity']))
+    window_end = np.minimum(month_end[None, :], maturity[:, None])
+    window_days = np.clip(window_end - window_start[None, :], 0, None)
+
+    start = _days(arrays['start'])[:, None]
+    start_month = arrays['start'].astype('datetime64[M]').astype(np.int64)[:, None]
+    step_months = arrays['sip_months'][:, None]
+    step_days = np.maximum(arrays['sip_days'], 1)[:, None]
+
+    # Month-stepped: at most one installment in a month
+    offset = month_index.astype(np.int64)[None, :] - start_month
+    day = np.minimum(month_start[None, :] + (start - _days(arrays['start'].astype('datetime64[M]'))[:, None]),
+                     month_end[None, :])
+    monthly_due = (offset >= 0) & (offset % step_months == 0) & (day > window_start) & (day <= window_end)
+
+    # Day-stepped: installments on or before a day, differenced across the window
+    def paid_by(day_number: np.ndarray) -> np.ndarray:
+        return np.where(day_number >= start, (day_number - start) // step_days + 1, 0)
+
+    paid_before = paid_by(window_start[None, :])
+    daily_count = np.clip(paid_by(window_end) - paid_before, 0, None)
+    daily_first = start + paid_before * step_days
+
+    by_days = (arrays['sip_days'] > 0)[:, None]
+    installments = np.where(by_days, daily_count, monthly_due.astype(np.int64))
+    first_dates = np.where(by_days, daily_first, day)
+    return installments, first_dates, window_days
+
+def project_portfolio(holdings: List[Dict], months: int, annual_return: float,
+                      as_of: Optional[date] = None) -> Dict:
+    """Contributions and corpus of every open holding for the next `months` months
+
+    Open holdings start from their current value. Active SIPs add their
+    installments at the end of each month. Holdings grow at their own
+    `interest_rate` where one is recorded and at `annual_return` otherwise,
+    and stop growing at maturity.
+    """
+    started = time.perf_counter()
+    as_of = np.datetime64(as_of or date.today(), 'D')
+    holdings = [h for h in holdings if h.get('status') not in COMPLETED_STATUSES]
+    month_labels = [str(m) for m in as_of.astype('datetime64[M]') + np.arange(months)]
+    if not holdings:
+        return {
+            'schedule': [{'month': label, 'contribution': 0.0, 'corpus': 0.0, 'by_type': {}} for label in month_labels],
+            'sips': [],
+            'totals': {'current_value': 0.0, 'contribution': 0.0, 'projected_value': 0.0, 'gain': 0.0},
+            'annual_return': annual_return, 'as_of': str(as_of), 'compute_ms': 0.0
+        }
+
+    arrays = holdings_to_arrays(holdings)
+    frequencies = [h.get('sip_frequency') or h.get('frequency') for h in holdings]
+    arrays['sip_days'] = frequency_codes(frequencies, FREQUENCY_DAYS, 0)
+    values = current_values(arrays, as_of)
+
+    installments, first_dates, window_days = contribution_schedule(arrays, as_of, months)
+    contributing = arrays['is_sip'] & (arrays['sip_amount'] > 0) & \
+        np.array([h.get('status') == 'Active' for h in holdings])
+    installments = np.where(contributing[:, None], installments, 0)
+    contributions = installments * np.nan_to_num(arrays['sip_amount'])[:, None]
+
+    rates = np.where(np.isfinite(arrays['interest_rate']), arrays['interest_rate'] / 100, annual_return)
+    growth = np.cumprod((1 + rates[:, None]) ** (window_days / DAYS_PER_YEAR), axis=1)
+    corpus = growth * (values[:, None] + np.cumsum(contributions / growth, axis=1))
+
+    types, type_index = np.unique([h.get('investment_type') or 'Other' for h in holdings], return_inverse=True)
+    type_contributions = np.zeros((len(types), months))
+    type_corpus = np.zeros((len(types), months))
+    np.add.at(type_contributions, type_index, contributions)
+    np.add.at(type_corpus, type_index, corpus)
+
+    schedule = [{
+        'month': label,
+        'contribution': round(float(type_contributions[:, m].sum()), 2),
+        'corpus': round(float(type_corpus[:, m].sum()), 2),
+        'by_type': {
+            str(inv_type): {
+                'contribution': round(float(type_contributions[t, m]), 2),
+                'corpus': round(float(type_corpus[t, m]), 2)
+            } for t, inv_type in enumerate(types)
+        }
+    } for m, label in enumerate(month_labels)]
+
+    has_next = installments > 0
+    next_month = has_next.argmax(axis=1)
+    sips = [{
+        'id': holdings[i]['id'],
+        'name': holdings[i]['name'],
+        'investment_type': holdings[i].get('investment_type'),
+        'sip_amount': float(arrays['sip_amount'][i]),
+        'sip_frequency': frequencies[i],
+        'annual_return': round(float(rates[i]), 6),
+        'next_contribution': str(np.datetime64(int(first_dates[i, next_month[i]]), 'D'))
+        if has_next[i].any() else None,
+        'installments': int(installments[i].sum()),
+        'contribution_total': round(float(contributions[i].sum()), 2),
+        'projected_value': round(float(corpus[i, -1]), 2)
+    } for i in np.flatnonzero(contributing)]
+
+    total_value = float(values.sum())
+    total_contribution = float(contributions.sum())
+    projected_value = float(corpus[:, -1].sum())
+    return {
+        'schedule': schedule,
+        'sips': sips,
+        'totals': {
+            'current_value': round(total_value, 2),
+            'contribution': round(total_contribution, 2),
+            'projected_value': round(projected_value, 2),
+            'gain': round(projected_value - total_value - total_contribution, 2)
+        },
+        'annual_return': annual_return,
+        'as_of': str(as_of),
+        'compute_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+# (user_id, portfolio version, months, annual_return, as_of) -> projection, least recently used first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def portfolio_version(holdings: List[Dict]) -> str:
+    """Hash of every field the projection reads from every holding
+
+    Any edit to those fields changes it, however close together edits
+    come; update timestamps are too coarse for that on SQLite.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for holding in holdings:
+        digest.update(repr(tuple(holding.values())).encode())
+    return digest.hexdigest()
+
+def get_projection(db: Session, user_id: int, months: int, annual_return: Optional[float] = None) -> Dict:
+    """The user's projection, recomputed only when their portfolio version or the day changes
+
+    The version hashes the projection's inputs, read in one query, so an
+    edit made through any worker is picked up on that worker's next request.
+    """
+    annual_return = PROJECTION_DEFAULT_RETURN if annual_return is None else annual_return
+    holdings = get_valuation_inputs(db, user_id)
+    version = portfolio_version(holdings)
+    key = (user_id, version, months, annual_return, date.today())
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        return {**cached, 'cached': True}
+
+    projection = project_portfolio(holdings, months, annual_return, key[-1])
+    projection['portfolio_version'] = version
+    with _cache_lock:
+        _cache[key] = projection
+        _cache.move_to_end(key)
+        while len(_cache) > PROJECTION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return {**projection, 'cached': False}
@@ -0,0 +1,364 @@
+"""
+Lightweight Statistical Forecasting Engine
+Exponential smoothing (Holt-Winters) on monthly per-category totals, in pure NumPy
+"""
+
+import json
+import os
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+import logging
+from sqlalchemy.orm import Session
+
+from logic.ai_logic import ExpenseForecaster, future_months, interval_confidence
+
+logger = logging.getLogger(__name__)
+
+SEASON_LENGTH = 12
+
+# Smoothing parameter grid, searched for every category at once
+ALPHA_GRID = (0.1, 0.3, 0.5, 0.8)
+BETA_GRID = (0.0, 0.1, 0.3)
+GAMMA_GRID = (0.0, 0.2, 0.4)
+PHI_GRID = (0.9, 0.98)
+
+# Standard normal quantile for the P10/P90 band
+P90_Z = 1.2816
+
+def monthly_category_matrix(expenses_data: List[Dict],
+                            as_of: Optional[datetime] = None) -> Tuple[pd.PeriodIndex, List[str], np.ndarray]:
+    """Build a (months x categories) matrix of complete-month totals"""
+    df = pd.DataFrame(expenses_data)
+    df['period'] = pd.to_datetime(df['date']).dt.to_period('M')
+
+    # The month containing `as_of` is still in progress, so it is left out
+    current_period = pd.Period(as_of or datetime.now(), freq='M')
+    df = df[df['period'] < current_period]
+    if df.empty:
+        return pd.PeriodIndex([], freq='M'), [], np.zeros((0, 0))
+
+    table = df.pivot_table(index='period', columns='category_name',
+                           values='amount', aggfunc='sum', fill_value=0.0)
+    periods = pd.period_range(table.index.min(), table.index.max(), freq='M')
+    table = table.reindex(periods, fill_value=0.0)
+    return periods, [str(c) for c in table.columns], table.to_numpy(dtype=float)
+
+def smoothing_method(n_months: int, season_length: int = SEASON_LENGTH) -> str:
+    """Pick the smoothing variant the available history supports"""
+    if n_months >= 2 * season_length:
+        return 'holt_winters'
+    if n_months >= 3:
+        return 'holt'
+    return 'naive'
+
+def smoothing_path(Y: np.ndarray, method: str, season_length: int = SEASON_LENGTH,
+                   phi_grid: Tuple[float, ...] = PHI_GRID) -> Dict:
+    """Run the smoothing recursion once for every grid point and category
+
+    The state after every month is kept, so the fit for any prefix of the
+    series (one per backtest fold) can be read off the same pass.
+    """
+    T, C = Y.shape
+    m = season_length
+
+    gammas = GAMMA_GRID if method == 'holt_winters' else (0.0,)
+    grid = np.array(list(itertools.product(ALPHA_GRID, BETA_GRID, gammas, phi_grid)))
+    alpha, beta, gamma, phi = (grid[:, i, None] for i in range(4))
+    P = len(grid)
+
+    if method == 'holt_winters':
+        first, second = Y[:m].mean(axis=0), Y[m:2 * m].mean(axis=0)
+        level = np.broadcast_to(first, (P, C)).copy()
+        trend = np.broadcast_to((second - first) / m, (P, C)).copy()
+        season = np.broadcast_to(Y[:m] - first, (P, m, C)).copy()
+        start = m
+    else:
+        level = np.broadcast_to(Y[0], (P, C)).copy()
+        trend = np.broadcast_to(Y[1] - Y[0], (P, C)).copy()
+        season = np.zeros((P, m, C))
+        start = 1
+
+    levels = np.zeros((P, T, C))
+    trends = np.zeros((P, T, C))
+    seasons = np.zeros((P, T, m, C))
+    fitted = np.full((P, T, C), np.nan)
+    for t in range(start, T):
+        s = season[:, t % m]
+        fitted[:, t] = level + phi * trend + s
+        new_level = alpha * (Y[t] - s) + (1 - alpha) * (level + phi * trend)
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        season[:, t % m] = gamma * (Y[t] - new_level) + (1 - gamma) * s
+        level = new_level
+        levels[:, t], trends[:, t], seasons[:, t] = level, trend, season
+
+    errors = np.nan_to_num(Y[None] - fitted)
+    return {
+        'method': method,
+        'grid': grid,
+        'start': start,
+        'level': levels,
+        'trend': trends,
+        'season': seasons,
+        'fitted': fitted,
+        'cum_sse': np.cumsum(errors ** 2, axis=1)
+    }
+
+def select_state(path: Dict, Y: np.ndarray, origin: int) -> Dict:
+    """Pick the best grid point per category for the first `origin` months"""
+    C = Y.shape[1]
+    cols = np.arange(C)
+    start = path['start']
+    m = path['season'].shape[2]
+    best = np.argmin(path['cum_sse'][:, origin - 1], axis=0)
+
+    best_fitted = path['fitted'][best, start:origin, cols].T
+    errors = Y[start:origin] - best_fitted
+    # Roll the seasonal indices so position 0 is the first forecast month
+    season = np.roll(path['season'][best, origin - 1, :, cols].T, -(origin % m), axis=0)
+
+    return {
+        'method': path['method'],
+        'level': path['level'][best, origin - 1, cols],
+        'trend': path['trend'][best, origin - 1, cols],
+        'phi': path['grid'][best, 3],
+        'season': season,
+        'residual_std': errors.std(axis=0),
+        'fitted_mae': float(np.abs(errors).mean()),
+        'fitted_mape': _mape(Y[start:origin].sum(axis=1), best_fitted.sum(axis=1))
+    }
+
+def fit_exponential_smoothing(Y: np.ndarray, season_length: int = SEASON_LENGTH,
+                              phi_grid: Tuple[float, ...] = PHI_GRID) -> Dict:
+    """Fit damped-trend exponential smoothing to every column of Y at once
+
+    Uses additive Holt-Winters with two full seasons of history, Holt's linear
+    trend with at least three months, and the mean otherwise. The smoothing
+    parameters are picked per category from a small grid by one-step-ahead SSE;
+    the grid and the categories are both carried as array axes.
+    """
+    T, C = Y.shape
+    method = smoothing_method(T, season_length)
+
+    if method == 'naive':
+        mean = Y.mean(axis=0)
+        return {
+            'method': 'naive',
+            'level': mean,
+            'trend': np.zeros(C),
+            'phi': np.ones(C),
+            'season': np.zeros((season_length, C)),
+            'residual_std': Y.std(axis=0),
+            'fitted_mae': float(np.abs(Y - mean).mean()),
+            'fitted_mape': _mape(Y.sum(axis=1), np.full(T, mean.sum()))
+        }
+
+    path = smoothing_path(Y, method, season_length, phi_grid)
+    return select_state(path, Y, T)
+
+def forecast_exponential_smoothing(state: Dict, horizons: np.ndarray) -> np.ndarray:
+    """Forecast every category for the given 1-based horizons, shape (H, C)"""
+    horizons = np.asarray(horizons)
+    phi = np.asarray(state['phi'])
+    # Damped trend multiplier: phi + phi^2 + ... + phi^h
+    steps = np.arange(1, horizons.max() + 1)[:, None]
+    damped = np.cumsum(phi[None, :] ** steps, axis=0)[horizons - 1]
+    season = np.asarray(state['season'])
+    forecast = (np.asarray(state['level'])[None, :]
+                + damped * np.asarray(state['trend'])[None, :]
+                + season[(horizons - 1) % season.shape[0]])
+    return np.clip(forecast, 0, None)
+
+def _mape(actual: np.ndarray, predicted: np.ndarray) -> float:
+    """Mean absolute percentage error over non-zero actuals"""
+    mask = actual > 0
+    if not mask.any():
+        return 0.0
+    return float(np.mean(np.abs(actual[mask] - predicted[mask]) / actual[mask]))
+
+class StatisticalForecaster(ExpenseForecaster):
+    """Exponential smoothing forecaster on monthly per-category totals"""
+
+    engine = 'statistical'
+
+    def __init__(self, model_params: Optional[Dict] = None):
+        super().__init__()
+        self.model_params = {'season_length': SEASON_LENGTH, 'phi_grid': PHI_GRID, **(model_params or {})}
+        self.state = None
+        self.categories = []
+        self.last_period = None
+        self.feature_columns = ['monthly_category_totals']
+
+    def train_model(self, expenses_data: List[Dict], as_of: Optional[datetime] = None) -> Dict:
+        """Fit the smoothing model on complete months of expense history"""
+        try:
+            if len(expenses_data) < 10:
+                return {
+                    'success': False,
+                    'message': 'Need at least 10 expenses to train the model',
+                    'metrics': {}
+                }
+            return self._fit(expenses_data, as_of)
+
+        except Exception as e:
+            logger.error(f"Error training statistical model: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Training failed: {str(e)}',
+                'metrics': {}
+            }
+
+    def train_on_daily_totals(self, daily_totals: List[Dict], as_of: Optional[datetime] = None) -> Dict:
+        """Fit the smoothing model on per-day, per-category totals"""
+        try:
+            if sum(row['count'] for row in daily_totals) < 10:
+                return {
+                    'success': False,
+                    'message': 'Need at least 10 expenses to train the model',
+                    'metrics': {}
+                }
+            return self._fit(daily_totals, as_of)
+
+        except Exception as e:
+            logger.error(f"Error training statistical model: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Training failed: {str(e)}',
+                'metrics': {}
+            }
+
+    def _fit(self, rows: List[Dict], as_of: Optional[datetime]) -> Dict:
+        """Fit on dated amount rows, either raw expenses or daily totals"""
+        started = time.perf_counter()
+        periods, categories, Y = monthly_category_matrix(rows, as_of)
+        if len(periods) == 0:
+            return {
+                'success': False,
+                'message': 'Need at least one complete month of expenses',
+                'metrics': {}
+            }
+
+        self.state = fit_exponential_smoothing(Y, **self.model_params)
+        self.categories = categories
+        self.last_period = (periods[-1].year, periods[-1].month)
+        self.is_trained = True
+        training_ms = (time.perf_counter() - started) * 1000
+
+        return {
+            'success': True,
+            'message': 'Model trained successfully',
+            'metrics': {
+                'method': self.state['method'],
+                'mae': round(self.state['fitted_mae'], 2),
+                'mape': round(self.state['fitted_mape'], 3),
+                'training_months': len(periods),
+                'categories': len(categories),
+                'training_ms': round(training_ms, 2)
+            }
+        }
+
+    def forecast_history(self, user_id: int, db: Session) -> List[Dict]:
+        """The fitted state is all a forecast needs, so no history is fetched"""
+        return []
+
+    def predict_from_history(self, daily_totals: List[Dict], months_ahead: int = 1,
+                             bands=None) -> Dict:
+        """Predict monthly expenses from the fitted smoothing state"""
+        try:
+            if not self.is_trained:
+                return {
+                    'success': False,
+                    'message': 'Model not trained. Please train first.',
+                    'predictions': []
+                }
+
+            started = time.perf_counter()
+            predictions = self.forecast_months([], months_ahead)
+            forecast_ms = (time.perf_counter() - started) * 1000
+
+            return {
+                'success': True,
+                'message': f'Generated {len(predictions)} month predictions',
+                'predictions': predictions,
+                'forecast_ms': round(forecast_ms, 2)
+            }
+
+        except Exception as e:
+            logger.error(f"Error predicting monthly expenses: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Prediction failed: {str(e)}',
+                'predictions': []
+            }
+
+    def forecast_months(self, expenses_data: List[Dict], months_ahead: int,
+                        as_of: Optional[datetime] = None, bands=None) -> List[Dict]:
+        """Extrapolate the fitted state; the history argument is not needed"""
+        targets = future_months(as_of or datetime.now(), months_ahead)
+        last_index = self.last_period[0] * 12 + self.last_period[1] - 1
+        horizons = np.array([max(1, year * 12 + month - 1 - last_index) for year, month in targets])
+
+        forecast = forecast_exponential_smoothing(self.state, horizons)
+        totals = forecast.sum(axis=1)
+        # Combined one-step error of all categories, widened with the horizon
+        spread = np.sqrt((np.asarray(self.state['residual_std']) ** 2).sum() * horizons)
+        p10 = np.clip(totals - P90_Z * spread, 0, None)
+        p90 = totals + P90_Z * spread
+
+        predictions = []
+        for (year, month), total, low, high in zip(targets, totals, p10, p90):
+            predictions.append({
+                'month': month,
+                'year': year,
+                'month_name': datetime(year, month, 1).strftime('%B %Y'),
+                'predicted_amount': round(float(total), 2),
+                'p10': round(float(low), 2),
+                'p50': round(float(total), 2),
+                'p90': round(float(high), 2),
+                'confidence': interval_confidence(total, low, high)
+            })
+        return predictions
+
+    def save_model(self, filepath: str) -> bool:
+        """Save the smoothing state as JSON"""
+        try:
+            if not self.is_trained:
+                return False
+
+            model_data = {
+                'engine': self.engine,
+                'state': {key: np.asarray(value).tolist() if not isinstance(value, str) else value
+                          for key, value in self.state.items()},
+                'categories': self.categories,
+                'last_period': list(self.last_period),
+                'feature_columns': self.feature_columns,
+                'trained_date': datetime.now().isoformat()
+            }
+
+            os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+            with open(filepath, 'w') as f:
+                json.dump(model_data, f)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error saving model: {str(e)}")
+            return False
+
+    def load_model(self, filepath: str) -> bool:
+        """Load a smoothing state saved by `save_model`"""
+        try:
+            with open(filepath) as f:
+                model_data = json.load(f)
+            self.state = model_data['state']
+            self.categories = model_data['categories']
+            self.last_period = tuple(model_data['last_period'])
+            self.feature_columns = model_data['feature_columns']
+            self.is_trained = True
+            return True
+
+        except Exception as e:
+            logger.error(f"Error loading model: {str(e)}")
+            return False
@@ -0,0 +1,47 @@
+"""
+Model Training
+Trains a user's forecasting model on their daily rollups and publishes it as the next version
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict
+import logging
+from sqlalchemy.orm import Session
+
+from logic.forecast_common import MAX_HISTORY_DAYS
+from logic.forecast_engines import FOREST_ENGINE, create_forecaster
+from logic.model_registry import publish_model
+from logic import hyperparameter_search
+from data_sources.ai_data import get_daily_category_totals, get_data_watermark
+
+logger = logging.getLogger(__name__)
+
+def train_user_model(db: Session, user_id: int, engine: str) -> Dict:
+    """Train `engine` on the user's daily totals within the training window and publish it
+
+    Returns the engine's training result with the published `version`, or
+    `no_data` set when the user has no expenses. The data watermark read
+    before training is stored with the version, so later runs can tell
+    whether the model is behind the data.
+    """
+    forecaster = create_forecaster(engine)
+    watermark = get_data_watermark(db, user_id)
+    since = (datetime.now() - timedelta(days=MAX_HISTORY_DAYS)).date()
+    daily_totals = get_daily_category_totals(db, user_id, since=since)
+    if not daily_totals:
+        return {
+            'success': False,
+            'no_data': True,
+            'message': 'No expenses found. Please add some expenses first.'
+        }
+
+    # Use the configuration promoted by tuning if there is one
+    if engine == FOREST_ENGINE:
+        tuned = hyperparameter_search.load_tuned_config(user_id)
+        result = forecaster.train_on_daily_totals(daily_totals, model_params=tuned)
+    else:
+        result = forecaster.train_on_daily_totals(daily_totals)
+
+    if result['success']:
+        result['version'] = publish_model(user_id, engine, forecaster, metadata={'data_watermark': watermark})
+    return result
@@ -0,0 +1,139 @@
+"""
+Worker Warm-up
+Prepares ORM mappers, response models, pooled connections and recent users' models before a worker reports ready
+"""
+
+import os
+import time
+import inspect
+import threading
+from typing import Dict, Optional
+import logging
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from data_sources.database import engine, SessionLocal
+from data_sources.ai_data import get_recently_active_user_ids
+from logic.forecast_engines import ENGINE_CLASSES
+from logic.model_registry import MODEL_CACHE_SIZE, load_current_model
+from logic import inference
+import schema.schemas as schemas
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "5"))
+WARMUP_MODEL_USERS = int(os.getenv("WARMUP_MODEL_USERS", "50"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+class WarmupState:
+    """Progress of the warm-up, read by the readiness endpoint"""
+
+    def __init__(self):
+        self.status = 'pending'  # pending, running, ready, failed
+        self.steps: Dict[str, Dict] = {}
+        self.attempts = 0
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == 'ready'
+
+    def to_dict(self) -> Dict:
+        return {
+            'status': self.status,
+            'attempts': self.attempts,
+            'steps': self.steps,
+            'error': self.error
+        }
+
+state = WarmupState()
+
+def configure_orm() -> Dict:
+    """Resolve every mapper and relationship up front"""
+    configure_mappers()
+    return {}
+
+def compile_response_models(app) -> Dict:
+    """Complete every schema and build the OpenAPI document from the routes' models"""
+    schema_models = [
+        cls for _, cls in inspect.getmembers(schemas, inspect.isclass)
+        if issubclass(cls, BaseModel) and cls is not BaseModel
+    ]
+    for model in schema_models:
+        model.model_rebuild()
+    app.openapi()
+    return {'models': len(schema_models)}
+
+def open_pool_connections(count: int = WARMUP_POOL_CONNECTIONS) -> Dict:
+    """Check out `count` connections at once so the pool holds them afterwards"""
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+    return {'connections': len(connections)}
+
+def preload_models(limit: int = WARMUP_MODEL_USERS) -> Dict:
+    """Load the current models of the most recently active users into the model cache
+
+    In sidecar mode the inference server holds the models, so nothing is loaded here.
+    """
+    if inference.INFERENCE_MODE == 'sidecar':
+        return {'models': 0, 'skipped': 'sidecar'}
+
+    db = SessionLocal()
+    try:
+        user_ids = get_recently_active_user_ids(db, min(limit, MODEL_CACHE_SIZE))
+    finally:
+        db.close()
+    loaded = sum(
+        load_current_model(user_id, engine_name) is not None
+        for user_id in user_ids for engine_name in ENGINE_CLASSES
+    )
+    return {'users': len(user_ids), 'models': loaded}
+
+def run_warmup(app) -> bool:
+    """Run each warm-up step once, recording its duration and outcome"""
+    steps = (
+        ('orm', configure_orm),
+        ('response_models', lambda: compile_response_models(app)),
+        ('db_pool', open_pool_connections),
+        ('models', preload_models),
+    )
+    state.status = 'running'
+    state.attempts += 1
+    state.error = None
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            details = step()
+        except Exception as e:
+            logger.error(f"Warm-up step {name} failed: {str(e)}")
+            state.steps[name] = {'ok': False, 'error': str(e)}
+            state.status = 'failed'
+            state.error = f"{name}: {str(e)}"
+            return False
+        state.steps[name] = {'ok': True, 'ms': round((time.perf_counter() - started) * 1000, 1), **details}
+
+    state.status = 'ready'
+    logger.info(f"Warm-up finished: {state.steps}")
+    return True
+
+def start_warmup(app) -> threading.Thread:
+    """Warm up in the background, retrying every WARMUP_RETRY_SECONDS until it succeeds"""
+    def worker():
+        if not WARMUP_ENABLED:
+            state.status = 'ready'
+            return
+        while not run_warmup(app):
+            time.sleep(WARMUP_RETRY_SECONDS)
+
+    thread = threading.Thread(target=worker, name="warmup", daemon=True)
+    thread.start()
+    return thread
@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
+import logging
 from sqlalchemy import func
 
 from data_sources.database import SessionLocal
@@ -9,15 +12,32 @@ import data_sources.models as models
 import schema.schemas as schemas
 from auth import get_current_active_user
 from routers import auth
-from logic.ai_logic import forecaster
-from api import categories, expenses, ai, investments
+from api import categories, expenses, ai, investments, networth, loans
+from logic import warmup, hyperparameter_search
+from logic.scheduler import SCHEDULER_ENABLED, recent_runs
+from logic.scheduled_tasks import scheduler
+
+# Configure logging; forecasting modules that used to set this up may never be imported
+logging.basicConfig(level=logging.INFO)
 
 # Note: Tables are now managed by Alembic migrations
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background; /ready reports 503 until it finishes
+    warmup.start_warmup(app)
+    # Every worker runs the scheduler; a lock per task elects the one that runs it
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    yield
+    scheduler.stop()
+    hyperparameter_search.shutdown()
+
 app = FastAPI(
     title="Expense Tracker API",
     description="A secure expense tracking API with OAuth2.0 authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -39,6 +59,22 @@ app.include_router(categories.router) # Include new router
 app.include_router(expenses.router) # Include new router
 app.include_router(ai.router) # Include new router
 app.include_router(investments.router) # Include new router
+app.include_router(networth.router)
+app.include_router(loans.router)
+
+@app.get("/ready", include_in_schema=False)
+def readiness():
+    """Readiness probe: 200 once this worker has warmed up, 503 before"""
+    return JSONResponse(status_code=200 if warmup.state.ready else 503, content=warmup.state.to_dict())
+
+@app.get("/scheduler", include_in_schema=False)
+def scheduler_status(current_user: models.User = Depends(get_current_active_user)):
+    """This worker's scheduler counters and the latest runs from every worker
+
+    Runs carry their status and timing only; details and errors stay in
+    the task_runs table and the logs.
+    """
+    return {**scheduler.metrics(), 'recent_runs': recent_runs()}
 
 # Dependency to get the database session
 def get_db():
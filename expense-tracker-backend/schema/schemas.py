@@ -1,7 +1,8 @@
 from pydantic import BaseModel, ConfigDict, EmailStr, validator
 from enum import Enum
+import datetime as dt
 from datetime import date, datetime
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
 
 # Authentication Schemas
 class UserBase(BaseModel):
@@ -146,6 +147,7 @@ class InvestmentBase(BaseModel):
     is_sip: bool = False
     sip_amount: Optional[float] = None
     sip_frequency: Optional[str] = None
+    scheme_code: Optional[str] = None  # AMFI scheme code; keeps `nav` current from NAV history
 
 # Investment Create Schema
 class InvestmentCreate(InvestmentBase):
@@ -156,7 +158,7 @@ class InvestmentUpdate(BaseModel):
     name: Optional[str] = None
     investment_type: Optional[InvestmentType] = None
     amount: Optional[float] = None
-    date: Optional[date] = None
+    date: Optional[dt.date] = None  # the field's own name would shadow the type
     status: Optional[InvestmentStatus] = None
     description: Optional[str] = None
     institution: Optional[str] = None
@@ -164,19 +166,45 @@ class InvestmentUpdate(BaseModel):
     folio_number: Optional[str] = None
     units: Optional[float] = None
     nav: Optional[float] = None
-    maturity_date: Optional[date] = None
+    maturity_date: Optional[dt.date] = None
     interest_rate: Optional[float] = None
     frequency: Optional[str] = None
     is_sip: Optional[bool] = None
     sip_amount: Optional[float] = None
     sip_frequency: Optional[str] = None
+    scheme_code: Optional[str] = None
+
+# Interest Accrual Schemas
+class InterestAccrual(BaseModel):
+    investment_id: int
+    investment_type: Optional[str] = None
+    principal: float
+    interest_rate: float
+    compounding_per_year: int
+    effective_annual_rate: float
+    accrued_value: float
+    accrued_interest: float
+    maturity_date: Optional[date] = None
+    maturity_value: Optional[float] = None
+    maturity_interest: Optional[float] = None
+    days_to_maturity: Optional[int] = None
+
+class AccrualTotals(BaseModel):
+    holdings: int
+    principal: float
+    accrued_value: float
+    accrued_interest: float
+    maturity_value: float
+    maturity_interest: float
 
 # Investment Response Schema
 class Investment(InvestmentBase):
     id: int
     user_id: int
+    nav_date: Optional[date] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+    accrual: Optional[InterestAccrual] = None  # Set when reading one interest-bearing investment
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -191,3 +219,217 @@ class InvestmentSummary(BaseModel):
     investments_by_type: dict
     recent_investments: list
     upcoming_maturities: list
+    interest_accrual: Optional[AccrualTotals] = None
+
+# Investment Performance Schemas
+class HoldingPerformance(BaseModel):
+    id: int
+    name: str
+    investment_type: Optional[str] = None
+    invested_amount: float
+    current_value: float
+    absolute_return: float
+    return_pct: Optional[float] = None
+    cagr: Optional[float] = None
+    xirr: Optional[float] = None
+
+class PortfolioPerformance(BaseModel):
+    invested_amount: float
+    current_value: float
+    absolute_return: float
+    return_pct: Optional[float] = None
+    cagr: Optional[float] = None
+    xirr: Optional[float] = None
+
+class InvestmentPerformance(BaseModel):
+    holdings: List[HoldingPerformance]
+    portfolio: Optional[PortfolioPerformance] = None
+    as_of: date
+    compute_ms: float
+
+# Investment Projection Schemas
+class ProjectionTotals(BaseModel):
+    contribution: float
+    corpus: float
+
+class ProjectionMonth(ProjectionTotals):
+    month: str
+    by_type: Dict[str, ProjectionTotals]
+
+class SipProjection(BaseModel):
+    id: int
+    name: str
+    investment_type: Optional[str] = None
+    sip_amount: float
+    sip_frequency: Optional[str] = None
+    annual_return: float
+    next_contribution: Optional[date] = None
+    installments: int
+    contribution_total: float
+    projected_value: float
+
+class PortfolioProjectionTotals(BaseModel):
+    current_value: float
+    contribution: float
+    projected_value: float
+    gain: float
+
+class InvestmentProjection(BaseModel):
+    schedule: List[ProjectionMonth]
+    sips: List[SipProjection]
+    totals: PortfolioProjectionTotals
+    annual_return: float
+    as_of: date
+    portfolio_version: str
+    cached: bool
+    compute_ms: float
+
+# Maturity Calendar Schemas
+class MaturityEvent(BaseModel):
+    investment_id: int
+    name: str
+    investment_type: str
+    maturity_date: date
+    principal: float
+    interest_rate: Optional[float] = None
+    projected_payout: float
+    payout_basis: str
+
+class MaturityCalendar(BaseModel):
+    start: date
+    end: date
+    maturities: List[MaturityEvent]
+    total_principal: float
+    total_payout: float
+
+# Investment Import Schemas
+class ImportRowReport(BaseModel):
+    line: int
+    status: str  # imported, duplicate, skipped or error
+    message: Optional[str] = None
+    name: Optional[str] = None
+    folio_number: Optional[str] = None
+    date: Optional[dt.date] = None
+    amount: Optional[float] = None
+
+class InvestmentImportResult(BaseModel):
+    message: str
+    format: str
+    dry_run: bool
+    total_rows: int
+    imported: int
+    duplicates: int
+    skipped: int
+    errors: int
+    seconds: float
+    rows: List[ImportRowReport]
+
+# Net Worth Schemas
+class NetworthPoint(BaseModel):
+    date: dt.date
+    invested: float
+    current_value: float
+    cumulative_spend: float
+
+class NetworthTimeline(BaseModel):
+    start: dt.date
+    end: dt.date
+    points: List[NetworthPoint]
+
+# Loan Schemas
+class LoanBase(BaseModel):
+    name: str
+    lender: Optional[str] = None
+    principal: float
+    interest_rate: float  # Annual, percent
+    tenure_months: int
+    start_date: date  # Disbursement; EMIs fall due monthly from a month later
+    prepayment_strategy: str = "reduce_tenure"  # reduce_tenure or reduce_emi
+    track_expenses: bool = True  # Record EMIs as Housing expenses
+
+class LoanCreate(LoanBase):
+    pass
+
+class LoanUpdate(BaseModel):
+    name: Optional[str] = None
+    lender: Optional[str] = None
+    principal: Optional[float] = None
+    interest_rate: Optional[float] = None
+    tenure_months: Optional[int] = None
+    start_date: Optional[date] = None
+    prepayment_strategy: Optional[str] = None
+    track_expenses: Optional[bool] = None
+
+class LoanPrepaymentCreate(BaseModel):
+    date: dt.date
+    amount: float
+
+class LoanPrepayment(LoanPrepaymentCreate):
+    id: int
+    loan_id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class LoanBalance(BaseModel):
+    as_of: date
+    emi: float
+    installments_paid: int
+    installments_remaining: int
+    outstanding_principal: float
+    principal_repaid: float
+    interest_paid: float
+    remaining_interest: float
+    next_due_date: Optional[date] = None
+    next_emi: Optional[float] = None
+
+class Loan(LoanBase):
+    id: int
+    user_id: int
+    prepayments: List[LoanPrepayment] = []
+    balance: Optional[LoanBalance] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ScheduleRow(BaseModel):
+    installment: int
+    due_date: date
+    opening_balance: float
+    emi: float
+    interest: float
+    principal: float
+    prepayment: float
+    closing_balance: float
+    expense_id: Optional[int] = None
+
+class ScheduleTotals(BaseModel):
+    emi: float
+    final_emi: float
+    installments: int
+    total_interest: float
+    total_prepaid: float
+    total_paid: float
+    closes_on: Optional[date] = None
+
+class LoanSchedule(ScheduleTotals):
+    loan_id: int
+    rows: List[ScheduleRow]
+
+class PrepaymentSimulationRequest(BaseModel):
+    prepayments: List[LoanPrepaymentCreate]
+    strategy: Optional[str] = None  # Defaults to the loan's own
+
+class PrepaymentSimulation(BaseModel):
+    strategy: str
+    current: ScheduleTotals
+    simulated: ScheduleTotals
+    interest_saved: float
+    installments_saved: int
+    schedule: List[ScheduleRow]
+
+class EmiExpenseSync(BaseModel):
+    loans: int
+    linked: int
+    created: int
+    seconds: float
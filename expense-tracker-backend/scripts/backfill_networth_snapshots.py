@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script to recompute the daily portfolio snapshots behind /networth/timeline.
+Changes made through the API drop the snapshots they affect, so this is
+only needed after changes made around it, such as rows edited directly in
+the database.
+"""
+
+import os
+import sys
+import argparse
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_sources.database import SessionLocal
+from data_sources.snapshot_store import get_snapshot_user_ids
+from logic.networth import backfill_snapshots
+
+def backfill_networth_snapshots(user_ids=None):
+    """Recompute the snapshots of the given users, or of every user with investments or expenses"""
+    db = SessionLocal()
+    try:
+        for user_id in user_ids or get_snapshot_user_ids(db):
+            result = backfill_snapshots(db, user_id)
+            print(f"✅ User {user_id}: {result['days']} days in {result['seconds']}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute daily portfolio snapshots")
+    parser.add_argument("--user-id", type=int, nargs="*", help="Users to backfill (default: all)")
+    args = parser.parse_args()
+
+    print("🚀 Backfilling net worth snapshots...")
+    backfill_networth_snapshots(args.user_id)
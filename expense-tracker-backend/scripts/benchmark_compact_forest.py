@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Script to compare compact forest files against joblib pickles.
+Trains forests on synthetic histories, saves each in both formats and prints
+file size, load time, the bytes of tree arrays held in memory, prediction
+time and the largest difference from sklearn's own predictions.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logic.ai_logic import ExpenseForecaster, aggregate_daily_totals
+from logic.backtesting import generate_synthetic_expenses
+
+def model_bytes(model) -> int:
+    """Bytes of the node and leaf arrays a loaded model keeps in memory"""
+    if hasattr(model, 'nbytes'):
+        return model.nbytes
+    # sklearn allocates tree arrays outside Python's allocator, so count them directly
+    return sum(
+        estimator.tree_.__getstate__()['nodes'].nbytes + estimator.tree_.value.nbytes
+        for estimator in model.estimators_
+    )
+
+def time_load(filepath: str, repeats: int) -> tuple:
+    """Median load time in ms and the last loaded forecaster"""
+    timings = []
+    for _ in range(repeats):
+        forecaster = ExpenseForecaster()
+        started = time.perf_counter()
+        forecaster.load_model(filepath)
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings)), forecaster
+
+def time_predict(forecaster: ExpenseForecaster, X: np.ndarray, repeats: int) -> float:
+    """Median `prediction_bands` time in ms"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        forecaster.prediction_bands(X)
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings))
+
+def benchmark_compact_forest(months: int, seeds: list, rows: int, repeats: int):
+    """Print a row per format for every trained forest"""
+    print(f"{'Seed':<5} {'Trees':>5} {'Format':<8} {'File KB':>9} {'Load ms':>8} "
+          f"{'Mem KB':>8} {'Pred ms':>8} {'Max diff':>10}")
+    print("-" * 70)
+    for seed in seeds:
+        daily = aggregate_daily_totals(generate_synthetic_expenses(months, seed=seed))
+        trained = ExpenseForecaster()
+        trained.train_on_daily_totals(daily)
+        X = trained.scaler.transform(np.random.default_rng(seed).normal(size=(rows, len(trained.feature_columns))) * 2)
+        expected = trained.model.predict(X)
+
+        for label, filepath in (('pickle', f"seed_{seed}.pkl"), ('compact', f"seed_{seed}.npz")):
+            trained.save_model(filepath)
+            load_ms, forecaster = time_load(filepath, repeats)
+            predict_ms = time_predict(forecaster, X, repeats)
+            max_diff = float(np.max(np.abs(forecaster.model.predict(X) - expected)))
+            print(f"{seed:<5} {trained.training_config['n_estimators']:>5} {label:<8} "
+                  f"{os.path.getsize(filepath) / 1024:>9.1f} {load_ms:>8.2f} {model_bytes(forecaster.model) / 1024:>8.1f} "
+                  f"{predict_ms:>8.2f} {max_diff:>10.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark compact forest files against joblib pickles")
+    parser.add_argument("--months", type=int, default=36, help="Months of synthetic history per forest")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3], help="Synthetic history seeds")
+    parser.add_argument("--rows", type=int, default=3, help="Feature rows per prediction")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed repetitions per measurement")
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking compact forest format...")
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        benchmark_compact_forest(args.months, args.seeds, args.rows, args.repeats)
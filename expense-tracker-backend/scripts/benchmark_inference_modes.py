@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Script to compare in-process inference with the inference sidecar.
+Trains forest models for synthetic users, then runs several worker processes
+that each forecast for every user. Reports the total resident memory of the
+workers (plus the sidecar), the p50/p99 forecast latency of each mode and
+whether the workers loaded scikit-learn.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from datetime import date
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+# Daily totals of every synthetic user, relative to the benchmark's working directory
+HISTORIES_FILE = "histories.json"
+
+def synthetic_history(user_id: int, months: int):
+    """Daily totals of one synthetic user"""
+    from logic.ai_logic import aggregate_daily_totals
+    from logic.backtesting import generate_synthetic_expenses
+    return aggregate_daily_totals(generate_synthetic_expenses(months, seed=user_id))
+
+def rss_mb(pid: int) -> float:
+    """Current resident memory of a process in MB"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def run_worker(users: int, requests: int, months: int):
+    """Worker entry point: forecast for every user, then time random requests
+
+    Histories are read from the file `train_users` wrote, as an API worker
+    reads them from the database, so the worker imports nothing beyond the
+    inference facade.
+    """
+    import gc
+    from logic import inference
+    with open(HISTORIES_FILE) as f:
+        histories = {
+            int(user_id): [{**row, 'date': date.fromisoformat(row['date'])} for row in rows]
+            for user_id, rows in json.load(f).items()
+        }
+    gc.collect()
+    for user_id, history in histories.items():
+        inference.forecast(user_id, 'forest', history, 3)
+
+    rng = random.Random(os.getpid())
+    latencies = []
+    for _ in range(requests):
+        user_id = rng.randint(1, users)
+        started = time.perf_counter()
+        inference.forecast(user_id, 'forest', histories[user_id], 3)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(json.dumps({'rss_mb': rss_mb(os.getpid()), 'latencies': latencies,
+                      'sklearn': 'sklearn' in sys.modules}))
+
+def train_users(users: int, months: int):
+    """Train and publish one forest per synthetic user in the current directory
+
+    Each user's daily totals are also written to HISTORIES_FILE for the workers.
+    """
+    from logic.ai_logic import ExpenseForecaster
+    from logic.model_registry import publish_model
+    histories = {}
+    for user_id in range(1, users + 1):
+        history = synthetic_history(user_id, months)
+        forecaster = ExpenseForecaster()
+        forecaster.train_on_daily_totals(history)
+        publish_model(user_id, 'forest', forecaster)
+        histories[user_id] = [{**row, 'date': row['date'].date().isoformat()} for row in history]
+    with open(HISTORIES_FILE, 'w') as f:
+        json.dump(histories, f)
+
+def run_mode(mode: str, workers: int, users: int, requests: int, months: int, workdir: str) -> dict:
+    """Run the workers in one inference mode and collect memory and latency"""
+    socket_path = os.path.join(workdir, "inference.sock")
+    env = {**os.environ, 'PYTHONPATH': BACKEND_DIR, 'AI_INFERENCE_MODE': mode,
+           'AI_INFERENCE_SOCKET': socket_path}
+    server = None
+    if mode == 'sidecar':
+        server = subprocess.Popen([sys.executable, "-m", "logic.inference_server"], cwd=workdir, env=env)
+        while not os.path.exists(socket_path):
+            time.sleep(0.1)
+
+    procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker",
+                               "--users", str(users), "--requests", str(requests), "--months", str(months)],
+                              cwd=workdir, env=env, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    results = [json.loads(proc.communicate()[0].strip().splitlines()[-1]) for proc in procs]
+
+    sidecar_mb = 0.0
+    if server is not None:
+        sidecar_mb = rss_mb(server.pid)
+        server.terminate()
+        server.wait()
+
+    latencies = np.concatenate([r['latencies'] for r in results])
+    return {
+        'worker_mb': sum(r['rss_mb'] for r in results),
+        'sidecar_mb': sidecar_mb,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'sklearn': any(r['sklearn'] for r in results)
+    }
+
+def benchmark_inference_modes(workers: int, users: int, requests: int, months: int):
+    """Print memory and latency of both modes on the same trained models"""
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        train_users(users, months)
+        print(f"{'Mode':<10} {'Workers MB':>11} {'Sidecar MB':>11} {'Total MB':>9} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'Worker sklearn':>15}")
+        print("-" * 78)
+        for mode in ('inprocess', 'sidecar'):
+            row = run_mode(mode, workers, users, requests, months, workdir)
+            print(f"{mode:<10} {row['worker_mb']:>11.0f} {row['sidecar_mb']:>11.0f} "
+                  f"{row['worker_mb'] + row['sidecar_mb']:>9.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                  f"{'yes' if row['sklearn'] else 'no':>15}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark in-process vs sidecar inference")
+    parser.add_argument("--workers", type=int, default=4, help="API worker processes")
+    parser.add_argument("--users", type=int, default=20, help="Users with a trained model")
+    parser.add_argument("--requests", type=int, default=300, help="Timed forecasts per worker")
+    parser.add_argument("--months", type=int, default=36, help="Months of synthetic history")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.users, args.requests, args.months)
+    else:
+        print("🚀 Benchmarking inference modes...")
+        benchmark_inference_modes(args.workers, args.users, args.requests, args.months)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Script to measure forecast throughput with and without micro-batching.
+Concurrent threads, like the API's request thread pool, forecast for a small
+set of users for a fixed time in each mode; requests per second, latency
+percentiles, the share of calls predicted directly and the batcher's mean
+batch and model pass sizes are printed, both for whole forecasts and for the
+prediction stage alone.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logic.ai_logic import ExpenseForecaster, aggregate_daily_totals
+from logic.backtesting import generate_synthetic_expenses
+from logic.model_registry import publish_model
+from logic import batching, inference
+
+def run_load(call, user_ids: list, threads: int, seconds: float) -> dict:
+    """Run `call(user_id)` from `threads` threads for `seconds` and collect latencies"""
+    latencies = [[] for _ in range(threads)]
+    stop = time.perf_counter() + seconds
+
+    def worker(index: int):
+        rng = random.Random(index)
+        while time.perf_counter() < stop:
+            user_id = rng.choice(user_ids)
+            started = time.perf_counter()
+            call(user_id)
+            latencies[index].append((time.perf_counter() - started) * 1000)
+
+    cpu_started = time.process_time()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    cpu_seconds = time.process_time() - cpu_started
+
+    all_latencies = np.concatenate([np.array(l) for l in latencies])
+    return {
+        'rps': len(all_latencies) / seconds,
+        'requests_per_cpu_second': len(all_latencies) / cpu_seconds,
+        'p50_ms': float(np.percentile(all_latencies, 50)),
+        'p99_ms': float(np.percentile(all_latencies, 99))
+    }
+
+def benchmark_micro_batching(users: int, threads: int, seconds: float, months_ahead: int):
+    """Print throughput of direct and micro-batched prediction on the same models"""
+    histories, forecasters, features = {}, {}, {}
+    for user_id in range(1, users + 1):
+        daily = aggregate_daily_totals(generate_synthetic_expenses(36, seed=user_id))
+        forecaster = ExpenseForecaster()
+        forecaster.train_on_daily_totals(daily)
+        publish_model(user_id, 'forest', forecaster)
+        histories[user_id] = daily
+        forecasters[user_id] = forecaster
+        features[user_id] = forecaster.scaler.transform(np.random.default_rng(user_id).random((months_ahead, 7)))
+    # Load every model before timing
+    for user_id, history in histories.items():
+        inference.forecast(user_id, 'forest', history, months_ahead)
+
+    def forecast(user_id):
+        inference.forecast(user_id, 'forest', histories[user_id], months_ahead)
+
+    def predict(user_id):
+        forecaster = forecasters[user_id]
+        (batching.bands_for(forecaster) or forecaster.prediction_bands)(features[user_id])
+
+    print(f"{'Stage':<10} {'Mode':<10} {'Req/s':>8} {'Req/CPU-s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'Direct':>7} {'Batch':>6} {'Pass':>6}")
+    print("-" * 81)
+    for stage, call in (('forecast', forecast), ('predict', predict)):
+        for enabled in (False, True):
+            batching.BATCHING_ENABLED = enabled
+            batching.batcher = batching.InferenceBatcher()
+            row = run_load(call, list(histories), threads, seconds)
+            stats = batching.batcher.stats()
+            calls = stats['direct'] + stats['requests']
+            direct_share = f"{stats['direct'] / calls:.0%}" if calls else '-'
+            print(f"{stage:<10} {'batched' if enabled else 'direct':<10} {row['rps']:>8.1f} "
+                  f"{row['requests_per_cpu_second']:>10.1f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                  f"{direct_share:>7} {stats['mean_batch_size']:>6.1f} {stats['mean_pass_size']:>6.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched inference")
+    parser.add_argument("--users", type=int, default=4, help="Users with a trained model")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent request threads")
+    parser.add_argument("--seconds", type=float, default=10, help="Load duration per mode")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Months forecast per request")
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking micro-batched inference...")
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        benchmark_micro_batching(args.users, args.threads, args.seconds, args.months_ahead)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the vectorized portfolio valuation engine.
+Builds synthetic portfolios of market, SIP, fixed-income and plain holdings
+and prints the time of each valuation stage, the time a per-holding scalar
+XIRR solver (scipy's brentq) takes for the same series, and the largest
+difference between the two.
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from datetime import date, timedelta
+from scipy.optimize import brentq
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logic.portfolio_valuation import (
+    holdings_to_arrays, current_values, build_cashflows, xirr, portfolio_performance
+)
+
+AS_OF = date(2026, 1, 1)
+
+def synthetic_holdings(count: int, seed: int) -> list:
+    """A mix of market-valued, SIP, interest-bearing and plain holdings over the last ten years"""
+    rng = np.random.default_rng(seed)
+    holdings = []
+    for i in range(count):
+        start = AS_OF - timedelta(days=int(rng.integers(30, 3650)))
+        amount = float(rng.uniform(1000, 200000))
+        holding = {'id': i, 'name': f"Holding {i}", 'investment_type': 'Other', 'amount': amount,
+                   'date': start, 'is_sip': False}
+        kind = rng.random()
+        if kind < 0.4:
+            holding.update(units=amount / 100, nav=float(100 * rng.lognormal(0.1, 0.3)))
+        elif kind < 0.7:
+            holding.update(is_sip=True, sip_amount=float(rng.choice([1000, 2500, 5000, 10000])),
+                           sip_frequency=str(rng.choice(['Monthly', 'Quarterly'])),
+                           units=amount / 100, nav=float(100 * rng.lognormal(0.1, 0.3)))
+        elif kind < 0.9:
+            holding.update(interest_rate=float(rng.uniform(5, 9)), frequency='Quarterly',
+                           maturity_date=start + timedelta(days=int(rng.integers(365, 3650))))
+        holdings.append(holding)
+    return holdings
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+def scalar_xirr(amounts: np.ndarray, years: np.ndarray) -> float:
+    try:
+        return brentq(lambda rate: float((amounts * (1 + rate) ** years).sum()), -0.9999, 1000)
+    except ValueError:
+        return float('nan')
+
+def benchmark_portfolio_valuation(sizes: list, scalar_sample: int, seed: int):
+    """Print a row of stage timings per portfolio size"""
+    as_of = np.datetime64(AS_OF, 'D')
+    print(f"{'Holdings':>9} {'Flows':>9} {'Arrays':>8} {'Value':>7} {'Flows ms':>9} {'XIRR ms':>8} "
+          f"{'Total ms':>9} {'Scalar ms':>10} {'Max diff':>9}")
+    print("-" * 88)
+    for size in sizes:
+        holdings = synthetic_holdings(size, seed)
+        arrays, arrays_ms = timed(holdings_to_arrays, holdings)
+        values, value_ms = timed(current_values, arrays, as_of)
+        (series, amounts, days_before), flows_ms = timed(build_cashflows, arrays, values, as_of)
+        rates, xirr_ms = timed(xirr, series, amounts, days_before, size)
+        _, total_ms = timed(portfolio_performance, holdings, AS_OF)
+
+        # Scalar baseline on a sample of series, scaled up to the whole portfolio
+        sample = np.arange(min(size, scalar_sample))
+        order = np.argsort(series, kind='stable')
+        bounds = np.searchsorted(series[order], np.arange(size + 1))
+        started = time.perf_counter()
+        expected = np.array([
+            scalar_xirr(amounts[order][bounds[i]:bounds[i + 1]], days_before[order][bounds[i]:bounds[i + 1]] / 365.0)
+            for i in sample
+        ])
+        scalar_ms = (time.perf_counter() - started) * 1000 * size / len(sample)
+        both = np.isfinite(expected) & np.isfinite(rates[sample])
+        max_diff = float(np.max(np.abs(expected[both] - rates[sample][both]))) if both.any() else 0.0
+
+        estimate = '*' if len(sample) < size else ' '
+        print(f"{size:>9} {len(series):>9} {arrays_ms:>8.1f} {value_ms:>7.2f} {flows_ms:>9.1f} {xirr_ms:>8.1f} "
+              f"{total_ms:>9.1f} {scalar_ms:>9.0f}{estimate} {max_diff:>9.1e}")
+    print("* scalar time extrapolated from a sample")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorized portfolio valuation and XIRR")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000], help="Holdings per portfolio")
+    parser.add_argument("--scalar-sample", type=int, default=2000, help="Series solved by the scalar baseline")
+    parser.add_argument("--seed", type=int, default=7, help="Synthetic portfolio seed")
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking portfolio valuation...")
+    benchmark_portfolio_valuation(args.sizes, args.scalar_sample, args.seed)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Script to measure the cost of the per-tree prediction interval pass against a
+plain forest predict, for forecast batches of different sizes.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logic.ai_logic import ExpenseForecaster
+from logic.backtesting import generate_synthetic_expenses
+
+def _best_of(func, repeats: int = 20) -> float:
+    """Fastest wall time of `func` in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+def benchmark_prediction_intervals(batch_sizes=(1, 3, 12, 1000)):
+    """Print plain predict vs stacked per-tree band timings"""
+    forecaster = ExpenseForecaster()
+    forecaster.train_model(generate_synthetic_expenses(36, seed=0))
+    rng = np.random.default_rng(0)
+
+    print(f"{'Rows':>6} {'predict ms':>11} {'bands ms':>10} {'Overhead':>9}")
+    print("-" * 40)
+    for rows in batch_sizes:
+        X = rng.standard_normal((rows, len(forecaster.feature_columns)))
+        plain = _best_of(lambda: forecaster.model.predict(X))
+        bands = _best_of(lambda: forecaster.prediction_bands(X))
+        print(f"{rows:>6} {plain:>11.2f} {bands:>10.2f} {bands / plain:>8.1f}x")
+
+if __name__ == "__main__":
+    print("🚀 Benchmarking forest prediction intervals...")
+    benchmark_prediction_intervals()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script to measure forest training cost as a user's raw expense count grows.
+Prints training rows, fit time and pickled model size for synthetic users of
+increasing size with the same 36-month span.
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logic.ai_logic import ExpenseForecaster
+from logic.backtesting import generate_synthetic_expenses
+
+def benchmark_training_scale(scales, months: int):
+    """Train the forest on ever larger histories and print the cost"""
+    print(f"{'Expenses':>10} {'Train rows':>11} {'Fit ms':>10} {'Model KB':>10}")
+    print("-" * 45)
+    for scale in scales:
+        expenses = generate_synthetic_expenses(months, seed=0, scale=scale)
+        forecaster = ExpenseForecaster()
+        started = time.perf_counter()
+        result = forecaster.train_model(expenses)
+        fit_ms = (time.perf_counter() - started) * 1000
+        if not result['success']:
+            print(f"{len(expenses):>10} {result['message']}")
+            continue
+        metrics = result['metrics']
+        rows = metrics['training_samples'] + metrics['test_samples']
+        size = len(pickle.dumps({'model': forecaster.model, 'scaler': forecaster.scaler}))
+        print(f"{len(expenses):>10} {rows:>11} {fit_ms:>10.0f} {size / 1024:>10.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark forest training cost")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 4, 16, 48],
+                        help="Multipliers on the synthetic expense count per month")
+    parser.add_argument("--months", type=int, default=36, help="Months of history")
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking forest training cost...")
+    benchmark_training_scale(args.scales, args.months)
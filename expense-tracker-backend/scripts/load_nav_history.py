@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Script to load AMFI NAV files into nav_history.
+Accepts the daily NAVAll.txt, AMFI NAV history reports or a plain
+scheme_code,date,nav CSV. Each file loads in its own transaction; holdings
+with a scheme code are then revalued at the latest NAV on or before today.
+"""
+
+import os
+import sys
+import argparse
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_sources.database import SessionLocal
+from logic.nav_loader import load_nav_file
+
+def load_nav_history(paths: list, revalue: bool):
+    """Load every file and print a line per file"""
+    db = SessionLocal()
+    try:
+        for index, path in enumerate(paths):
+            with open(path, encoding='utf-8', errors='replace') as nav_file:
+                # Revalue once, after the last file
+                result = load_nav_file(db, nav_file, revalue=revalue and index == len(paths) - 1)
+            if not result['success']:
+                print(f"❌ {path}: {result['message']}")
+                continue
+            print(f"✅ {path}: {result['message']} ({result['skipped']} skipped) in {result['seconds']}s")
+            if result['revalued_investments']:
+                print(f"   Revalued {result['revalued_investments']} investments")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load AMFI NAV files into nav_history")
+    parser.add_argument("paths", nargs="+", help="NAV files to load")
+    parser.add_argument("--no-revalue", action="store_true", help="Skip revaluing investments after loading")
+    args = parser.parse_args()
+
+    print("🚀 Loading NAV history...")
+    load_nav_history(args.paths, not args.no_revalue)
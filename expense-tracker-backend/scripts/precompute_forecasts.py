@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Script to precompute forecasts and insights for all active users.
+The scheduler's nightly_forecasts task does this in the API workers; run the script
+from cron when the scheduler is disabled. /ai/forecast and /ai/insights serve the
+stored results until a user's expenses change or their model is retrained.
+"""
+
+import os
+import sys
+import argparse
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_sources.database import SessionLocal
+from logic.forecast_precompute import PRECOMPUTE_BATCH_SIZE, precompute_all
+
+def precompute_forecasts(batch_size: int, engines=None):
+    """Run one precomputation pass and print its summary"""
+    db = SessionLocal()
+    try:
+        summary = precompute_all(db, batch_size=batch_size, engines=engines)
+    finally:
+        db.close()
+
+    print(f"✅ {summary['users']} active users in {summary['seconds']}s")
+    print(f"   Forecasts written: {summary['forecasts_written']}, "
+          f"unchanged: {summary['forecasts_skipped']}, insights: {summary['insights_written']}")
+    if summary['failed_users']:
+        print(f"❌ Failed users: {summary['failed_users']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute forecasts and insights")
+    parser.add_argument("--batch-size", type=int, default=PRECOMPUTE_BATCH_SIZE, help="Users per batch")
+    parser.add_argument("--engine", nargs="*", help="Engines to precompute (default: all)")
+    args = parser.parse_args()
+
+    print("🚀 Precomputing forecasts...")
+    precompute_forecasts(args.batch_size, args.engine)
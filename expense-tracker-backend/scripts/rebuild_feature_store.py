@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the expense daily rollups used by forecasting and insights.
+Run it after loading expenses outside the API (for example with
+migrate_from_sqlite.py), since only API writes keep the rollups current.
+"""
+
+import os
+import sys
+import argparse
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_sources.database import SessionLocal
+from data_sources.models import User
+from data_sources.feature_store import rebuild_user_rollups
+
+def rebuild_feature_store(user_ids=None):
+    """Recompute the rollups of the given users, or of every user"""
+    db = SessionLocal()
+    try:
+        if not user_ids:
+            user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id).all()]
+        for user_id in user_ids:
+            rows = rebuild_user_rollups(db, user_id)
+            print(f"✅ User {user_id}: {rows} daily rollup rows")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild expense daily rollups")
+    parser.add_argument("--user-id", type=int, nargs="*", help="Users to rebuild (default: all)")
+    args = parser.parse_args()
+
+    print("🚀 Rebuilding expense feature store...")
+    rebuild_feature_store(args.user_id)